@@ -1,2 +1,14 @@
 import os
-os.system("streamlit run TB17.py")
+import subprocess
+import sys
+
+# python StartTB11.py                 -> Streamlit-Oberfläche
+# python StartTB11.py batch ein/ aus/ -> Batch-Modus ohne Oberfläche (siehe batch.py)
+HIER = os.path.dirname(os.path.abspath(__file__))
+
+if len(sys.argv) > 1 and sys.argv[1] == "batch":
+    sys.path.insert(0, HIER)
+    from batch import main
+    sys.exit(main(sys.argv[2:]))
+
+sys.exit(subprocess.call([sys.executable, "-m", "streamlit", "run", os.path.join(HIER, "TB11.py")]))
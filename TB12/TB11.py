@@ -1,22 +1,29 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-import io
 from abc import ABC, abstractmethod
-import numpy as np
-import yfinance as yf
-from datetime import datetime
 import time
+import os
+
+# pandas, numpy, matplotlib, yfinance und die Fachmodule werden erst in den Seiten
+# importiert, die sie brauchen: Startseite, Linkliste und Impressum starten ohne sie
+# (Messung: benchmarks/importzeit.py)
+from bilder import bildquelle
+from seitenregister import render_statistik, seiten_register
+from sitzungen import sitzungs_register
 
 # ---------------------------------------------------
 # Basis Page-Klasse (abstrakt)
 # ---------------------------------------------------
 class Page(ABC):
+   name = None   # Anzeigename, wird von der PageFactory gesetzt
+
    @abstractmethod
    def render(self):
        pass
 
+   def vorbereiten(self):
+       # einmal je Instanz: statische Inhalte vorberechnen (Instanzen werden wiederverwendet)
+       pass
+
 #class Page(ABC):
 #    def render(self):
 ##        self.render_header()
@@ -45,41 +52,113 @@ class LayoutStrategy(ABC):
 
 class OneColumnLayout(LayoutStrategy):
     def render(self, page):
-        st.container()
-        page.render_body()
+        with render_statistik.messen(page.name, type(self).__name__):
+            st.container()
+            page.render_body()
 
 class TwoColumnLayout(LayoutStrategy):
     def render(self, page):
-        col1, col2 = st.columns(2)
+        with render_statistik.messen(page.name, type(self).__name__):
+            col1, col2 = st.columns(2)
 
-        with col1:
-            if hasattr(page, "render_left"):
-                page.render_left()
-            else:
-                st.error("render_left() fehlt")
+            with col1:
+                if hasattr(page, "render_left"):
+                    page.render_left()
+                else:
+                    st.error("render_left() fehlt")
 
-        with col2:
-            if hasattr(page, "render_right"):
-                page.render_right()
-            else:
-                st.error("render_right() fehlt")
+            with col2:
+                if hasattr(page, "render_right"):
+                    page.render_right()
+                else:
+                    st.error("render_right() fehlt")
 
 
 # ---------------------------------------------------
 # Hilfsfunktion für Kennzahlen
 # ---------------------------------------------------
 def berechne_kennzahlen(df):
-    #Spalte Gesamtvermögen wird initialisiert mit...
-    #Pandas arbeitet automatisch vektorisiert,
-    #d. h. Rechenoperationen auf Spalten werden auf jede Zeile angewendet, ohne Schleifen schreiben zu müssen.
-    df["Gesamtvermögen"] = df["AV"] + df["UV"]
-    df["Anlagenintensität (%)"] = round(df["AV"] / df["Gesamtvermögen"] * 100, 2)
-    df["Liquidität 3 (%)"] = round(df["UV"] / df["KFK"] * 100, 2)
-    df["Working Capital"] = df["UV"] - df["KFK"]
-    df["Anlagendeckung 2 (%)"] = round((df["EK"] + df["LFK"]) / df["AV"], 2)
-    df["Verschuldungsgrad (%)"] = round((df["LFK"] + df["KFK"]) / df["EK"] * 100, 2)
+    #Kennzahlen werden von der gemeinsamen Engine (kennzahlen.py) berechnet,
+    #damit Oberfläche und Batch-Jobs identische Zahlen liefern.
+    #Das übergebene DataFrame bleibt unverändert, die Kennzahlspalten werden angehängt.
+    from kennzahlen import kennzahlen_tabelle
+
       #Wiedergabe Tabelle
-    return df
+    return kennzahlen_tabelle(df)
+
+
+# ---------------------------------------------------
+# Aktivität der Session (Speicherbericht, Verdrängen inaktiver Sessions)
+# ---------------------------------------------------
+def sitzung_melden():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        sitzungs_register.beruehren(ctx.session_id, ctx.session_state)
+
+
+def sitzung_kennung():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "lokal"
+
+
+# ---------------------------------------------------
+# Diagramm-Backend der Session (Sidebar-Auswahl)
+# ---------------------------------------------------
+def diagramm_backend():
+    from diagramme import BACKENDS, STANDARD_BACKEND
+
+    return BACKENDS[st.session_state.get("diagramm_backend", STANDARD_BACKEND)]
+
+
+# ---------------------------------------------------
+# Exporte über die Hintergrund-Warteschlange
+# ---------------------------------------------------
+def export_bereich(schluessel, beschriftung, kennung, erzeugen, dateiname, mime):
+    #Der Knopf reicht nur den Auftrag ein (gleiche Daten = gleicher Auftrag, auch bei Doppelklick),
+    #erzeugt wird im Hintergrund; Fortschritt und Download-Knopf zeigt ein Fragment an.
+    from exporte import export_warteschlange
+
+    if st.button(beschriftung, key=schluessel + "_knopf"):
+        st.session_state[schluessel] = export_warteschlange().einreichen(kennung, erzeugen, dateiname, mime).kennung
+
+    auftrag = export_warteschlange().auftrag(st.session_state.get(schluessel))
+    if auftrag is None:
+        return
+    if auftrag.kennung != kennung:
+        st.caption("Die Daten wurden seit diesem Export geändert.")
+    laufend = not auftrag.fertig
+    st.fragment(export_status, run_every=0.5 if laufend else None)(auftrag, laufend)
+
+
+def daten_export(schluessel, kennung, tabelle, dateiname):
+    #Tabellen-Export im gewählten Format; tabelle() wird erst im Auftrag aufgerufen,
+    #beim bloßen Rerun wird also weder zusammengefügt noch serialisiert.
+    from exporte import FORMATE, verfuegbare_formate
+
+    format = st.selectbox("Exportformat", verfuegbare_formate(), key=schluessel + "_format")
+    endung, mime, serialisieren = FORMATE[format]
+    export_bereich(f"{schluessel}_{format}", f"📥 {format} erzeugen", f"{kennung}-{format}",
+                   lambda fortschritt: serialisieren(tabelle(), fortschritt), dateiname + endung, mime)
+
+
+def export_status(auftrag, abfragen):
+    if not auftrag.fertig:
+        st.progress(auftrag.fortschritt, text=f"{auftrag.dateiname} wird erzeugt … {auftrag.fortschritt:.0%}")
+        return
+    if abfragen:
+        # fertig: einmal die ganze Seite neu ausführen, damit das Fragment nicht weiter abfragt
+        st.rerun()
+    if auftrag.status == "fehler":
+        st.error(f"Export fehlgeschlagen: {auftrag.fehler}")
+        return
+    st.download_button(f"📥 {auftrag.dateiname} herunterladen", data=auftrag.daten,
+                       file_name=auftrag.dateiname, mime=auftrag.mime,
+                       key=f"download_{auftrag.kennung}", on_click="ignore")
+    st.caption(f"Erzeugt in {auftrag.dauer:.1f} s")
 
 
 ## ---------------------------------------------------
@@ -133,8 +212,11 @@ class Startseite(Page):
                 st.session_state.seite = "ⓘ Impressum"
                 st.rerun()
                 
+        def vorbereiten(self):
+            self.bild = bildquelle("BildMural1.png")
+
         def render_right(self):
-            st.image("https://raw.githubusercontent.com/Mitho33/AnalyseApp1/main/TB12/BildMural1.png", caption="Mural Wuppertal", width ="stretch")
+            st.image(self.bild, caption="Mural Wuppertal", width ="stretch")
 
 # ---------------------------------------------------
 # Bilanzanalyse
@@ -143,13 +225,7 @@ class Bilanzanalyse(Page):
     def render(self):
         OneColumnLayout().render(self)
     
-    def render_body(self):
-        st.title("📊 Bilanzanalyse für 2 Jahre")
-        st.header("📥 Eingabe der Bilanzwerte")
-
-        jahre = ["Jahr 1", "Jahr 2"]
-        felder = ["AV", "UV", "EK", "LFK", "KFK"]
-
+    def render_eingabe(self):
 #         # Eingabeformular, Liste für Eingaben
 
 
@@ -191,91 +267,186 @@ class Bilanzanalyse(Page):
         eingaben.append(werte2)
 
         # --- DataFrame erzeugen ---
+        import pandas as pd
+
         df = pd.DataFrame(eingaben)
-        st.write(df)       
-        
-        st.subheader("🔢 Berechnete Kennzahlen")
-        df = berechne_kennzahlen(df)
-        
+        return df
+
+    def render_import(self):
+        # Große Bilanzdateien werden blockweise gelesen und aggregiert,
+        # das Ergebnis bleibt pro Session erhalten (kein Neuimport bei jedem Rerun).
+        from bilanzimport import aggregiere_bilanzen, lese_bilanzen
+        from kennzahlen import BILANZ_FELDER
+
+        with st.expander("📂 Bulk-Import (CSV/Parquet)"):
+            datei = st.file_uploader("Bilanzdatei hochladen", type=["csv", "parquet"])
+            pfad = st.text_input("oder Pfad auf dem Server", value="")
+            csv_format = st.radio("CSV-Format", ["Deutsch (; und ,)", "International (, und .)"], horizontal=True)
+            schluessel = st.text_input("Gruppieren nach Spalte", value="Jahr")
+
+        if datei is None and not pfad:
+            return None
+
+        if datei is not None:
+            quelle, name, kennung = datei, datei.name, (datei.name, datei.size)
+            datei.seek(0)
+        else:
+            if not os.path.isfile(pfad):
+                st.error(f"Datei '{pfad}' nicht gefunden.")
+                return None
+            quelle, name, kennung = pfad, pfad, (pfad, os.path.getmtime(pfad))
+
+        dateiformat = "parquet" if name.lower().endswith(".parquet") else "csv"
+        sep, decimal = (";", ",") if csv_format.startswith("Deutsch") else (",", ".")
+        kennung = kennung + (csv_format, schluessel)
+
+        cache = st.session_state.get("bilanz_import")
+        if cache is None or cache[0] != kennung:
+            status = st.empty()
+            try:
+                chunks = lese_bilanzen(quelle, dateiformat, sep=sep, decimal=decimal, spalten=[schluessel] + BILANZ_FELDER)
+                aggregat, statistik = aggregiere_bilanzen(
+                    chunks, schluessel,
+                    fortschritt=lambda n: status.caption(f"{n:,} Zeilen verarbeitet ...")
+                )
+            except (ValueError, OSError) as e:
+                status.empty()
+                st.error(f"Import fehlgeschlagen: {e}")
+                return None
+            status.empty()
+            cache = (kennung, aggregat, statistik)
+            st.session_state.bilanz_import = cache
+
+        _, aggregat, statistik = cache
+        st.info(
+            f"{statistik['zeilen']:,} Zeilen in {statistik['chunks']} Blöcken importiert, "
+            f"{statistik['verworfen']:,} ungültige Zeilen verworfen."
+        )
+        if aggregat.empty:
+            st.warning("Die Datei enthält keine gültigen Bilanzzeilen.")
+            return None
+        return aggregat
+
+    def render_monte_carlo(self, basis):
+        # What-if: AV/UV/EK/LFK/KFK je Szenario aus einer Verteilung ziehen (montecarlo.py),
+        # Vorbelegung ±20 % um die erste Zeile (Jahr 1 bzw. erster Importschlüssel)
+        from diagramme import histogramm_spec
+        from montecarlo import KLASSEN, PERZENTILE, VERTEILUNGEN, simuliere
+
+        with st.expander("🎲 Monte-Carlo-Simulation (What-if)"):
+            vorgaben = {"min": 0.8, "max": 1.2, "mittel": 1.0, "std": 0.1, "modus": 1.0, "wert": 1.0}
+            verteilungen = {}
+            for feld, wert in basis.items():
+                wert = float(wert)
+                wert = wert if wert == wert and wert != 0 else 100_000.0
+                spalten = st.columns([1, 2, 2, 2, 2])
+                spalten[0].write(f"**{feld}**")
+                art = spalten[1].selectbox(f"{feld} Verteilung", list(VERTEILUNGEN), key=f"mc_{feld}_art",
+                                           label_visibility="collapsed")
+                verteilungen[feld] = (art, *[
+                    spalten[2 + i].number_input(f"{feld} {name}", value=round(vorgaben[name] * wert, 2),
+                                                key=f"mc_{feld}_{name}")
+                    for i, name in enumerate(VERTEILUNGEN[art])
+                ])
+
+            spalten = st.columns(3)
+            anzahl = spalten[0].selectbox("Szenarien", [10_000, 100_000, 1_000_000], index=2,
+                                          format_func=lambda n: f"{n:,}".replace(",", "."))
+            # Blockweise: begrenzt den Speicher, Perzentile dann aus dem Histogramm
+            chunkgroesse = spalten[1].selectbox("Blockgröße", [None, 100_000, 250_000],
+                                                format_func=lambda n: "alle auf einmal (exakt)" if n is None
+                                                else f"{n:,}".replace(",", "."))
+            klassen = spalten[2].number_input("Histogrammklassen", min_value=10, max_value=200, value=KLASSEN)
+
+            if st.button("Simulation starten", key="mc_knopf"):
+                start = time.perf_counter()
+                try:
+                    ergebnis, exakt = simuliere(verteilungen, anzahl, chunkgroesse, int(klassen))
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.monte_carlo = (verteilungen, anzahl, ergebnis, exakt,
+                                                    time.perf_counter() - start)
+
+            if "monte_carlo" not in st.session_state:
+                return
+            gerechnet, anzahl, ergebnis, exakt, dauer = st.session_state.monte_carlo
+            st.caption(f"{anzahl:,}".replace(",", ".") + f" Szenarien in {dauer:.2f} s, Perzentile "
+                       + ("exakt" if exakt else "aus dem Histogramm interpoliert")
+                       + ("" if gerechnet == verteilungen else " – Eingaben seitdem geändert, erneut starten"))
+
+            import pandas as pd
+
+            tabelle = pd.DataFrame([
+                {"Kennzahl": name, **{f"P{p}": w for p, w in r["perzentile"].items()},
+                 "Mittelwert": r["mittel"], "Std.-Abw.": r["std"], "Ungültig": r["ungueltig"]}
+                for name, r in ergebnis.items()
+            ])
+            st.dataframe(tabelle.round(2), hide_index=True)
+
+            backend = diagramm_backend()
+            spalten = st.columns(3)
+            for i, (name, r) in enumerate(ergebnis.items()):
+                zaehler, kanten = r["histogramm"]
+                markierungen = {f"P{p}": r["perzentile"][p] for p in (PERZENTILE[0], 50, PERZENTILE[-1])
+                                if p in r["perzentile"]}
+                with spalten[i % 3]:
+                    backend.zeichnen(histogramm_spec(kanten, zaehler, name, markierungen=markierungen))
+
+    def render_body(self):
+        from bericht import tabellen_pdf
+        from diagramme import MatplotlibBackend, balken_spec
+        from exporte import inhalts_hash
+
+        st.title("📊 Bilanzanalyse für 2 Jahre")
+        st.header("📥 Eingabe der Bilanzwerte")
+
+        felder = ["AV", "UV", "EK", "LFK", "KFK"]
+
+        # --- Bulk-Import (CSV/Parquet), ersetzt bei Bedarf die manuelle Eingabe ---
+        df = self.render_import()
+
+        if df is None:
+            df = self.render_eingabe()
+            st.write(df)
+
+            st.subheader("🔢 Berechnete Kennzahlen")
+            df = berechne_kennzahlen(df)
+        else:
+            # erste Spalte des Aggregats ist der verwendete Gruppierungsschlüssel
+            st.subheader(f"🔢 Berechnete Kennzahlen (Durchschnitt je {df.columns[0]})")
+
         st.write(df)
        
  
 
-        # CSV in Speicher erzeugen
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-
-        st.download_button(
-            label="📥 CSV herunterladen",
-            data=csv_buffer.getvalue(),  # <-- getvalue() liefert str
-            file_name="bilanzanalyse.csv",
-            mime="text/csv"
-        )
+        # Export (CSV/Parquet/Arrow/Excel) erst auf Anforderung, im Hintergrund
+        daten_export("bilanz_daten", inhalts_hash("bilanz", df), lambda: df, "bilanzanalyse")
 
         
 
   
         
-        st.subheader("📊 Balkendiagramm: Jahr 1 vs Jahr 2")
-        # Balkenpositionen
-        x = np.arange(len(felder))
-        breite = 0.35
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-
-        # Balken für Jahr 1 (rot)
-        ax.bar(x - breite/2, df.loc[df["Jahr"] == "Jahr 1", felder].values[0],
-               width=breite, color='red', label='Jahr 1')
-
-        # Balken für Jahr 2 (blau)
-        ax.bar(x + breite/2, df.loc[df["Jahr"] == "Jahr 2", felder].values[0],
-               width=breite, color='blue', label='Jahr 2')
-
-        # Achsen & Titel
-        ax.set_xticks(x)
-        ax.set_xticklabels(felder)
-        ax.set_ylabel("Wert")
-        ax.set_title("Bilanzpositionen Jahr 1 vs Jahr 2")
-        ax.legend()
-        ax.grid(axis='y', linestyle='--', alpha=0.5)
-
-        st.pyplot(fig)
-  
-        
+        # Eine Balkengruppe je Zeile (manuell: Jahr 1 / Jahr 2, Import: je Schlüssel, max. 10)
+        zeilen = df.head(10)
+        labels = [str(v) for v in zeilen.iloc[:, 0]]
+        st.subheader("📊 Balkendiagramm: " + " vs ".join(labels[:3]) + (" ..." if len(labels) > 3 else ""))
+        # Darstellung über das gewählte Diagramm-Backend (Browser oder Server-PNG aus dem Cache)
+        spec = balken_spec(labels, felder, zeilen[felder].to_numpy(dtype=float),
+                           "Bilanzpositionen " + " vs ".join(labels[:3]))
+        diagramm_backend().zeichnen(spec)
+
+        self.render_monte_carlo(zeilen[felder].iloc[0].to_dict())
+
         # PDF Export
         st.header("📄 Export als PDF")
 
-        if st.button("PDF erzeugen"):
-            # Buffer für PDF im Speicher
-            buffer = io.BytesIO()
-
-            with PdfPages(buffer) as pdf:
-                # Tabelle
-                fig_table, ax = plt.subplots(figsize=(14, 5))
-                ax.axis("off")
-                table = ax.table(cellText=df.values,
-                                 colLabels=df.columns,
-                                 loc="center")
-                table.scale(1.2, 1.3)
-                pdf.savefig(fig_table)
-                plt.close(fig_table)
-
-                # Diagramm
-                fig.set_size_inches(14, 5)
-                pdf.savefig(fig)
-
-            buffer.seek(0)  # zum Anfang des Buffers
-
-    # Download-Button
-            st.download_button(
-                label="📥 PDF herunterladen",
-                data=buffer,
-                file_name="Bilanzanalyse.pdf",
-                mime="application/pdf"
-                )
-
-            st.success("PDF steht nun zum Download bereit!")
+        # Tabelle seitenweise (Kopfzeile auf jeder Seite), danach das Diagramm
+        export_bereich("bilanz_pdf", "PDF erzeugen", inhalts_hash("bilanz-pdf", df, spec["werte"], spec["labels"]),
+                       lambda fortschritt: tabellen_pdf(
+                           df, "Bilanzanalyse", figuren=[MatplotlibBackend().figur(spec, groesse=(14, 5))],
+                           fortschritt=fortschritt),
+                       "Bilanzanalyse.pdf", "application/pdf")
 
 
 
@@ -301,33 +472,106 @@ class Bilanzanalyse(Page):
 class Ergebnisrechnung(Page):
     def render(self):
         OneColumnLayout().render(self)
+
+    @staticmethod
+    def editor_geaendert():
+        # Callback des Dateneditors: nur die gemeldeten Zelländerungen verrechnen
+        st.session_state.ergebnis_summen.anwenden(st.session_state.ergebnis_editor["edited_rows"])
     
+    def render_journal_import(self):
+        # Ein Buchungsjournal wird blockweise gelesen und je Konto verdichtet; das Ergebnis
+        # ersetzt die Eingabetabelle. Neu verdichtet wird nur bei anderer Datei/Einstellung,
+        # danach im Editor vorgenommene Änderungen bleiben also über Reruns erhalten.
+        from journal import Kontenzuordnung, lese_journal, verdichte_journal
+
+        with st.expander("📂 Buchungsjournal importieren (CSV/Parquet)"):
+            datei = st.file_uploader("Journal hochladen", type=["csv", "parquet"])
+            pfad = st.text_input("oder Pfad auf dem Server", value="")
+            zuordnung_datei = st.file_uploader(
+                "Kontenzuordnung (CSV mit von; bis; Kontoname; Faktor je Spalte) – ohne Datei: Standard (IKR)",
+                type=["csv"]
+            )
+            csv_format = st.radio("CSV-Format", ["Deutsch (; und ,)", "International (, und .)"], horizontal=True)
+            c1, c2 = st.columns(2)
+            konto = c1.text_input("Spalte Kontonummer", value="Konto")
+            betrag = c2.text_input("Spalte Betrag", value="Betrag")
+
+        if datei is None and not pfad:
+            return
+
+        if datei is not None:
+            quelle, name, kennung = datei, datei.name, (datei.name, datei.size)
+            datei.seek(0)
+        else:
+            if not os.path.isfile(pfad):
+                st.error(f"Datei '{pfad}' nicht gefunden.")
+                return
+            quelle, name, kennung = pfad, pfad, (pfad, os.path.getmtime(pfad))
+
+        dateiformat = "parquet" if name.lower().endswith(".parquet") else "csv"
+        sep, decimal = (";", ",") if csv_format.startswith("Deutsch") else (",", ".")
+        kennung = kennung + (csv_format, konto, betrag,
+                             zuordnung_datei and (zuordnung_datei.name, zuordnung_datei.size))
+
+        cache = st.session_state.get("journal_import")
+        if cache is None or cache[0] != kennung:
+            status = st.empty()
+            try:
+                zuordnung = None
+                if zuordnung_datei is not None:
+                    zuordnung_datei.seek(0)
+                    zuordnung = Kontenzuordnung.lesen(zuordnung_datei, sep=sep, decimal=decimal)
+                chunks = lese_journal(quelle, dateiformat, sep=sep, decimal=decimal, spalten=[konto, betrag])
+                tabelle, statistik = verdichte_journal(
+                    chunks, zuordnung, konto, betrag,
+                    fortschritt=lambda n: status.caption(f"{n:,} Buchungen verarbeitet ...")
+                )
+            except (ValueError, OSError) as e:
+                status.empty()
+                st.error(f"Import fehlgeschlagen: {e}")
+                return
+            status.empty()
+            cache = (kennung, statistik)
+            st.session_state.journal_import = cache
+            # neue Basistabelle; alte Editor-Änderungen beziehen sich auf die vorige
+            st.session_state.ergebnis_df = tabelle
+            st.session_state.pop("ergebnis_editor", None)
+
+        _, statistik = cache
+        st.info(
+            f"{statistik['zeilen']:,} Buchungen in {statistik['chunks']} Blöcken verdichtet, "
+            f"{statistik['verworfen']:,} ungültige Zeilen verworfen."
+        )
+        if statistik["unzugeordnet"]:
+            st.warning(
+                f"{statistik['unzugeordnet']:,} Buchungen ({statistik['unzugeordnet_betrag']:,.2f}) auf Konten "
+                f"ohne Zuordnung, z. B. {', '.join(map(str, statistik['unbekannte_konten'][:10]))}."
+            )
+
     def render_body(self):
+        import pandas as pd
+        from bericht import tabellen_pdf
+        from ergebnis import LaufendeSummen, leere_ergebnistabelle, summen_tabelle
+        from exporte import inhalts_hash
+
         st.title("📑 Ergebnisrechnung (RKI / RKII / Betriebsergebnis)")
 
         # -----------------------------------
         # Initialisierung DataFrame
         # -----------------------------------
         if "ergebnis_df" not in st.session_state:
-            st.session_state.ergebnis_df = pd.DataFrame({
-                "Kontoname": ["" for _ in range(20)],
-
-                # RKI
-                "Aufwand": [0.0]*20,
-                "Ertrag": [0.0]*20,
-
-                # RKII – Unternehmensbezogene Abgrenzung
-                "Neutrale Aufwendungen": [0.0]*20,
-                "Neutrale Erträge": [0.0]*20,
+            st.session_state.ergebnis_df = leere_ergebnistabelle(20)
 
-                # RKII – Kostenrechnerische Korrekturen
-                "Betriebliche Aufwendungen": [0.0]*20,
-                "Verrechnete Kosten": [0.0]*20,
+        self.render_journal_import()
 
-                # Betriebsergebnisrechnung
-                "Kosten": [0.0]*20,
-                "Leistung": [0.0]*20,
-            })
+        # Laufende Summen/Salden gehören zur aktuellen Basistabelle des Editors
+        summen = st.session_state.get("ergebnis_summen")
+        if summen is None or summen.basis is not st.session_state.ergebnis_df:
+            summen = LaufendeSummen(st.session_state.ergebnis_df)
+            st.session_state.ergebnis_summen = summen
+        # Nach einem Seitenwechsel ist der Editorzustand verworfen, die Summen nicht
+        editor = st.session_state.get("ergebnis_editor")
+        summen.abgleichen(editor["edited_rows"] if editor else None)
 
         # -----------------------------------
         # Mehrzeiliger Tabellenkopf
@@ -368,41 +612,34 @@ class Ergebnisrechnung(Page):
             st.session_state.ergebnis_df,
             num_rows="fixed",
             width="stretch",                     #ersetzt use_container_width=True, For `use_container_width=False`, use `width='content'
-            hide_index=True
+            hide_index=True,
+            key="ergebnis_editor",
+            on_change=self.editor_geaendert
         )
 
-        # -----------------------------------
-        # Summen je Spalte
-        # -----------------------------------
-        sums = df.sum(numeric_only=True)
+        # Vollberechnung als Konsistenzprüfung der laufenden Summen
+        if st.button("🔄 Summen vollständig prüfen"):
+            if summen.pruefen(df):
+                st.success("Laufende Summen stimmen mit der Vollberechnung überein.")
+            else:
+                st.warning("Abweichung gefunden – Summen wurden neu berechnet.")
 
         # -----------------------------------
-        # Salden / Ergebnisse
+        # Summen je Spalte / Salden
+        # (laufend aus den geänderten Zellen aktualisiert, siehe editor_geaendert)
         # -----------------------------------
-        saldo_rki = sums["Ertrag"] - sums["Aufwand"]
-        saldo_neutral = sums["Neutrale Erträge"] - sums["Neutrale Aufwendungen"]
-        saldo_korrektur = sums["Verrechnete Kosten"] - sums["Betriebliche Aufwendungen"]
-        betriebsergebnis = sums["Leistung"] - sums["Kosten"]
-
-        produktivitaet = sums["Leistung"] / sums["Kosten"] if sums["Kosten"] != 0 else 0
-        ebit = betriebsergebnis
+        sums = summen.sums
+        saldo_rki = summen.salden["saldo_rki"]
+        betriebsergebnis = summen.salden["betriebsergebnis"]
+        produktivitaet = summen.salden["produktivitaet"]
+        ebit = summen.salden["ebit"]
 
         # -----------------------------------
         # Summen & Salden Tabelle
         # -----------------------------------
         st.subheader("🔢 Summen & Salden")
 
-        summary_df = pd.DataFrame({
-            "": ["Summe", "Saldo / Ergebnis"],
-            "Aufwand": [sums["Aufwand"], -saldo_rki],
-            "Ertrag": [sums["Ertrag"], saldo_rki],
-            "Neutrale Aufwendungen": [sums["Neutrale Aufwendungen"], -saldo_neutral],
-            "Neutrale Erträge": [sums["Neutrale Erträge"], saldo_neutral],
-            "Betriebliche Aufwendungen": [sums["Betriebliche Aufwendungen"], -saldo_korrektur],
-            "Verrechnete Kosten": [sums["Verrechnete Kosten"], saldo_korrektur],
-            "Kosten": [sums["Kosten"], -betriebsergebnis],
-            "Leistung": [sums["Leistung"], betriebsergebnis],
-        })
+        summary_df = summen_tabelle(sums, summen.salden)
 
         st.dataframe(summary_df, use_container_width=True)
 
@@ -418,73 +655,53 @@ class Ergebnisrechnung(Page):
         c4.metric("EBIT", f"{ebit:,.2f}")
 
         # -----------------------------------
-        # CSV Export
+        # Daten-Export (CSV/Parquet/Arrow/Excel)
         # -----------------------------------
-        csv_buffer = io.StringIO()
-        export_df = pd.concat([df, summary_df], ignore_index=True)
-        export_df.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-
-        st.download_button(
-            "📥 CSV herunterladen",
-            data=csv_buffer.getvalue(),
-            file_name="Ergebnisrechnung_mit_Summen_und_Salden.csv",
-            mime="text/csv"
-        )
+        # Zusammenfügen und Serialisieren erst im Export-Auftrag
+        kennung = inhalts_hash("ergebnis", df, summary_df)
+
+        def export_df():
+            return pd.concat([df, summary_df], ignore_index=True)
+
+        daten_export("ergebnis_daten", kennung, export_df, "Ergebnisrechnung_mit_Summen_und_Salden")
 
         # -----------------------------------
         # PDF Export
         # -----------------------------------
-        if st.button("📄 PDF erzeugen"):
-            buffer = io.BytesIO()
-
-            with PdfPages(buffer) as pdf:
-                fig, ax = plt.subplots(figsize=(18, 6))
-                ax.axis("off")
-                table = ax.table(
-                    cellText=export_df.fillna("").values,
-                    colLabels=export_df.columns,
-                    loc="center"
-                )
-                table.scale(1, 1.2)
-                pdf.savefig(fig)
-                plt.close(fig)
-
-            buffer.seek(0)
-
-            st.download_button(
-                "📥 PDF herunterladen",
-                data=buffer,
-                file_name="Ergebnisrechnung_mit_Summen_und_Salden.pdf",
-                mime="application/pdf"
-            )
+        export_bereich("ergebnis_pdf", "📄 PDF erzeugen", kennung + "-pdf",
+                       lambda fortschritt: tabellen_pdf(export_df(), "Ergebnisrechnung mit Summen und Salden",
+                                                        fortschritt=fortschritt),
+                       "Ergebnisrechnung_mit_Summen_und_Salden.pdf", "application/pdf")
 
 
 # ---------------------------------------------------
 # Linkliste
 # ---------------------------------------------------
 class Linkliste(Page):
+    LINKS = {
+        "YoutubeKanal Michael Thomas": "https://m.youtube.com/channel/UC11vJSbmGWmNe0qJhtTu9hA",
+        "GitHub Michael Thomas":"https://github.com/Mitho33",
+        "Unternehmensregister": "https://www.unternehmensregister.de/de",
+        "Bundesanzeiger": "https://www.bundesanzeiger.de",
+        "Statistisches Bundesamt": "https://www.destatis.de",            
+        "Finanzlexikon": "https://www.finance-magazin.de"
+    }
+
     def render(self):
         
         TwoColumnLayout().render(self) 
       
+    def vorbereiten(self):
+        # ein Markdown-Block statt einem Element je Link
+        self.links_markdown = "\n\n".join(f"🔹 **[{name}]({url})**" for name, url in self.LINKS.items())
+        self.bild = bildquelle("Kunst1.jpg")
         
     def render_left(self):
         st.title("🔗 Nützliche Links")
+        st.markdown(self.links_markdown)
 
-        links = {
-            "YoutubeKanal Michael Thomas": "https://m.youtube.com/channel/UC11vJSbmGWmNe0qJhtTu9hA",
-            "GitHub Michael Thomas":"https://github.com/Mitho33",
-            "Unternehmensregister": "https://www.unternehmensregister.de/de",
-            "Bundesanzeiger": "https://www.bundesanzeiger.de",
-            "Statistisches Bundesamt": "https://www.destatis.de",            
-            "Finanzlexikon": "https://www.finance-magazin.de"
-        }
-
-        for name, url in links.items():
-            st.markdown(f"🔹 **[{name}]({url})**")
     def render_right(self):
-        st.image("https://raw.githubusercontent.com/Mitho33/AnalyseApp1/main/TB12/Kunst1.jpg", width ="stretch")
+        st.image(self.bild, width ="stretch")
 
 
 
@@ -492,99 +709,186 @@ class Linkliste(Page):
 # Weitere Anwendung
 # ---------------------------------------------------
 class Indizes(Page):
-    
+    VERLAUF_KAPAZITAET = 50    # so viele Punkte zeigt die Live-Ansicht, ältere liefert der Tick-Speicher
+    TAG_NS = 24 * 3600 * 10**9
+    RASTER_NS = 30 * 10**9
+    ZEITRAEUME = {"Live": None, "1 Tag": TAG_NS, "1 Woche": 7 * TAG_NS, "1 Monat": 31 * TAG_NS,
+                  "1 Jahr": 365 * TAG_NS, "10 Jahre": 3652 * TAG_NS}
+
     def render(self):
         OneColumnLayout().render(self)
+
+    def historie_mit_ticks(self, historien, speicher, ticker, von, bis):
+        # Intervall passend zum Zeitraum; gelesen wird nur der lokale Cache,
+        # das Nachladen läuft im Hintergrund und erscheint beim nächsten Rerun
+        import numpy as np
+
+        spanne = bis - von
+        intervall = "5m" if spanne <= 7 * self.TAG_NS else "1h" if spanne <= 31 * self.TAG_NS else "1d"
+        historien.aktualisieren_im_hintergrund(ticker, intervall)
+        hist = historien.lesen(ticker, intervall)
+        zeiten = hist["zeit"].to_numpy()
+        werte = hist["kurs"].to_numpy()
+        maske = zeiten >= von
+        zeiten, werte = zeiten[maske], werte[maske]
+
+        # jüngere Live-Ticks aus dem Tick-Speicher anhängen
+        ab = int(zeiten[-1]) + 1 if len(zeiten) else bis + 1
+        tick_zeiten, tick_werte = speicher.abfragen(ticker, ab, bis)
+        return np.concatenate([zeiten, tick_zeiten]), np.concatenate([werte, tick_werte])
     
     def render_body(self):
+        from marktdaten import INDIZES, kurs_cache
+        from ringpuffer import Ringpuffer
+        from tickspeicher import tick_speicher
+
         st.title("🧩 Indizes")   
         #st.set_page_config(page_title="Live Börsenindizes", layout="wide")
 
         # -----------------------------
-        # Session State initialisieren
+        # Ticker: Standard-Indizes + weitere Ticker der Session (geprüft, laufen im
+        # Kurs-Cache ohne erneute Anmeldung aus, siehe KursCache.abonnieren)
         # -----------------------------
-        if "zeiten" not in st.session_state:
-            st.session_state.zeiten = []
-        if "dax" not in st.session_state:
-            st.session_state.dax = []
-        if "dow" not in st.session_state:
-            st.session_state.dow = []
-        if "shanghai" not in st.session_state:
-            st.session_state.shanghai = []
-        if "last_update" not in st.session_state:
-            st.session_state.last_update = 0
-
+        cache = kurs_cache()
+        extra = st.sidebar.text_input("Weitere Ticker (kommagetrennt)", value="")
+        zusatz, abgelehnt = cache.abonnieren([t.strip().upper() for t in extra.split(",") if t.strip()],
+                                             sitzung_kennung())
+        if abgelehnt:
+            st.sidebar.warning(f"Nicht übernommen (Format, nicht freigegeben oder mehr als "
+                               f"{cache.zusatz_max}): {', '.join(abgelehnt)}")
+        namen = {ticker: name for name, ticker in INDIZES.items()}
+        for t in zusatz:
+            namen.setdefault(t, t)
+        ticker = list(namen)
 
-        # --------------------------------------
-        # Funktion zum Abrufen der Kursdaten
-        # --------------------------------------
-        def get_index_value(ticker):
-            try:
-                return yf.Ticker(ticker).info.get("regularMarketPrice", None)
-            except:
-                return None
+        # -----------------------------
+        # Session State initialisieren
+        # -----------------------------
+        # Verlauf je Ticker als Ringpuffer fester Größe (älteste Punkte fallen heraus),
+        # beim Anlegen (auch nach dem Verdrängen aus einer inaktiven Session) mit den
+        # letzten Ticks aus dem gemeinsamen Tick-Speicher gefüllt; float32 reicht zur Anzeige
+        speicher = tick_speicher()
+        if "kursverlauf" not in st.session_state:
+            st.session_state.kursverlauf = {}
+        for t in ticker:
+            if t not in st.session_state.kursverlauf:
+                verlauf = Ringpuffer(self.VERLAUF_KAPAZITAET, dtype="float32")
+                verlauf.erweitern(*speicher.letzte(t, self.VERLAUF_KAPAZITAET))
+                st.session_state.kursverlauf[t] = verlauf
 
 
         # --------------------------------------
-        # Live Daten aktualisieren (alle 30s)
+        # Streamlit Oberfläche
         # --------------------------------------
-        now_ts = time.time()
-        if now_ts - st.session_state.last_update > 30:   # alle 30 Sekunden
-            now = datetime.now().strftime("%H:%M:%S")
+        st.title("📈 Live-Indizes: " + ", ".join(list(namen.values())[:-1]) + " & " + list(namen.values())[-1])
+        st.write(f"Automatische Aktualisierung alle {cache.ttl:g} Sekunden")
 
-            dax = get_index_value("^GDAXI")
-            dow = get_index_value("^DJI")
-            shanghai = get_index_value("000001.SS")
+        # Nur der Live-Bereich läuft im Takt des Kurs-Caches neu (st.fragment),
+        # Sidebar, CSS und die übrigen Seitenelemente bleiben unberührt.
+        st.fragment(self.render_live, run_every=cache.ttl)(ticker, namen, speicher, cache)
 
-            if dax and dow and shanghai:
-                st.session_state.zeiten.append(now)
-                st.session_state.dax.append(dax)
-                st.session_state.dow.append(dow)
-                st.session_state.shanghai.append(shanghai)
+    def render_live(self, ticker, namen, speicher, cache):
+        import math
 
-            st.session_state.last_update = now_ts
-            st.rerun()
+        import pandas as pd
+        from diagramme import linien_spec
+        from historie import historien_cache
+        from tickspeicher import lttb
 
+        from ringpuffer import Ringpuffer
 
+        cpu_start = time.thread_time()
+        render_start = time.perf_counter()
+        sitzung_melden()   # Fragment-Läufe zählen als Aktivität
+        cache.abonnieren(ticker, sitzung_kennung())   # Abo der Zusatz-Ticker verlängern
 
         # --------------------------------------
-        # Streamlit Oberfläche
+        # Live Daten aus dem prozessweiten Kurs-Cache übernehmen
+        # (ein Hintergrund-Thread aktualisiert alle 30s, hier wird nie auf das Netz gewartet).
+        # Jeder Ticker wird einzeln fortgeschrieben, ein fehlender Kurs hält die anderen nicht auf.
         # --------------------------------------
-        st.title("📈 Live-Indizes: DAX, Dow Jones & Shanghai Composite")
-        st.write("Automatische Aktualisierung alle 30 Sekunden")
+        for t, (zeitstempel, kurs) in cache.lesen(ticker).items():
+            verlauf = st.session_state.kursverlauf[t]
+            zeit_ns = int(zeitstempel * 1e9)
+            if zeit_ns > verlauf.letzte_zeit:
+                verlauf.anhaengen(zeit_ns, kurs)
 
-        zeiten = st.session_state.zeiten[-50:]  # nur letzte 50 Werte
-        dax = st.session_state.dax[-50:]
-        dow = st.session_state.dow[-50:]
-        shanghai = st.session_state.shanghai[-50:]
+        # Live = letzte 50 Punkte der Session, sonst Historie (Festplatten-Cache, im Hintergrund
+        # nachgeladen) ergänzt um die jüngeren Ticks, bzw. verdichtete Reihe aus dem Tick-Speicher
+        zeitraum = st.radio("Zeitraum", list(self.ZEITRAEUME), horizontal=True)
+        historien = historien_cache()
 
-        # -----------------------------
-        # Layout: 1 Zeile, 3 Spalten
-        # -----------------------------
-        col1, col2, col3 = st.columns(3)
+        # SMA/EMA/Volatilität/Drawdown rechnet der Kurs-Cache einmal für alle Sessions mit jedem Tick
+        indikatoren = cache.indikatoren
+        einblenden = st.toggle("SMA/EMA einblenden", value=True) and indikatoren is not None
 
         # -----------------------------
-        # Diagramme
+        # Diagramme (Backend aus der Sidebar, siehe diagramme.py)
         # -----------------------------
-        def plot_line(x, y, title, color):
-            fig, ax = plt.subplots(figsize=(5, 3))
-            ax.plot(x, y, marker="o", color=color)
-            ax.set_title(title)
-            ax.set_xlabel("Zeit")
-            ax.set_ylabel("Indexstand")
-            ax.grid(True)
-            plt.xticks(rotation=45)
-            st.pyplot(fig)
+        backend = diagramm_backend()
 
+        def plot_line(x, y, title, color, band=None, linien=()):
+            backend.zeichnen(linien_spec(x, y, title, color, band, linien))
 
-        with col1:
-            plot_line(zeiten, dax, "DAX", "blue")
 
-        with col2:
-            plot_line(zeiten, dow, "Dow Jones", "green")
+        # -----------------------------
+        # Layout: Zeilen mit je 3 Spalten
+        # -----------------------------
+        farben = ["blue", "green", "red", "orange", "purple", "brown"]
+        for start in range(0, len(ticker), 3):
+            spalten = st.columns(3)
+            for i, t in enumerate(ticker[start:start + 3]):
+                band = None
+                if self.ZEITRAEUME[zeitraum] is None:
+                    zeiten, werte = st.session_state.kursverlauf[t].letzte()  # nur letzte 50 Werte
+                else:
+                    bis = time.time_ns() // self.RASTER_NS * self.RASTER_NS  # Raster -> Cache-Treffer im Tick-Speicher
+                    von = bis - self.ZEITRAEUME[zeitraum]
+                    zeiten, werte = self.historie_mit_ticks(historien, speicher, t, von, bis)
+                    if len(zeiten):
+                        auswahl = lttb(zeiten, werte, 300)
+                        zeiten, werte = zeiten[auswahl], werte[auswahl]
+                    else:
+                        reihe = speicher.verdichtet(t, von, bis, punkte=300)
+                        zeiten, werte, band = reihe["zeit"], reihe["last"], (reihe["min"], reihe["max"])
+                linien = []
+                if einblenden and len(zeiten):
+                    for name, (z, w) in indikatoren.reihen(t, int(zeiten[0]), ["SMA", "EMA"]).items():
+                        schritt = max(1, len(z) // 300)
+                        linien.append((name, z[::schritt], w[::schritt]))
+                with spalten[i]:
+                    plot_line(zeiten, werte, namen[t], farben[(start + i) % len(farben)], band, linien)
+                    aktuell = indikatoren.aktuell(t) if indikatoren is not None else {}
+                    if aktuell:
+                        # Volatilität ist NaN, solange weniger als zwei Renditen vorliegen: „–“ statt „nan“
+                        def wert(name, format):
+                            return format.format(aktuell[name]) if math.isfinite(aktuell[name]) else "–"
+                        st.caption(
+                            f"SMA {wert('SMA', '{:,.2f}')} · EMA {wert('EMA', '{:,.2f}')} · "
+                            f"Volatilität {wert('Volatilität (%)', '{:.3f} %')} · "
+                            f"Drawdown {wert('Drawdown (%)', '{:.2f} %')}"
+                        )
 
-        with col3:
-            plot_line(zeiten, shanghai, "Shanghai Composite", "red")
+        # -----------------------------
+        # Abrufstatistik je Ticker (Latenz, Versuche, Fehler)
+        # -----------------------------
+        with st.expander("⏱️ Abrufstatistik"):
+            status = {t: cache.status[t] for t in ticker if t in cache.status}
+            if status:
+                st.dataframe(pd.DataFrame.from_dict(status, orient="index"), width="stretch")
+            else:
+                st.write("Noch kein Abruf abgeschlossen.")
+
+        # CPU-Zeit dieses Fragment-Laufs (Thread der Session) für den Vergleich mit einem Voll-Rerun
+        cpu_ms = (time.thread_time() - cpu_start) * 1000
+        laeufe = st.session_state.setdefault("indizes_cpu_ms", Ringpuffer(100, dtype="float32"))
+        laeufe.anhaengen(time.time_ns(), cpu_ms)
+        render_statistik.erfassen(self.name, "Live-Fragment", (time.perf_counter() - render_start) * 1000)
+        voll = st.session_state.get("skript_cpu_ms")
+        st.caption(
+            f"CPU je Aktualisierung: {cpu_ms:.0f} ms (Ø {laeufe.letzte()[1].mean():.0f} ms über {len(laeufe)} Läufe)"
+            + (f", letzter Voll-Rerun: {voll:.0f} ms" if voll is not None else "")
+        )
 
 
 class Impressum(Page):
@@ -633,8 +937,11 @@ class Impressum(Page):
 
                     """)
 
+    def vorbereiten(self):
+        self.bild = bildquelle("TOM26.png", 250)
+
     def render_right(self):
-        st.image("https://raw.githubusercontent.com/Mitho33/AnalyseApp1/main/TB12/TOM26.png", width = 250)
+        st.image(self.bild, width = 250)
 
 
 # ---------------------------------------------------
@@ -655,12 +962,14 @@ class PageFactory:
         page_class = cls._pages.get(name)
         if page_class is None:
             raise ValueError(f"Seite '{name}' ist nicht bekannt.")
-        return page_class()
+        # Instanzen (samt vorbereiteter Inhalte) werden wiederverwendet, bis TB11.py geändert wird
+        return seiten_register.holen(name, page_class, os.path.getmtime(__file__))
 
 
 # ---------------------------------------------------
 # Streamlit Hauptprogramm
 # ---------------------------------------------------
+skript_cpu_start = time.thread_time()
 st.set_page_config(page_title="Bilanzanalyse", layout="wide")
 
 # CSS einfügen, um Hamburger-Menü rot und größer zu färben
@@ -678,9 +987,9 @@ st.markdown(
 )
 
 
-# Sidebar-Logo
+# Sidebar-Logo (lokal, verkleinert als WebP, siehe bilder.py)
 st.sidebar.image(
-    "https://raw.githubusercontent.com/Mitho33/AnalyseApp1/main/TB12/LogoMT.png",
+    bildquelle("LogoMT.png", 120),
     width=120
 )
 
@@ -700,10 +1009,34 @@ wahl = st.sidebar.radio(
 )
 st.session_state.seite = wahl
 
+# Diagramme im Browser zeichnen (nur Daten übertragen) oder serverseitig als PNG
+from diagramme import BACKENDS, STANDARD_BACKEND
+
+st.sidebar.radio(
+    "Diagramme:",
+    list(BACKENDS),
+    index=list(BACKENDS).index(STANDARD_BACKEND),
+    key="diagramm_backend"
+)
+
 
 # Seite rendern
+sitzung_melden()
 seite_obj = PageFactory.create(wahl)
-seite_obj.render()
+with render_statistik.messen(wahl):
+    seite_obj.render()
+
+# Render-Zeiten je Seite, nur mit ?admin=1 in der URL
+if st.query_params.get("admin") == "1":
+    with st.sidebar.expander("⏱️ Render-Zeiten"):
+        st.dataframe(render_statistik.zusammenfassung(), hide_index=True)
+    with st.sidebar.expander("🧠 Speicher je Session"):
+        st.dataframe(sitzungs_register.bericht(), hide_index=True)
+        st.caption(f"Inaktiv ab {sitzungs_register.leerlauf_s:g} s, bisher {sitzungs_register.verdraengt} "
+                   f"Einträge verdrängt ({', '.join(sitzungs_register.verdraengbar)})")
+
+# CPU-Zeit des kompletten Skriptlaufs (Vergleichswert für Fragment-Aktualisierungen)
+st.session_state.skript_cpu_ms = (time.thread_time() - skript_cpu_start) * 1000
 
 
 
@@ -0,0 +1,330 @@
+"""
+Batch-Modus: Bilanz- und Ergebnisdateien eines Verzeichnisses ohne Oberfläche auswerten.
+
+Jede Eingabedatei (CSV oder Parquet) wird anhand ihrer Spalten erkannt:
+Bilanzdateien (AV, UV, EK, LFK, KFK, beliebige weitere Spalten wie
+Unternehmen/Jahr) bekommen die Kennzahlspalten angehängt, Ergebnisdateien
+(Kontoname und die Betragsspalten der Ergebnisrechnung) die Zeilen
+'Summe' und 'Saldo / Ergebnis'. Gerechnet wird mit denselben Modulen wie
+in TB11.py (``kennzahlen``, ``ergebnis``), Streamlit wird nicht geladen.
+
+Die Arbeit wird auf einen Prozesspool verteilt: eine Aufgabe je Datei,
+große Bilanzdateien zusätzlich je Block (Parquet: je Row-Group-Block,
+CSV: je Byte-Bereich an Zeilengrenzen; Ausgabe dann als Verzeichnis mit
+einem Teil je Block). Bilanzdateien werden blockweise gelesen und
+geschrieben, im Speicher liegt nie die ganze Datei. Zeilen mit fehlenden
+oder nicht numerischen Bilanzwerten werden wie beim Import in TB11.py
+verworfen. Zum Schluss entsteht ``zusammenfassung.csv`` mit einer Zeile je
+Aufgabe (Zeilen, verworfene Zeilen, Dauer, Fehler, bei Ergebnisdateien die
+Salden).
+
+Aufruf:
+  python TB12/batch.py eingang/ ausgang/
+  python TB12/batch.py eingang/ ausgang/ --worker 16 --format parquet
+  python TB12/StartTB11.py batch eingang/ ausgang/
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from bilanzimport import CHUNKGROESSE, lese_bilanzen
+from ergebnis import BETRAGS_SPALTEN, ergebnis_tabelle
+from kennzahlen import BILANZ_FELDER, kennzahlen_tabelle
+
+ENDUNGEN = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+# Ab so vielen Row-Groups wird eine Parquet-Datei auf mehrere Aufgaben verteilt
+ROW_GROUPS_JE_AUFGABE = 4
+# Ab dieser Größe wird eine CSV-Bilanzdatei in Byte-Bereiche je Aufgabe zerlegt
+# (setzt voraus, dass Felder keine Zeilenumbrüche enthalten)
+CSV_BYTES_JE_AUFGABE = 64 * 2**20
+
+
+# ---------------------------------------------------
+# Eingaben erkennen und in Aufgaben zerlegen
+# ---------------------------------------------------
+def spalten_der_datei(pfad, format, sep=";"):
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(pfad).schema_arrow.names
+    return list(pd.read_csv(pfad, sep=sep, nrows=0).columns)
+
+
+def erkenne_art(spalten):
+    """'bilanz', 'ergebnis' oder ``None`` anhand der vorhandenen Spalten."""
+    if all(f in spalten for f in BILANZ_FELDER):
+        return "bilanz"
+    if "Kontoname" in spalten and all(s in spalten for s in BETRAGS_SPALTEN):
+        return "ergebnis"
+    return None
+
+
+def csv_bereiche(pfad, bytes_je_aufgabe=CSV_BYTES_JE_AUFGABE):
+    """Byte-Bereiche (start, ende) hinter der Kopfzeile, jeweils an Zeilenanfängen ausgerichtet."""
+    groesse = os.path.getsize(pfad)
+    with open(pfad, "rb") as f:
+        f.readline()
+        grenzen = [f.tell()]
+        while grenzen[-1] + bytes_je_aufgabe < groesse:
+            f.seek(grenzen[-1] + bytes_je_aufgabe)
+            f.readline()   # Rest der angeschnittenen Zeile gehört zum vorherigen Bereich
+            if f.tell() >= groesse:
+                break
+            grenzen.append(f.tell())
+    grenzen.append(groesse)
+    return list(zip(grenzen[:-1], grenzen[1:]))
+
+
+def aufgaben(eingang, sep=";", row_groups=ROW_GROUPS_JE_AUFGABE, csv_bytes=CSV_BYTES_JE_AUFGABE):
+    """
+    Liste von Aufgaben (Dicts mit datei, format, art, spalten, row_groups, bytes, teil).
+
+    Unbekannte Dateien werden als Aufgabe mit ``art=None`` aufgenommen und
+    erscheinen später mit Fehlermeldung in der Zusammenfassung.
+    """
+    liste = []
+    for name in sorted(os.listdir(eingang)):
+        format = ENDUNGEN.get(os.path.splitext(name)[1].lower())
+        if format is None:
+            continue
+        pfad = os.path.join(eingang, name)
+        aufgabe = {"datei": pfad, "format": format, "art": None, "spalten": None,
+                   "row_groups": None, "bytes": None, "teil": None}
+        try:
+            aufgabe["spalten"] = spalten_der_datei(pfad, format, sep)
+            aufgabe["art"] = erkenne_art(aufgabe["spalten"])
+        except Exception as e:
+            aufgabe["fehler"] = f"{type(e).__name__}: {e}"
+        if aufgabe["art"] == "bilanz" and format == "parquet":
+            import pyarrow.parquet as pq
+
+            anzahl = pq.ParquetFile(pfad).num_row_groups
+            if anzahl > row_groups:
+                for teil, start in enumerate(range(0, anzahl, row_groups)):
+                    liste.append({**aufgabe, "row_groups": list(range(start, min(start + row_groups, anzahl))),
+                                  "teil": teil})
+                continue
+        if aufgabe["art"] == "bilanz" and format == "csv" and os.path.getsize(pfad) > csv_bytes:
+            bereiche = csv_bereiche(pfad, csv_bytes)
+            if len(bereiche) > 1:
+                liste.extend({**aufgabe, "bytes": bereich, "teil": teil} for teil, bereich in enumerate(bereiche))
+                continue
+        liste.append(aufgabe)
+    return liste
+
+
+# ---------------------------------------------------
+# Ausgabe
+# ---------------------------------------------------
+class TabellenSchreiber:
+    """Schreibt Blöcke nacheinander in eine CSV- (deutsches Format) oder Parquet-Datei."""
+
+    def __init__(self, pfad, format, sep=";", decimal=","):
+        self.pfad = pfad
+        self.format = format
+        self.sep = sep
+        self.decimal = decimal
+        self._parquet = None
+        self._erster = True
+
+    def schreiben(self, df):
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            tabelle = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.pfad, tabelle.schema)
+            self._parquet.write_table(tabelle.cast(self._parquet.schema))
+        else:
+            df.to_csv(self.pfad, mode="w" if self._erster else "a", header=self._erster, index=False,
+                      sep=self.sep, decimal=self.decimal)
+        self._erster = False
+
+    def schliessen(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def ausgabepfad(aufgabe, ausgang, format):
+    stamm = os.path.splitext(os.path.basename(aufgabe["datei"]))[0]
+    zusatz = "_kennzahlen" if aufgabe["art"] == "bilanz" else "_ergebnis"
+    endung = ".parquet" if format == "parquet" else ".csv"
+    if aufgabe["teil"] is None:
+        return os.path.join(ausgang, stamm + zusatz + endung)
+    # aufgeteilte Datei: ein Teil je Aufgabe, lesbar z. B. mit pd.read_parquet(verzeichnis)
+    verzeichnis = os.path.join(ausgang, stamm + zusatz)
+    os.makedirs(verzeichnis, exist_ok=True)
+    return os.path.join(verzeichnis, f"teil-{aufgabe['teil']:05d}{endung}")
+
+
+# ---------------------------------------------------
+# Verarbeitung (läuft im Worker-Prozess)
+# ---------------------------------------------------
+class _Bytebereich(io.RawIOBase):
+    """Lesbare Sicht auf eine geöffnete Datei von ihrer aktuellen Position bis ``ende``."""
+
+    def __init__(self, datei, ende):
+        self.datei = datei
+        self.ende = ende
+
+    def readable(self):
+        return True
+
+    def readinto(self, puffer):
+        rest = self.ende - self.datei.tell()
+        if rest <= 0:
+            return 0
+        return self.datei.readinto(memoryview(puffer)[:rest])
+
+
+def _bilanz_bloecke(aufgabe, chunkgroesse, sep, decimal):
+    if aufgabe.get("bytes") is not None:
+        start, ende = aufgabe["bytes"]
+        with open(aufgabe["datei"], "rb") as datei:
+            datei.seek(start)
+            bereich = io.BufferedReader(_Bytebereich(datei, ende))
+            yield from pd.read_csv(bereich, sep=sep, decimal=decimal, header=None, names=aufgabe["spalten"],
+                                   chunksize=chunkgroesse)
+        return
+    if aufgabe["row_groups"] is None:
+        yield from lese_bilanzen(aufgabe["datei"], aufgabe["format"], chunkgroesse, sep=sep, decimal=decimal)
+        return
+    import pyarrow.parquet as pq
+
+    datei = pq.ParquetFile(aufgabe["datei"])
+    for batch in datei.iter_batches(batch_size=chunkgroesse, row_groups=aufgabe["row_groups"]):
+        yield batch.to_pandas()
+
+
+def verarbeite_bilanz(aufgabe, ziel, format, chunkgroesse, sep, decimal):
+    statistik = {"zeilen": 0, "verworfen": 0}
+    schreiber = TabellenSchreiber(ziel, format, sep, decimal)
+    try:
+        for block in _bilanz_bloecke(aufgabe, chunkgroesse, sep, decimal):
+            # immer float64, damit alle Blöcke und Teile dasselbe Schema haben
+            for f in BILANZ_FELDER:
+                block[f] = pd.to_numeric(block[f], errors="coerce").astype(np.float64)
+            gueltig = np.isfinite(block[BILANZ_FELDER].to_numpy()).all(axis=1)
+            statistik["zeilen"] += len(block)
+            statistik["verworfen"] += int((~gueltig).sum())
+            if not gueltig.all():
+                block = block[gueltig].reset_index(drop=True)
+            schreiber.schreiben(kennzahlen_tabelle(block))
+    finally:
+        schreiber.schliessen()
+    return statistik
+
+
+def verarbeite_ergebnis(aufgabe, ziel, format, sep, decimal):
+    if aufgabe["format"] == "parquet":
+        df = pd.read_parquet(aufgabe["datei"])
+    else:
+        df = pd.read_csv(aufgabe["datei"], sep=sep, decimal=decimal)
+    for s in BETRAGS_SPALTEN:
+        df[s] = pd.to_numeric(df[s], errors="coerce")
+    tabelle, salden = ergebnis_tabelle(df)
+    schreiber = TabellenSchreiber(ziel, format, sep, decimal)
+    try:
+        schreiber.schreiben(tabelle)
+    finally:
+        schreiber.schliessen()
+    return {"zeilen": len(df), "verworfen": 0, **salden}
+
+
+def verarbeite(aufgabe, ausgang, format="csv", chunkgroesse=CHUNKGROESSE, sep=";", decimal=","):
+    """Eine Aufgabe; Fehler werden nicht ausgelöst, sondern in der Ergebniszeile vermerkt."""
+    zeile = {"datei": os.path.basename(aufgabe["datei"]), "teil": aufgabe["teil"], "art": aufgabe["art"],
+             "ausgabe": None, "zeilen": 0, "verworfen": 0, "dauer_s": 0.0, "fehler": aufgabe.get("fehler")}
+    if zeile["fehler"] is not None:
+        return zeile
+    if aufgabe["art"] is None:
+        zeile["fehler"] = "weder Bilanz- noch Ergebnisspalten gefunden"
+        return zeile
+
+    start = time.perf_counter()
+    ziel = ausgabepfad(aufgabe, ausgang, format)
+    try:
+        if aufgabe["art"] == "bilanz":
+            zeile.update(verarbeite_bilanz(aufgabe, ziel, format, chunkgroesse, sep, decimal))
+        else:
+            zeile.update(verarbeite_ergebnis(aufgabe, ziel, format, sep, decimal))
+        zeile["ausgabe"] = os.path.relpath(ziel, ausgang)
+    except Exception as e:
+        zeile["fehler"] = f"{type(e).__name__}: {e}"
+    zeile["dauer_s"] = round(time.perf_counter() - start, 3)
+    return zeile
+
+
+# ---------------------------------------------------
+# Steuerung
+# ---------------------------------------------------
+def batch(eingang, ausgang, worker=None, format="csv", chunkgroesse=CHUNKGROESSE, sep=";", decimal=",",
+          row_groups=ROW_GROUPS_JE_AUFGABE, fortschritt=None, csv_bytes=CSV_BYTES_JE_AUFGABE):
+    """
+    Verarbeitet alle Dateien in ``eingang`` und schreibt nach ``ausgang``.
+
+    ``worker=1`` rechnet ohne Prozesspool im aktuellen Prozess. Gibt die
+    Zusammenfassung als DataFrame zurück (auch als ``zusammenfassung.csv``
+    gespeichert); ``fortschritt(erledigt, gesamt, zeile)`` nach jeder Aufgabe.
+    """
+    os.makedirs(ausgang, exist_ok=True)
+    liste = aufgaben(eingang, sep, row_groups, csv_bytes)
+    optionen = {"format": format, "chunkgroesse": chunkgroesse, "sep": sep, "decimal": decimal}
+    zeilen = []
+
+    if worker == 1 or len(liste) <= 1:
+        for aufgabe in liste:
+            zeilen.append(verarbeite(aufgabe, ausgang, **optionen))
+            if fortschritt is not None:
+                fortschritt(len(zeilen), len(liste), zeilen[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=worker) as pool:
+            laufend = [pool.submit(verarbeite, aufgabe, ausgang, **optionen) for aufgabe in liste]
+            for future in as_completed(laufend):
+                zeilen.append(future.result())
+                if fortschritt is not None:
+                    fortschritt(len(zeilen), len(liste), zeilen[-1])
+
+    zusammenfassung = pd.DataFrame(zeilen, columns=list(zeilen[0]) if zeilen else ["datei"])
+    if len(zusammenfassung):
+        zusammenfassung = zusammenfassung.sort_values(["datei", "teil"], na_position="first", kind="stable")
+    zusammenfassung.to_csv(os.path.join(ausgang, "zusammenfassung.csv"), index=False, sep=sep, decimal=decimal)
+    return zusammenfassung
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("eingang", help="Verzeichnis mit CSV-/Parquet-Dateien")
+    parser.add_argument("ausgang", help="Zielverzeichnis (wird angelegt)")
+    parser.add_argument("--worker", type=int, default=os.cpu_count(), help="Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Ausgabeformat")
+    parser.add_argument("--chunkgroesse", type=int, default=CHUNKGROESSE, help="Zeilen je Block")
+    parser.add_argument("--international", action="store_true",
+                        help="CSV mit , und . statt ; und , (Ein- und Ausgabe)")
+    args = parser.parse_args(argv)
+
+    sep, decimal = (",", ".") if args.international else (";", ",")
+
+    def fortschritt(erledigt, gesamt, zeile):
+        teil = "" if zeile["teil"] is None else f" [Teil {zeile['teil']}]"
+        status = f"FEHLER {zeile['fehler']}" if zeile["fehler"] else f"{zeile['zeilen']} Zeilen, {zeile['dauer_s']} s"
+        print(f"[{erledigt}/{gesamt}] {zeile['datei']}{teil}: {status}", flush=True)
+
+    start = time.perf_counter()
+    zusammenfassung = batch(args.eingang, args.ausgang, args.worker, args.format, args.chunkgroesse,
+                            sep, decimal, fortschritt=fortschritt)
+    fehler = int(zusammenfassung["fehler"].notna().sum()) if "fehler" in zusammenfassung else 0
+    print(f"\n{len(zusammenfassung)} Aufgaben in {time.perf_counter() - start:.1f} s, {fehler} mit Fehler. "
+          f"Zusammenfassung: {os.path.join(args.ausgang, 'zusammenfassung.csv')}")
+    return 1 if fehler else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark: Diagramm-Backends im Vergleich (Serverzeit und Nutzlast).
+
+Rendert dieselben Spezifikationen mit jedem Backend und misst die Zeit auf
+dem Server sowie die Größe dessen, was an den Browser geht (PNG-Bytes bzw.
+JSON der Vega-Lite-Spezifikation). Der Bild-Cache wird vor jeder Messung
+geleert, gemessen wird also immer ein echter Render-Vorgang.
+
+Aufruf:  python TB12/benchmarks/diagramm_backends.py [--wiederholungen 10] [--json ergebnis.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import diagramme  # noqa: E402
+from diagramme import BACKENDS, balken_spec, linien_spec  # noqa: E402
+from kennzahlen import BILANZ_FELDER  # noqa: E402
+
+
+def specs():
+    rng = np.random.default_rng(0)
+    yield "Balken 2 Jahre", balken_spec(["Jahr 1", "Jahr 2"], BILANZ_FELDER,
+                                        rng.uniform(0, 1000, (2, 5)), "Bilanzpositionen")
+    yield "Balken 10 Jahre", balken_spec([str(2015 + i) for i in range(10)], BILANZ_FELDER,
+                                         rng.uniform(0, 1000, (10, 5)), "Bilanzpositionen")
+    for punkte in (50, 300, 5000):
+        zeiten = 1_700_000_000 * 10**9 + np.arange(punkte, dtype=np.int64) * 30 * 10**9
+        werte = 100 + np.cumsum(rng.normal(0, 1, punkte))
+        yield f"Linie {punkte} Punkte", linien_spec(zeiten, werte, "DAX", "blue")
+        yield f"Linie {punkte} Punkte + Band", linien_spec(zeiten, werte, "DAX", "blue", (werte - 1, werte + 1))
+
+
+def nutzlast(ausgabe):
+    if isinstance(ausgabe, bytes):
+        return len(ausgabe)
+    return len(json.dumps(ausgabe).encode())
+
+
+def messen(wiederholungen):
+    ergebnisse = []
+    for name, spec in specs():
+        for backend in BACKENDS.values():
+            zeiten = []
+            for _ in range(wiederholungen):
+                diagramme.bild_cache = diagramme.BildCache()
+                start = time.perf_counter()
+                ausgabe = backend.rendern(spec)
+                zeiten.append((time.perf_counter() - start) * 1000)
+            ergebnisse.append({
+                "diagramm": name,
+                "backend": backend.name,
+                "median_ms": float(np.median(zeiten)),
+                "min_ms": float(np.min(zeiten)),
+                "nutzlast_bytes": nutzlast(ausgabe),
+            })
+    return ergebnisse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--wiederholungen", type=int, default=10)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    ergebnisse = messen(args.wiederholungen)
+    print(f"{'Diagramm':<28} {'Backend':<22} {'Median ms':>10} {'Min ms':>8} {'Bytes':>9}")
+    for e in ergebnisse:
+        print(f"{e['diagramm']:<28} {e['backend']:<22} {e['median_ms']:>10.2f} {e['min_ms']:>8.2f} {e['nutzlast_bytes']:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(ergebnisse, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
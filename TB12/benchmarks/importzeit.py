@@ -0,0 +1,83 @@
+"""
+Benchmark: Importzeit und erster Seitenaufbau je Seite (Kaltstart).
+
+Startet für jede Seite einen frischen Python-Prozess mit ``-X importtime``,
+führt TB11.py einmal über ``streamlit.testing`` aus und wertet nur die
+Importe aus, die während dieses Skriptlaufs passieren (Streamlit selbst ist
+dann schon geladen). Ausgegeben werden die Dauer des ersten Laufs, die
+Summe der Importzeit und die teuersten Pakete.
+
+Aufruf:  python TB12/benchmarks/importzeit.py [--seite "🏠 Startseite"] [--app alt/TB11.py] [--json ergebnis.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TB11.py")
+MARKE = "### seitenlauf ###"
+SEITEN = ["🏠 Startseite", "📊 Bilanzanalyse", "📑 Ergebnisrechnung", "🔗 Linkliste", "📈 Indizes", "ⓘ Impressum"]
+
+KIND = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[2], default_timeout=120)
+at.session_state["seite"] = sys.argv[1]
+sys.stderr.write({MARKE!r} + "\\n"); sys.stderr.flush()
+start = time.perf_counter()
+at.run()
+print(json.dumps({{"lauf_ms": (time.perf_counter() - start) * 1000, "fehler": [str(e.value) for e in at.exception]}}))
+"""
+
+
+def importzeiten(stderr):
+    """Kumulierte Importzeit (ms) je Top-Level-Paket aus der ``-X importtime``-Ausgabe nach der Marke."""
+    pakete = defaultdict(float)
+    zeilen = stderr.split(MARKE, 1)[-1].splitlines()
+    for zeile in zeilen:
+        if not zeile.startswith("import time:") or "|" not in zeile:
+            continue
+        _, kumuliert, name = zeile.split("|", 2)
+        # nur direkte Importe zählen (eingerückte Namen sind darin schon enthalten)
+        if name.startswith(" ") and not name.startswith("  "):
+            try:
+                pakete[name.strip().split(".")[0]] += int(kumuliert) / 1000
+            except ValueError:
+                pass
+    return dict(pakete)
+
+
+def messen(seite, app=APP):
+    prozess = subprocess.run([sys.executable, "-X", "importtime", "-c", KIND, seite, app],
+                             capture_output=True, text=True, encoding="utf-8")
+    ergebnis = json.loads(prozess.stdout.strip().splitlines()[-1])
+    pakete = importzeiten(prozess.stderr)
+    ergebnis.update(seite=seite, import_ms=sum(pakete.values()),
+                    pakete=dict(sorted(pakete.items(), key=lambda p: -p[1])))
+    return ergebnis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seite", action="append", help="nur diese Seite(n) messen")
+    parser.add_argument("--app", default=APP, help="anderes Skript messen (z. B. älteren Stand zum Vergleich)")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    ergebnisse = [messen(seite, args.app) for seite in args.seite or SEITEN]
+    print(f"{'Seite':<22} {'1. Lauf ms':>10} {'Import ms':>10}  Teuerste Pakete")
+    for e in ergebnisse:
+        top = ", ".join(f"{name} {ms:.0f}" for name, ms in list(e["pakete"].items())[:4])
+        print(f"{e['seite']:<22} {e['lauf_ms']:>10.0f} {e['import_ms']:>10.0f}  {top}")
+        if e["fehler"]:
+            print(f"{'':<22} Fehler: {e['fehler']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(ergebnisse, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Micro-Benchmarks für den Rechenkern (offline, synthetische Daten).
+
+Abgedeckt sind die Kennzahlen-Engine (wie ``berechne_kennzahlen`` in TB11.py),
+Summen/Salden der Ergebnisrechnung, die Verdichtung des Buchungsjournals,
+CSV-/Parquet-/PDF-Export, die Live-Indikatoren, die Monte-Carlo-Simulation
+und das Rendern der Diagramme. Jeder Benchmark läuft für mehrere Größen
+(10 bis 10 Mio. Zeilen, begrenzt durch ``--max-zeilen`` und ein Maximum je
+Benchmark).
+Ergebnisse werden als JSON gespeichert; mit ``--baseline`` werden sie mit
+einem früheren Lauf verglichen, Verschlechterungen über ``--toleranz``
+werden markiert und führen zu Exit-Code 1.
+
+Aufruf:
+  python TB12/benchmarks/kern.py                                  # Ergebnis nach ergebnisse/aktuell.json
+  python TB12/benchmarks/kern.py --ausgabe ergebnisse/baseline.json
+  python TB12/benchmarks/kern.py --baseline ergebnisse/baseline.json --toleranz 0.2
+  python TB12/benchmarks/kern.py --nur kennzahlen --max-zeilen 10000000
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HIER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HIER))
+
+import diagramme  # noqa: E402
+from bericht import tabellen_pdf  # noqa: E402
+from ergebnis import BETRAGS_SPALTEN, LaufendeSummen, berechne_salden, berechne_summen, summen_tabelle  # noqa: E402
+from exporte import csv_bytes, parquet_bytes  # noqa: E402
+from indikatoren import IndikatorReihe  # noqa: E402
+from journal import Kontenzuordnung, verdichte_journal  # noqa: E402
+from kennzahlen import BILANZ_FELDER, berechne_kennzahlen_batch  # noqa: E402
+from montecarlo import simuliere  # noqa: E402
+
+GROESSEN = [10, 1_000, 100_000, 1_000_000, 10_000_000]
+STANDARD_AUSGABE = os.path.join(HIER, "ergebnisse", "aktuell.json")
+
+
+# ---------------------------------------------------
+# Synthetische Eingaben
+# ---------------------------------------------------
+def bilanzen(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0, 1e6, (n, len(BILANZ_FELDER))), columns=BILANZ_FELDER)
+    df.insert(0, "Jahr", np.arange(n) % 30 + 1995)
+    return df
+
+
+def ergebnistabelle(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0, 1e5, (n, len(BETRAGS_SPALTEN))).round(2), columns=BETRAGS_SPALTEN)
+    df.insert(0, "Kontoname", [f"Konto {i}" for i in range(n)])
+    return df
+
+
+def kursreihe(n, seed=0):
+    rng = np.random.default_rng(seed)
+    zeiten = 1_700_000_000 * 10**9 + np.arange(n, dtype=np.int64) * 30 * 10**9
+    return zeiten, 100 + np.cumsum(rng.normal(0, 1, n))
+
+
+# ---------------------------------------------------
+# Benchmarks: Name -> (max. Zeilen, Vorbereitung(n) -> Funktion ohne Argumente)
+# ---------------------------------------------------
+def _kennzahlen(n):
+    df = bilanzen(n)
+    return lambda: pd.concat([df, berechne_kennzahlen_batch(df)], axis=1)
+
+
+def _ergebnis_summen(n):
+    df = ergebnistabelle(n)
+
+    def lauf():
+        sums = berechne_summen(df)
+        return summen_tabelle(sums, berechne_salden(sums))
+    return lauf
+
+
+def _ergebnis_editor(n):
+    # eine Zelländerung im Dateneditor: inkrementelles Update statt Vollberechnung
+    df = ergebnistabelle(n)
+    summen = LaufendeSummen(df)
+    zaehler = iter(range(10**9))
+    return lambda: summen.anwenden({n // 2: {"Aufwand": float(next(zaehler))}})
+
+
+def _journal_verdichten(n):
+    # Buchungsjournal in Blöcken wie beim Import, Konten aus der Standardzuordnung plus unbekannte
+    rng = np.random.default_rng(0)
+    zuordnung = Kontenzuordnung.aus_liste()
+    journal = pd.DataFrame({"Konto": rng.integers(5000, 9500, n), "Betrag": rng.uniform(0, 1e4, n).round(2)})
+    return lambda: verdichte_journal((journal.iloc[i:i + 200_000] for i in range(0, n, 200_000)), zuordnung)
+
+
+def _export_csv(n):
+    df = ergebnistabelle(n)
+    return lambda: csv_bytes(df)
+
+
+def _export_parquet(n):
+    df = ergebnistabelle(n)
+    return lambda: parquet_bytes(df)
+
+
+def _export_pdf(n):
+    df = ergebnistabelle(n)
+    return lambda: tabellen_pdf(df, "Benchmark")
+
+
+def _indikatoren(n):
+    # n Ticks nacheinander durch SMA/EMA/Volatilität/Drawdown (Kosten je Tick konstant)
+    zeiten, werte = kursreihe(n)
+    zeiten, werte = zeiten.tolist(), werte.tolist()
+
+    def lauf():
+        reihe = IndikatorReihe()
+        for z, w in zip(zeiten, werte):
+            reihe.anhaengen(z, w)
+    return lauf
+
+
+def _monte_carlo(n):
+    # n Szenarien aus gemischten Verteilungen, exakt (alle auf einmal) wie auf der Bilanzseite
+    verteilungen = {"AV": ("gleich", 80_000, 120_000), "UV": ("normal", 60_000, 10_000),
+                    "EK": ("dreieck", 30_000, 50_000, 70_000), "LFK": ("fest", 40_000),
+                    "KFK": ("gleich", 10_000, 40_000)}
+    return lambda: simuliere(verteilungen, n, seed=0)
+
+
+def _monte_carlo_bloecke(n):
+    verteilungen = {f: ("gleich", 50_000, 150_000) for f in BILANZ_FELDER}
+    return lambda: simuliere(verteilungen, n, chunkgroesse=100_000, seed=0)
+
+
+def _diagramm_linie_png(n):
+    zeiten, werte = kursreihe(n)
+
+    def lauf():
+        diagramme.bild_cache = diagramme.BildCache()   # immer echt rendern
+        return diagramme.linien_png(zeiten, werte, "Benchmark", "blue")
+    return lauf
+
+
+def _diagramm_linie_vegalite(n):
+    zeiten, werte = kursreihe(n)
+    backend = diagramme.VegaLiteBackend()
+    return lambda: backend.rendern(diagramme.linien_spec(zeiten, werte, "Benchmark", "blue"))
+
+
+def _diagramm_balken_png(n):
+    rng = np.random.default_rng(0)
+    labels = [str(1995 + i) for i in range(n)]
+    werte = rng.uniform(0, 1e6, (n, len(BILANZ_FELDER)))
+
+    def lauf():
+        diagramme.bild_cache = diagramme.BildCache()
+        return diagramme.balken_png(labels, BILANZ_FELDER, werte, "Benchmark")
+    return lauf
+
+
+BENCHMARKS = {
+    "kennzahlen": (10_000_000, _kennzahlen),
+    "ergebnis_summen": (10_000_000, _ergebnis_summen),
+    "ergebnis_editor": (1_000_000, _ergebnis_editor),
+    "journal_verdichten": (10_000_000, _journal_verdichten),
+    "export_csv": (1_000_000, _export_csv),
+    "export_parquet": (10_000_000, _export_parquet),
+    "export_pdf": (100_000, _export_pdf),
+    "indikatoren": (100_000, _indikatoren),
+    "monte_carlo": (1_000_000, _monte_carlo),
+    "monte_carlo_bloecke": (10_000_000, _monte_carlo_bloecke),
+    "diagramm_linie_png": (1_000_000, _diagramm_linie_png),
+    "diagramm_linie_vegalite": (100_000, _diagramm_linie_vegalite),
+    "diagramm_balken_png": (10, _diagramm_balken_png),
+}
+
+
+# ---------------------------------------------------
+# Messung
+# ---------------------------------------------------
+def messen(funktion, min_zeit=0.2, min_wiederholungen=3, max_wiederholungen=1000):
+    """Wiederholt ``funktion`` bis ``min_zeit`` Sekunden und ``min_wiederholungen`` erreicht sind."""
+    funktion()  # Aufwärmen (Imports, Caches, Speicher)
+    zeiten = []
+    gesamt_start = time.perf_counter()
+    while len(zeiten) < max_wiederholungen and (
+            len(zeiten) < min_wiederholungen or time.perf_counter() - gesamt_start < min_zeit):
+        start = time.perf_counter()
+        funktion()
+        zeiten.append(time.perf_counter() - start)
+    return {"median_s": float(np.median(zeiten)), "min_s": float(np.min(zeiten)), "wiederholungen": len(zeiten)}
+
+
+def ausfuehren(namen, max_zeilen):
+    ergebnisse = {}
+    for name in namen:
+        grenze, vorbereiten = BENCHMARKS[name]
+        for n in [g for g in GROESSEN if g <= min(grenze, max_zeilen)]:
+            funktion = vorbereiten(n)
+            ergebnis = messen(funktion, min_wiederholungen=1 if n >= 1_000_000 else 3)
+            ergebnisse[f"{name}[{n}]"] = ergebnis
+            print(f"{name + f'[{n:,}]':<36} {ergebnis['median_s'] * 1000:>12.3f} ms  "
+                  f"(min {ergebnis['min_s'] * 1000:.3f} ms, {ergebnis['wiederholungen']}x)", flush=True)
+            del funktion
+    return ergebnisse
+
+
+def vergleichen(ergebnisse, baseline, toleranz):
+    """
+    Gibt die Schlüssel zurück, die um mehr als ``toleranz`` langsamer sind als die Baseline.
+
+    Verglichen wird der schnellste Lauf (``min_s``), er schwankt deutlich weniger als der Median.
+    """
+    regressionen = []
+    print(f"\n{'Benchmark (min)':<36} {'Baseline ms':>12} {'Aktuell ms':>12} {'Faktor':>8}")
+    for schluessel, aktuell in ergebnisse.items():
+        alt = baseline.get(schluessel)
+        if alt is None:
+            continue
+        faktor = aktuell["min_s"] / alt["min_s"] if alt["min_s"] else float("inf")
+        markierung = ""
+        if faktor > 1 + toleranz:
+            regressionen.append(schluessel)
+            markierung = "  << REGRESSION"
+        elif faktor < 1 / (1 + toleranz):
+            markierung = "  schneller"
+        print(f"{schluessel:<36} {alt['min_s'] * 1000:>12.3f} {aktuell['min_s'] * 1000:>12.3f} "
+              f"{faktor:>7.2f}x{markierung}")
+    return regressionen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nur", action="append", choices=list(BENCHMARKS), help="nur diese Benchmarks")
+    parser.add_argument("--max-zeilen", type=int, default=1_000_000,
+                        help="größte Eingabegröße (Standard 1 Mio., 10 Mio. braucht einige GB RAM)")
+    parser.add_argument("--ausgabe", default=STANDARD_AUSGABE, help="JSON-Datei für die Ergebnisse")
+    parser.add_argument("--baseline", help="früheres Ergebnis (JSON) zum Vergleich")
+    parser.add_argument("--toleranz", type=float, default=0.2,
+                        help="erlaubte Verlangsamung gegenüber der Baseline (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    ergebnisse = ausfuehren(args.nur or list(BENCHMARKS), args.max_zeilen)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.ausgabe)), exist_ok=True)
+    with open(args.ausgabe, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "plattform": platform.platform(),
+                "prozessor": platform.processor() or platform.machine(),
+            },
+            "ergebnisse": ergebnisse,
+        }, f, indent=2)
+    print(f"\nErgebnisse gespeichert: {args.ausgabe}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["ergebnisse"]
+        regressionen = vergleichen(ergebnisse, baseline, args.toleranz)
+        if regressionen:
+            print(f"\n{len(regressionen)} Regression(en) über {args.toleranz:.0%}: {', '.join(regressionen)}")
+            sys.exit(1)
+        print("\nKeine Regressionen.")
+
+
+if __name__ == "__main__":
+    main()
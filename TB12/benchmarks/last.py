@@ -0,0 +1,336 @@
+"""
+Lasttest: viele gleichzeitige Sessions gegen TB11.py (headless über streamlit.testing).
+
+Jede simulierte Session ist ein eigener ``AppTest`` mit eigenem Session State
+und läuft in einem eigenen Thread. Sie wechselt zufällig die Seiten, ändert
+Zellen im Dateneditor der Ergebnisrechnung, gibt Bilanzwerte ein und startet
+Exporte; dazwischen liegt eine zufällige Denkzeit. Die Kursdaten kommen aus
+einer lokalen Replay-Datei (wird erzeugt, falls ``MARKTDATEN_REPLAY`` fehlt),
+Tick-Datenbank und Historie liegen in einem temporären Verzeichnis.
+
+Ausgegeben werden je Aktion die Rerun-Latenz (p50/p95/p99/max, inkl. Wartezeit
+auf den Skriptlauf), der Durchsatz in Reruns/s, der Zustand der geteilten
+Export-Warteschlange und der Speicher: Größe des Session State je Session
+(vorher/nachher) und RSS des Prozesses.
+
+Hinweis: ``AppTest`` ist nicht threadsicher (eine globale Runtime-Instanz je
+Lauf, gemeinsamer Compiler-Zustand), innerhalb eines Prozesses laufen die
+Skripte daher über eine Sperre nacheinander. Mit ``--prozesse 1`` misst der
+Test also einen einzigen seriellen Skript-Runner, nicht N gleichzeitig
+rechnende Sessions: Latenz = Wartezeit auf die Sperre + Laufzeit, Durchsatz
+= Kapazität eines Runners. Die geteilten Singletons (Kurs-Cache, Export-Pool,
+Seitenregister, Bildspeicher) und ihre Hintergrund-Threads laufen trotzdem
+parallel. Mit ``--prozesse N`` werden die Sessions auf N Prozesse verteilt
+(je Prozess eigene Singletons wie bei N Server-Prozessen, gemeinsame
+Tick-Datenbank); dann laufen bis zu N Skripte wirklich gleichzeitig, sofern
+genug CPU-Kerne vorhanden sind. Die Ausgabe nennt den Modus.
+
+Aufruf:
+  python TB12/benchmarks/last.py --sitzungen 20 --schritte 30
+  python TB12/benchmarks/last.py --sitzungen 40 --prozesse 4
+  python TB12/benchmarks/last.py --sitzungen 50 --denkzeit 0.5 --json last.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+HIER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HIER))
+
+from importzeit import APP, SEITEN  # noqa: E402
+from sitzungen import zustand_groesse  # noqa: E402
+
+ERGEBNIS = "📑 Ergebnisrechnung"
+BILANZ = "📊 Bilanzanalyse"
+
+
+# ---------------------------------------------------
+# Lokale Marktdaten statt yfinance
+# ---------------------------------------------------
+def marktdaten_attrappe(verzeichnis, ticks=5_000):
+    """Setzt Replay-Datei, Tick-Datenbank und Historie auf ``verzeichnis``, sofern nicht schon gesetzt."""
+    from marktdaten import INDEX_TICKER, schreibe_replay
+
+    if not os.environ.get("MARKTDATEN_REPLAY"):
+        pfad = os.path.join(verzeichnis, "replay.csv")
+        schreibe_replay(pfad, INDEX_TICKER, anzahl=ticks)
+        os.environ["MARKTDATEN_REPLAY"] = pfad
+    os.environ.setdefault("MARKTDATEN_DB", os.path.join(verzeichnis, "ticks.sqlite"))
+    os.environ.setdefault("MARKTDATEN_HISTORIE", os.path.join(verzeichnis, "historie"))
+
+
+# ---------------------------------------------------
+# Speicher
+# ---------------------------------------------------
+def rss_bytes():
+    """Aktueller RSS des Prozesses (Linux), sonst Spitzenwert über ``resource``, sonst ``None``."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for zeile in f:
+                if zeile.startswith("VmRSS:"):
+                    return int(zeile.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        faktor = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * faktor
+    except ImportError:
+        return None
+
+
+def zustand_bytes(at):
+    """Geschätzte Größe des Session State (wie im Speicherbericht der App, siehe sitzungen.py)."""
+    return sum(zustand_groesse(at.session_state._state).values())
+
+
+# ---------------------------------------------------
+# Simulierte Session
+# ---------------------------------------------------
+class Sitzung:
+    """
+    Ein simulierter Benutzer. ``messungen`` enthält je Rerun
+    (Aktion, Seite, Latenz ms inkl. Warten, reine Laufzeit ms).
+    """
+
+    def __init__(self, nummer, sperre, seed, denkzeit, app=APP):
+        from streamlit.testing.v1 import AppTest
+
+        self.nummer = nummer
+        self.sperre = sperre
+        self.rng = random.Random(seed + nummer)
+        self.denkzeit = denkzeit
+        self.at = AppTest.from_file(app, default_timeout=120)
+        self.seite = SEITEN[0]
+        self.messungen = []
+        self.fehler = []
+        self.zustand_start = self.zustand_ende = 0
+
+    def _lauf(self, aktion, ausfuehren):
+        start = time.perf_counter()
+        with self.sperre:
+            beginn = time.perf_counter()
+            try:
+                ausfuehren()
+            except Exception as e:
+                self.fehler.append(f"{aktion}: {type(e).__name__}: {e}")
+            ende = time.perf_counter()
+            self.fehler.extend(f"{aktion}: {e.value}" for e in self.at.exception)
+        self.messungen.append((aktion, self.seite, (ende - start) * 1000, (ende - beginn) * 1000))
+
+    # Aktionen ------------------------------------------------
+    def starten(self):
+        self._lauf("start", self.at.run)
+        self.zustand_start = zustand_bytes(self.at)
+
+    def navigieren(self):
+        self.seite = self.rng.choice([s for s in SEITEN if s != self.seite])
+        radio = self.at.sidebar.radio[0]
+        self._lauf("navigation", lambda: radio.set_value(self.seite).run())
+
+    def editor_aendern(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        df = self.at.session_state["ergebnis_df"]
+        spalte = self.rng.choice([s for s in df.columns if df[s].dtype.kind == "f"])
+        zeile = self.rng.randrange(len(df))
+        editor = next(e for e in self.at.get("dataframe") if "ergebnis_editor" in e.proto.id)
+
+        def ausfuehren():
+            # Widget-Zustand so, wie ihn das Frontend nach einer Zelländerung sendet
+            zustaende = self.at._tree.get_widget_states()
+            aenderung = WidgetState(id=editor.proto.id)
+            aenderung.string_value = json.dumps({
+                "edited_rows": {str(zeile): {spalte: round(self.rng.uniform(0, 1e5), 2)}},
+                "added_rows": [], "deleted_rows": []})
+            zustaende.widgets.append(aenderung)
+            self.at._run(zustaende)
+        self._lauf("editor", ausfuehren)
+
+    def eingeben(self):
+        feld = self.rng.choice(self.at.number_input)
+        self._lauf("eingabe", lambda: feld.set_value(round(self.rng.uniform(0, 1e6), 2)).run())
+
+    def exportieren(self):
+        knoepfe = [k for k in self.at.button if k.key and k.key.endswith("_knopf")]
+        if not knoepfe:
+            return self.neu_laden()
+        knopf = self.rng.choice(knoepfe)
+        self._lauf("export", lambda: knopf.click().run())
+
+    def neu_laden(self):
+        self._lauf("rerun", self.at.run)
+
+    def schritt(self):
+        zufall = self.rng.random()
+        if zufall < 0.3:
+            return self.navigieren()
+        if self.seite == ERGEBNIS and zufall < 0.7:
+            return self.editor_aendern()
+        if self.seite == BILANZ and zufall < 0.7:
+            return self.eingeben()
+        if self.seite in (ERGEBNIS, BILANZ) and zufall < 0.85:
+            return self.exportieren()
+        return self.neu_laden()
+
+    def ausfuehren(self, schritte):
+        self.starten()
+        for _ in range(schritte):
+            time.sleep(self.rng.expovariate(1 / self.denkzeit) if self.denkzeit > 0 else 0)
+            self.schritt()
+        self.zustand_ende = zustand_bytes(self.at)
+
+    def ergebnis(self):
+        return {"messungen": self.messungen, "fehler": self.fehler,
+                "zustand_start": self.zustand_start, "zustand_ende": self.zustand_ende}
+
+
+def sitzungen_ausfuehren(nummern, seed, denkzeit, schritte, app, verzeichnis):
+    """
+    Führt die Sessions ``nummern`` in diesem Prozess aus (je Session ein Thread, Skriptläufe
+    über eine gemeinsame Sperre). Gibt nur einfache Daten zurück, damit das Ergebnis auch
+    aus einem Kindprozess übertragen werden kann.
+    """
+    from exporte import export_warteschlange
+
+    marktdaten_attrappe(verzeichnis)
+    sperre = threading.Lock()
+    sitzungen = [Sitzung(i, sperre, seed, denkzeit, app) for i in nummern]
+    rss_vorher = rss_bytes()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=s.ausfuehren, args=(schritte,), name=f"Sitzung-{s.nummer}")
+               for s in sitzungen]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        "sitzungen": [s.ergebnis() for s in sitzungen],
+        "exporte": [(a.status, a.dauer) for a in export_warteschlange().auftraege()],
+        "rss": (rss_vorher, rss_bytes()),
+        "dauer_s": time.perf_counter() - start,
+    }
+
+
+# ---------------------------------------------------
+# Auswertung
+# ---------------------------------------------------
+def perzentile(werte):
+    werte = sorted(werte)
+    wert = lambda anteil: werte[min(len(werte) - 1, int(anteil * len(werte)))]  # noqa: E731
+    return {"anzahl": len(werte), "p50_ms": round(wert(0.5), 1), "p95_ms": round(wert(0.95), 1),
+            "p99_ms": round(wert(0.99), 1), "max_ms": round(werte[-1], 1)}
+
+
+def auswerten(teile):
+    """
+    Fasst die Ergebnisse von ``sitzungen_ausfuehren`` (ein Teil je Prozess) zusammen; die Dauer
+    ist die des langsamsten Prozesses ohne Start- und Importzeit der Kindprozesse.
+    """
+    dauer_s = max(teil["dauer_s"] for teil in teile)
+    sitzungen = [s for teil in teile for s in teil["sitzungen"]]
+    messungen = [m for s in sitzungen for m in s["messungen"]]
+    je_aktion, je_seite = defaultdict(list), defaultdict(list)
+    for aktion, seite, latenz, _ in messungen:
+        je_aktion[aktion].append(latenz)
+        je_seite[seite].append(latenz)
+
+    auftraege = [a for teil in teile for a in teil["exporte"]]
+    status = defaultdict(int)
+    for auftrag_status, _ in auftraege:
+        status[auftrag_status] += 1
+    export_dauern = [dauer * 1000 for _, dauer in auftraege if dauer is not None]
+
+    zustaende = [(s["zustand_start"], s["zustand_ende"]) for s in sitzungen]
+    # RSS über alle Prozesse summiert (None, wenn nicht messbar)
+    rss = [sum(teil["rss"][i] for teil in teile) if all(teil["rss"][i] for teil in teile) else None
+           for i in (0, 1)]
+    return {
+        "sitzungen": len(sitzungen),
+        "prozesse": len(teile),
+        "modus": ("seriell (ein Skript-Runner)" if len(teile) == 1
+                  else f"{len(teile)} Prozesse, je Prozess seriell (höchstens {len(teile)} Skripte gleichzeitig)"),
+        "reruns": len(messungen),
+        "dauer_s": round(dauer_s, 2),
+        "durchsatz_reruns_s": round(len(messungen) / dauer_s, 2),
+        "latenz_gesamt": perzentile([m[2] for m in messungen]),
+        "laufzeit_gesamt": perzentile([m[3] for m in messungen]),
+        "latenz_je_aktion": {a: perzentile(w) for a, w in sorted(je_aktion.items())},
+        "latenz_je_seite": {s: perzentile(w) for s, w in sorted(je_seite.items())},
+        "exporte": {"status": dict(status), **(perzentile(export_dauern) if export_dauern else {})},
+        "speicher": {
+            "zustand_start_kib_median": round(sorted(z[0] for z in zustaende)[len(zustaende) // 2] / 1024, 1),
+            "zustand_ende_kib_median": round(sorted(z[1] for z in zustaende)[len(zustaende) // 2] / 1024, 1),
+            "zustand_zuwachs_kib_max": round(max(z[1] - z[0] for z in zustaende) / 1024, 1),
+            "rss_vorher_mib": rss[0] and round(rss[0] / 2**20, 1),
+            "rss_nachher_mib": rss[1] and round(rss[1] / 2**20, 1),
+            "rss_je_sitzung_mib": rss[0] and rss[1] and round((rss[1] - rss[0]) / 2**20 / len(sitzungen), 2),
+        },
+        "fehler": [f for s in sitzungen for f in s["fehler"]][:50],
+    }
+
+
+def ausgeben(bericht):
+    print(f"{bericht['sitzungen']} Sitzungen, {bericht['reruns']} Reruns in {bericht['dauer_s']} s "
+          f"-> {bericht['durchsatz_reruns_s']} Reruns/s")
+    print(f"Skriptläufe: {bericht['modus']}\n")
+    print(f"{'Latenz (ms)':<26} {'Anzahl':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    zeilen = [("gesamt", bericht["latenz_gesamt"]), ("  davon Skriptlauf", bericht["laufzeit_gesamt"])]
+    zeilen += list(bericht["latenz_je_aktion"].items()) + list(bericht["latenz_je_seite"].items())
+    for name, p in zeilen:
+        print(f"{name:<26} {p['anzahl']:>7} {p['p50_ms']:>8.1f} {p['p95_ms']:>8.1f} "
+              f"{p['p99_ms']:>8.1f} {p['max_ms']:>8.1f}")
+    exporte = bericht["exporte"]
+    print(f"\nExporte: {exporte['status']}" + (f", Dauer p50 {exporte['p50_ms']} ms, max {exporte['max_ms']} ms"
+                                              if "p50_ms" in exporte else ""))
+    sp = bericht["speicher"]
+    print(f"Session State (Median): {sp['zustand_start_kib_median']} KiB -> {sp['zustand_ende_kib_median']} KiB, "
+          f"max. Zuwachs {sp['zustand_zuwachs_kib_max']} KiB")
+    print(f"RSS: {sp['rss_vorher_mib']} MiB -> {sp['rss_nachher_mib']} MiB ({sp['rss_je_sitzung_mib']} MiB je Sitzung)")
+    if bericht["fehler"]:
+        print(f"\n{len(bericht['fehler'])} Fehler, z. B.: {bericht['fehler'][:3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sitzungen", type=int, default=10, help="gleichzeitige Sessions")
+    parser.add_argument("--schritte", type=int, default=20, help="Aktionen je Session")
+    parser.add_argument("--denkzeit", type=float, default=0.2, help="mittlere Pause zwischen Aktionen (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prozesse", type=int, default=1,
+                        help="Sessions auf so viele Prozesse verteilen (1 = ein serieller Skript-Runner)")
+    parser.add_argument("--app", default=APP, help="anderes Skript testen")
+    parser.add_argument("--json", help="Bericht zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="lasttest_") as verzeichnis:
+        # Replay-Datei einmal erzeugen, Kindprozesse erben die Umgebungsvariablen
+        marktdaten_attrappe(verzeichnis)
+        prozesse = max(1, min(args.prozesse, args.sitzungen))
+        gruppen = [list(range(i, args.sitzungen, prozesse)) for i in range(prozesse)]
+        parameter = (args.seed, args.denkzeit, args.schritte, args.app, verzeichnis)
+        if prozesse == 1:
+            teile = [sitzungen_ausfuehren(gruppen[0], *parameter)]
+        else:
+            with ProcessPoolExecutor(prozesse, mp_context=multiprocessing.get_context("spawn")) as pool:
+                teile = list(pool.map(sitzungen_ausfuehren, gruppen, *[[p] * prozesse for p in parameter]))
+        bericht = auswerten(teile)
+
+    ausgeben(bericht)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(bericht, f, indent=2, ensure_ascii=False)
+    if bericht["fehler"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
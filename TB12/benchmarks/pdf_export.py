@@ -0,0 +1,73 @@
+"""
+Benchmark: PDF-Export einer großen Ergebnisrechnung.
+
+Erzeugt eine Ergebnistabelle mit ``--zeilen`` Konten und misst Laufzeit,
+Spitzenspeicher (tracemalloc, nur Python-Objekte), Seitenzahl und Dateigröße
+des Berichts aus ``bericht.tabellen_pdf``.
+
+Aufruf:  python TB12/benchmarks/pdf_export.py [--zeilen 100000] [--ausgabe bericht.pdf]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bericht import PdfBericht  # noqa: E402
+from ergebnis import BETRAGS_SPALTEN  # noqa: E402
+
+
+def ergebnistabelle(zeilen, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Kontoname": [f"Konto {i:06d}" for i in range(zeilen)]})
+    for spalte in BETRAGS_SPALTEN:
+        df[spalte] = rng.uniform(0, 1e6, zeilen).round(2)
+    return df
+
+
+class _Zaehler:
+    """Verwirft geschriebene Bytes und zählt nur mit (misst den Bericht ohne Ausgabepuffer)."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, daten):
+        self.bytes += len(daten)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--zeilen", type=int, default=100_000)
+    parser.add_argument("--ausgabe", help="PDF zusätzlich als Datei speichern")
+    args = parser.parse_args()
+
+    df = ergebnistabelle(args.zeilen)
+    ziel = _Zaehler()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with PdfBericht(ziel, titel="Ergebnisrechnung") as bericht:
+        bericht.ueberschrift("Ergebnisrechnung")
+        bericht.tabelle(df)
+    dauer = time.perf_counter() - start
+    spitze = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{args.zeilen} Zeilen: {dauer:.2f} s (mit tracemalloc), {bericht.seiten} Seiten, "
+          f"{ziel.bytes / 2**20:.1f} MiB, Spitzenspeicher {spitze / 2**20:.1f} MiB")
+
+    if args.ausgabe:
+        start = time.perf_counter()
+        with PdfBericht(args.ausgabe, titel="Ergebnisrechnung") as bericht:
+            bericht.ueberschrift("Ergebnisrechnung")
+            bericht.tabelle(df)
+        print(f"Datei {args.ausgabe}: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
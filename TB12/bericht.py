@@ -0,0 +1,334 @@
+"""
+Seitenweiser PDF-Bericht für Tabellen-Exporte (Bilanzanalyse, Ergebnisrechnung).
+
+Schreibt das PDF direkt als Text-/Vektor-Operatoren statt über ``ax.table``:
+jede Tabellenzeile ist ein einziger Textbefehl in Courier (feste Zeichenbreite,
+Ausrichtung über Auffüllen mit Leerzeichen), Zebra-Streifen und Linien sind
+einfache Rechtecke. Zeilen werden blockweise formatiert und fertige Seiten sofort
+in das Ziel geschrieben, der Speicherbedarf hängt also nicht von der Zeilenzahl ab.
+Tabellenköpfe werden auf jeder Seite wiederholt. Diagramme werden als Bild
+(matplotlib-Figur, gerastert) eingebettet.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Seitengrößen in Punkt (1/72 Zoll)
+A4_HOCH = (595.0, 842.0)
+A4_QUER = (842.0, 595.0)
+
+# Courier: jedes Zeichen ist 0,6 em breit
+ZEICHENBREITE = 0.6
+MIN_SCHRIFT = 4.5
+MAX_SPALTENBREITE = 40
+SPALTENABSTAND = 2
+
+# Standardschriften (nicht eingebettet), Kodierung WinAnsi = cp1252
+_SCHRIFTEN = {
+    "F1": "Helvetica",
+    "F2": "Helvetica-Bold",
+    "F3": "Courier",
+    "F4": "Courier-Bold",
+}
+_STEUERZEICHEN = {i: " " for i in range(32)}
+
+
+def _pdf_text(text):
+    """PDF-String-Literal (ohne Klammern) in cp1252, nicht darstellbare Zeichen als '?'."""
+    text = str(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("cp1252", "replace")
+
+
+def _zahl(wert):
+    return f"{wert:.2f}".rstrip("0").rstrip(".")
+
+
+def formatiere_spalte(werte):
+    """Formatiert eine Spalte als Liste von Strings (Zahlen mit Tausendertrennzeichen, NaN leer)."""
+    if werte.dtype.kind == "f":
+        texte = list(map("{:,.2f}".format, werte.tolist()))
+        if werte.hasnans:
+            texte = ["" if t == "nan" else t for t in texte]
+        return texte
+    if werte.dtype.kind in "iub":
+        return list(map(str, werte.tolist()))
+    # Zeilenumbrüche o. Ä. würden die Zeile im PDF zerreißen
+    return ["" if v is None or v != v else str(v).translate(_STEUERZEICHEN) for v in werte.to_numpy(dtype=object)]
+
+
+def _abschneiden(text, breite):
+    return text if len(text) <= breite else text[:breite - 1] + "…"
+
+
+class PdfBericht:
+    """
+    Schreibt ein PDF seitenweise nach ``ziel`` (binärer Stream oder Dateipfad).
+
+    Inhalt wird von oben nach unten angeordnet (``ueberschrift``, ``tabelle``,
+    ``bild``); passt etwas nicht mehr auf die Seite, beginnt eine neue.
+    ``schliessen`` (oder das Ende des ``with``-Blocks) schreibt Seitenbaum und
+    Querverweistabelle.
+    """
+
+    def __init__(self, ziel, titel="", seitengroesse=A4_QUER, schriftgroesse=7, rand=36):
+        self._eigene_datei = isinstance(ziel, str)
+        self._ziel = open(ziel, "wb") if self._eigene_datei else ziel
+        self.titel = str(titel).translate(_STEUERZEICHEN)
+        self.breite, self.hoehe = seitengroesse
+        self.schriftgroesse = schriftgroesse
+        self.rand = rand
+
+        self._position = 0
+        self._offsets = {}
+        self._naechstes_objekt = 3 + len(_SCHRIFTEN)   # 1 Katalog, 2 Seitenbaum, danach Schriften
+        self._seiten = []
+        self._inhalt = None
+        self._bilder = {}
+        self._anzahl_bilder = 0
+        self._y = 0.0
+
+        self._schreiben(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._objekt(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        for i, name in enumerate(_SCHRIFTEN.values()):
+            self._objekt(3 + i, f"<< /Type /Font /Subtype /Type1 /BaseFont /{name}"
+                                f" /Encoding /WinAnsiEncoding >>".encode())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.schliessen()
+
+    # -----------------------------------
+    # PDF-Objekte
+    # -----------------------------------
+    def _schreiben(self, daten):
+        self._ziel.write(daten)
+        self._position += len(daten)
+
+    def _neue_objektnummer(self):
+        nummer = self._naechstes_objekt
+        self._naechstes_objekt += 1
+        return nummer
+
+    def _objekt(self, nummer, inhalt):
+        self._offsets[nummer] = self._position
+        self._schreiben(b"%d 0 obj\n" % nummer + inhalt + b"\nendobj\n")
+
+    def _stream(self, nummer, woerterbuch, daten):
+        daten = zlib.compress(daten, 1)
+        self._objekt(nummer, b"<< " + woerterbuch + b" /Filter /FlateDecode /Length %d >>\nstream\n" % len(daten)
+                     + daten + b"\nendstream")
+
+    # -----------------------------------
+    # Seiten
+    # -----------------------------------
+    @property
+    def _unten(self):
+        return self.rand + 14   # Platz für die Fußzeile
+
+    def _neue_seite(self):
+        if self._inhalt is not None:
+            self._seite_abschliessen()
+        self._inhalt = []
+        self._bilder = {}
+        self._y = self.hoehe - self.rand
+
+    def _seite_abschliessen(self):
+        nummer = len(self._seiten) + 1
+        fuss = f"Seite {nummer}"
+        self._inhalt.append(
+            b"BT /F1 7 Tf %s %s Td (%s) Tj ET\n" % (_zahl(self.rand).encode(), _zahl(self.rand).encode(),
+                                                   _pdf_text(self.titel))
+            + b"BT /F3 7 Tf %s %s Td (%s) Tj ET\n" % (
+                _zahl(self.breite - self.rand - len(fuss) * ZEICHENBREITE * 7).encode(),
+                _zahl(self.rand).encode(), _pdf_text(fuss))
+        )
+
+        inhalt_nr = self._neue_objektnummer()
+        self._stream(inhalt_nr, b"", b"".join(self._inhalt))
+        schriften = b" ".join(b"/%s %d 0 R" % (k.encode(), 3 + i) for i, k in enumerate(_SCHRIFTEN))
+        bilder = b" ".join(b"/%s %d 0 R" % (k.encode(), n) for k, n in self._bilder.items())
+        seite_nr = self._neue_objektnummer()
+        self._objekt(seite_nr, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %s %s] /Contents %d 0 R"
+                               b" /Resources << /Font << %s >> /XObject << %s >> >> >>"
+                     % (_zahl(self.breite).encode(), _zahl(self.hoehe).encode(), inhalt_nr, schriften, bilder))
+        self._seiten.append(seite_nr)
+        self._inhalt = None
+
+    def _platz(self, hoehe):
+        """Sorgt für ``hoehe`` Punkt freien Platz, ggf. auf einer neuen Seite."""
+        if self._inhalt is None or self._y - hoehe < self._unten:
+            self._neue_seite()
+
+    # -----------------------------------
+    # Inhalte
+    # -----------------------------------
+    def ueberschrift(self, text, groesse=12):
+        self._platz(groesse * 2.5)
+        self._y -= groesse * 1.2
+        self._inhalt.append(b"BT /F2 %s Tf %s %s Td (%s) Tj ET\n"
+                            % (_zahl(groesse).encode(), _zahl(self.rand).encode(), _zahl(self._y).encode(),
+                               _pdf_text(str(text).translate(_STEUERZEICHEN))))
+        self._y -= groesse * 0.8
+
+    def bild(self, fig, dpi=150, max_hoehe=None):
+        """Bettet eine matplotlib-Figur als Rasterbild ein (Seitenbreite, Seitenverhältnis bleibt)."""
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        canvas = FigureCanvasAgg(fig)
+        fig.set_dpi(dpi)
+        canvas.draw()
+        rgb = np.ascontiguousarray(np.asarray(canvas.buffer_rgba())[..., :3])
+        hoehe_px, breite_px = rgb.shape[:2]
+
+        verfuegbar = self.breite - 2 * self.rand
+        max_hoehe = max_hoehe or (self.hoehe - self.rand - self._unten)
+        skala = min(verfuegbar / breite_px, max_hoehe / hoehe_px)
+        w, h = breite_px * skala, hoehe_px * skala
+        self._platz(h + 6)
+
+        bild_nr = self._neue_objektnummer()
+        self._stream(bild_nr, b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB"
+                              b" /BitsPerComponent 8" % (breite_px, hoehe_px), rgb.tobytes())
+        self._anzahl_bilder += 1
+        name = f"Im{self._anzahl_bilder}"
+        self._bilder[name] = bild_nr
+        self._y -= h + 6
+        self._inhalt.append(b"q %s 0 0 %s %s %s cm /%s Do Q\n"
+                            % (_zahl(w).encode(), _zahl(h).encode(), _zahl(self.rand).encode(),
+                               _zahl(self._y).encode(), name.encode()))
+
+    def tabelle(self, daten, blockgroesse=5000, fortschritt=None):
+        """
+        Schreibt ``daten`` (DataFrame oder Iterable von DataFrames mit gleichen Spalten)
+        als Tabelle über beliebig viele Seiten.
+
+        Spaltenbreiten werden aus dem ersten Block bestimmt (max. ``MAX_SPALTENBREITE``
+        Zeichen), längere Werte späterer Blöcke werden gekürzt. ``fortschritt(anteil)``
+        wird nach jedem Block aufgerufen (nur bei einem DataFrame, Anteil 0..1).
+        """
+        gesamt = None
+        if isinstance(daten, pd.DataFrame):
+            gesamt = max(len(daten), 1)
+            bloecke = (daten.iloc[i:i + blockgroesse] for i in range(0, gesamt, blockgroesse))
+        else:
+            bloecke = iter(daten)
+
+        layout = None
+        erledigt = 0
+        for block in bloecke:
+            spalten = [formatiere_spalte(block[s]) for s in block.columns]
+            if layout is None:
+                layout = self._tabellenlayout(block, spalten)
+            self._zeilen_schreiben(self._zeilen(spalten, layout), layout)
+            erledigt += len(block)
+            if fortschritt is not None and gesamt is not None:
+                fortschritt(min(erledigt / gesamt, 1.0))
+
+    def _tabellenlayout(self, block, spalten):
+        breiten = [min(MAX_SPALTENBREITE, max([len(str(name))] + [len(s) for s in werte]))
+                   for name, werte in zip(block.columns, spalten)]
+        rechts = [block[s].dtype.kind in "iufb" for s in block.columns]
+        verfuegbar = self.breite - 2 * self.rand
+
+        def zeichen():
+            return sum(breiten) + SPALTENABSTAND * (len(breiten) - 1)
+
+        groesse = min(self.schriftgroesse, verfuegbar / (max(zeichen(), 1) * ZEICHENBREITE))
+        if groesse < MIN_SCHRIFT:
+            # zu breit: breite Spalten anteilig kürzen statt unlesbar kleiner Schrift
+            groesse = MIN_SCHRIFT
+            ziel = verfuegbar / (groesse * ZEICHENBREITE) - SPALTENABSTAND * (len(breiten) - 1)
+            faktor = ziel / sum(breiten)
+            breiten = [max(4, int(b * faktor)) for b in breiten]
+
+        kopf = _pdf_text(self._zeile([_abschneiden(str(n).translate(_STEUERZEICHEN), b).ljust(b) for n, b in zip(block.columns, breiten)]))
+        return {"breiten": breiten, "rechts": rechts, "groesse": groesse,
+                "zeilenhoehe": groesse * 1.35, "kopf": kopf,
+                "breite_pt": zeichen() * ZEICHENBREITE * groesse}
+
+    @staticmethod
+    def _zeile(zellen):
+        return (" " * SPALTENABSTAND).join(zellen)
+
+    def _zeilen(self, spalten, layout):
+        ausgerichtet = []
+        for werte, breite, rechts in zip(spalten, layout["breiten"], layout["rechts"]):
+            if werte and max(map(len, werte)) > breite:
+                werte = [_abschneiden(s, breite) for s in werte]
+            ausrichten = str.rjust if rechts else str.ljust
+            ausgerichtet.append([ausrichten(s, breite) for s in werte])
+        return list(map(self._zeile, zip(*ausgerichtet)))
+
+    def _zeilen_schreiben(self, zeilen, layout):
+        hoehe = layout["zeilenhoehe"]
+        groesse = _zahl(layout["groesse"]).encode()
+        x = _zahl(self.rand).encode()
+        breite_pt = _zahl(layout["breite_pt"]).encode()
+
+        i = 0
+        while i < len(zeilen):
+            self._platz(3 * hoehe)
+            # Kopfzeile (fett, mit Linie darunter)
+            self._y -= hoehe
+            kopf_y = self._y
+            self._inhalt.append(b"BT /F4 %s Tf %s %s Td (%s) Tj ET\n0.5 w %s %s m %s %s l S\n"
+                                % (groesse, x, _zahl(kopf_y + hoehe * 0.25).encode(), layout["kopf"],
+                                   x, _zahl(kopf_y).encode(),
+                                   _zahl(self.rand + layout["breite_pt"]).encode(), _zahl(kopf_y).encode()))
+            n = min(len(zeilen) - i, int((self._y - self._unten) / hoehe))
+            seite = zeilen[i:i + n]
+
+            # Zebra-Streifen, dann alle Zeilen in einem Textblock (' = nächste Zeile + Text)
+            streifen = b"".join(b"%s %s %s %s re\n" % (x, _zahl(kopf_y - (k + 1) * hoehe).encode(),
+                                                        breite_pt, _zahl(hoehe).encode())
+                                for k in range(1, n, 2))
+            self._inhalt.append(b"0.94 g\n" + streifen + b"f 0 g\n" if streifen else b"")
+            self._inhalt.append(b"BT /F3 %s Tf %s TL %s %s Td\n" % (groesse, _zahl(hoehe).encode(), x,
+                                                                   _zahl(kopf_y + hoehe * 0.25).encode())
+                                # alle Zeilen der Seite auf einmal kodieren, dann in "(...) '" einfassen
+                                + b"(" + _pdf_text("\n".join(seite)).replace(b"\n", b") '\n(") + b") '\nET\n")
+            self._y = kopf_y - n * hoehe
+            i += n
+
+    def schliessen(self):
+        if self._ziel is None:
+            return
+        if self._inhalt is None and not self._seiten:
+            self._neue_seite()
+        if self._inhalt is not None:
+            self._seite_abschliessen()
+
+        kinder = b" ".join(b"%d 0 R" % n for n in self._seiten)
+        self._objekt(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kinder, len(self._seiten)))
+        info_nr = self._neue_objektnummer()
+        self._objekt(info_nr, b"<< /Title (%s) >>" % _pdf_text(self.titel))
+
+        xref = self._position
+        anzahl = self._naechstes_objekt
+        eintraege = [b"0000000000 65535 f \n"] + [b"%010d 00000 n \n" % self._offsets[n] for n in range(1, anzahl)]
+        self._schreiben(b"xref\n0 %d\n" % anzahl + b"".join(eintraege)
+                        + b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                        % (anzahl, info_nr, xref))
+        if self._eigene_datei:
+            self._ziel.close()
+        self._ziel = None
+
+    @property
+    def seiten(self):
+        return len(self._seiten)
+
+
+def tabellen_pdf(df, titel, ueberschrift=None, figuren=(), seitengroesse=A4_QUER, fortschritt=None):
+    """Kompletter Bericht als Bytes: Überschrift, Tabelle über beliebig viele Seiten, danach Figuren."""
+    import io
+
+    puffer = io.BytesIO()
+    with PdfBericht(puffer, titel=titel, seitengroesse=seitengroesse) as bericht:
+        bericht.ueberschrift(ueberschrift or titel)
+        bericht.tabelle(df, fortschritt=fortschritt)
+        for fig in figuren:
+            bericht.bild(fig)
+    return puffer.getvalue()
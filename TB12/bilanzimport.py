@@ -0,0 +1,103 @@
+"""
+Streaming-Import von Bilanzdaten (CSV/Parquet) für die Bilanzanalyse.
+
+Große Exporte (Bundesanzeiger, ERP) werden blockweise gelesen, geprüft und
+Block für Block durch die Kennzahlen-Engine geschickt. Im Speicher bleibt
+nur das laufende Aggregat je Schlüssel (z. B. Jahr), nie die ganze Datei.
+"""
+import numpy as np
+import pandas as pd
+
+from kennzahlen import BILANZ_FELDER, KENNZAHLEN, berechne_kennzahlen_batch
+
+CHUNKGROESSE = 200_000
+
+
+def lese_bilanzen(quelle, format="csv", chunkgroesse=CHUNKGROESSE, sep=";", decimal=",", spalten=None):
+    """
+    Liest eine Bilanzdatei blockweise und liefert DataFrames mit höchstens ``chunkgroesse`` Zeilen.
+
+    ``quelle`` ist ein Pfad oder ein Dateiobjekt (z. B. Streamlit-Upload).
+    ``spalten`` begrenzt die gelesenen Spalten, damit ungenutzte Felder gar nicht erst
+    im Speicher landen.
+    """
+    if format == "csv":
+        yield from pd.read_csv(quelle, sep=sep, decimal=decimal, usecols=spalten, chunksize=chunkgroesse)
+    elif format == "parquet":
+        import pyarrow.parquet as pq
+
+        datei = pq.ParquetFile(quelle)
+        for batch in datei.iter_batches(batch_size=chunkgroesse, columns=spalten):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unbekanntes Format '{format}' (erlaubt: csv, parquet).")
+
+
+def pruefe_chunk(chunk, schluessel="Jahr"):
+    """
+    Prüft einen Block und wandelt die Bilanzspalten in float64 um.
+
+    Fehlen Pflichtspalten, wird ein ``ValueError`` ausgelöst. Zeilen mit
+    nicht numerischen oder fehlenden Werten werden verworfen.
+    Gibt (gültige Zeilen, Anzahl verworfener Zeilen) zurück.
+    """
+    fehlend = [f for f in [schluessel] + BILANZ_FELDER if f not in chunk.columns]
+    if fehlend:
+        raise ValueError(f"Spalten fehlen: {', '.join(fehlend)}")
+
+    werte = {f: pd.to_numeric(chunk[f], errors="coerce").to_numpy(dtype=np.float64) for f in BILANZ_FELDER}
+    gueltig = np.ones(len(chunk), dtype=bool)
+    for arr in werte.values():
+        gueltig &= np.isfinite(arr)
+    gueltig &= chunk[schluessel].notna().to_numpy()
+
+    geprueft = pd.DataFrame({schluessel: chunk[schluessel].to_numpy()[gueltig]})
+    for f, arr in werte.items():
+        geprueft[f] = arr[gueltig]
+    return geprueft, int((~gueltig).sum())
+
+
+def aggregiere_bilanzen(chunks, schluessel="Jahr", fortschritt=None):
+    """
+    Schickt jeden Block durch die Kennzahlen-Engine und aggregiert je ``schluessel``.
+
+    Ergebnis ist ein DataFrame mit einer Zeile je Schlüssel: Anzahl der Unternehmen
+    sowie Durchschnitt der Bilanzpositionen und der Kennzahlen (Nullnenner zählen
+    nicht mit). Zusätzlich wird ein Dict mit Zeilenstatistik zurückgegeben.
+    ``fortschritt(zeilen)`` wird nach jedem Block aufgerufen.
+    """
+    spalten = BILANZ_FELDER + KENNZAHLEN
+    summen = None
+    anzahl = None
+    statistik = {"zeilen": 0, "verworfen": 0, "chunks": 0}
+
+    for chunk in chunks:
+        geprueft, verworfen = pruefe_chunk(chunk, schluessel)
+        statistik["zeilen"] += len(chunk)
+        statistik["verworfen"] += verworfen
+        statistik["chunks"] += 1
+
+        if len(geprueft):
+            kz = berechne_kennzahlen_batch(geprueft, dezimalen=None)
+            block = pd.concat([geprueft, kz], axis=1)
+            gruppen = block.groupby(schluessel, sort=False)[spalten]
+            teil_summen = gruppen.sum()
+            teil_anzahl = gruppen.count()
+
+            if summen is None:
+                summen, anzahl = teil_summen, teil_anzahl
+            else:
+                summen = summen.add(teil_summen, fill_value=0)
+                anzahl = anzahl.add(teil_anzahl, fill_value=0)
+
+        if fortschritt is not None:
+            fortschritt(statistik["zeilen"])
+
+    if summen is None:
+        leer = pd.DataFrame(columns=[schluessel, "Anzahl"] + spalten)
+        return leer, statistik
+
+    mittel = (summen / anzahl.where(anzahl > 0)).round(2)
+    mittel.insert(0, "Anzahl", anzahl["AV"].astype(np.int64))
+    ergebnis = mittel.sort_index().reset_index()
+    return ergebnis, statistik
@@ -0,0 +1,134 @@
+"""
+Lokale Bilder für Startseite, Linkliste, Impressum und Sidebar.
+
+Die Bilder liegen neben TB11.py und werden nicht mehr bei jedem Rendern von
+raw.githubusercontent.com geladen. Je Bild wird einmal pro Prozess eine
+verkleinerte WebP-Variante in passender Breite erzeugt (doppelte
+Anzeigebreite für HiDPI-Displays) und im Speicher gehalten; alle Sessions
+bekommen dieselben Bytes und damit dieselbe Media-URL. Fehlt eine Datei
+lokal, wird ein lokal erzeugter Platzhalter angezeigt (kein Abruf von GitHub).
+"""
+import io
+import os
+import threading
+
+from PIL import Image, ImageDraw
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+
+# Bild -> Anzeigebreite in Pixeln ("stretch"-Bilder: Breite einer Spalte im Wide-Layout)
+BILDER = {
+    "LogoMT.png": 120,
+    "BildMural1.png": 700,
+    "TOM26.png": 250,
+}
+HIDPI_FAKTOR = 2
+WEBP_QUALITAET = 82
+
+
+def webp_variante(pfad, breite, qualitaet=WEBP_QUALITAET):
+    """Bild auf höchstens ``breite`` Pixel verkleinert (nie vergrößert) als WebP-Bytes."""
+    with Image.open(pfad) as bild:
+        bild.load()
+        if bild.width > breite:
+            bild = bild.resize((breite, round(bild.height * breite / bild.width)), Image.LANCZOS)
+        if bild.mode not in ("RGB", "RGBA"):
+            bild = bild.convert("RGBA" if "A" in bild.getbands() or "transparency" in bild.info else "RGB")
+        puffer = io.BytesIO()
+        bild.save(puffer, format="WEBP", quality=qualitaet, method=4)
+    return puffer.getvalue()
+
+
+def platzhalter(breite, text="Bild nicht verfügbar", qualitaet=WEBP_QUALITAET):
+    """Schlichter Platzhalter (16:9, hellgrau mit Text) als WebP-Bytes."""
+    bild = Image.new("RGB", (breite, breite * 9 // 16), (238, 238, 238))
+    zeichnen = ImageDraw.Draw(bild)
+    zeichnen.rectangle([0, 0, bild.width - 1, bild.height - 1], outline=(200, 200, 200))
+    zeichnen.text((bild.width / 2, bild.height / 2), text, fill=(120, 120, 120), anchor="mm")
+    puffer = io.BytesIO()
+    bild.save(puffer, format="WEBP", quality=qualitaet)
+    return puffer.getvalue()
+
+
+class BildSpeicher:
+    """
+    Prozessweiter Speicher der WebP-Varianten, Schlüssel (Datei, Breite, mtime).
+
+    ``variante`` liefert die Bytes oder ``None``, wenn die Datei lokal fehlt
+    (``platzhalter_variante`` liefert dann den Ersatz);
+    ``vorbereiten`` erzeugt alle Varianten aus ``BILDER`` im Voraus. Fehlende bzw.
+    nicht lesbare Dateien stehen in ``fehler``.
+    """
+
+    def __init__(self, verzeichnis=VERZEICHNIS, faktor=HIDPI_FAKTOR):
+        self.verzeichnis = verzeichnis
+        self.faktor = faktor
+        self._varianten = {}
+        self._lock = threading.Lock()
+        self.fehler = {}
+
+    def pfad(self, name):
+        return os.path.join(self.verzeichnis, name)
+
+    def variante(self, name, anzeigebreite=None):
+        pfad = self.pfad(name)
+        try:
+            mtime = os.path.getmtime(pfad)
+        except OSError:
+            self.fehler[name] = "fehlt lokal"
+            return None
+        breite = (anzeigebreite or BILDER.get(name, 700)) * self.faktor
+        schluessel = (name, breite, mtime)
+        daten = self._varianten.get(schluessel)
+        if daten is None:
+            with self._lock:
+                daten = self._varianten.get(schluessel)
+                if daten is None:
+                    try:
+                        daten = webp_variante(pfad, breite)
+                    except OSError as e:
+                        self.fehler[name] = f"{type(e).__name__}: {e}"
+                        return None
+                    self._varianten[schluessel] = daten
+        return daten
+
+    def platzhalter_variante(self, anzeigebreite=700):
+        breite = anzeigebreite * self.faktor
+        schluessel = ("<platzhalter>", breite, 0)
+        with self._lock:
+            daten = self._varianten.get(schluessel)
+            if daten is None:
+                daten = self._varianten[schluessel] = platzhalter(breite)
+        return daten
+
+    def vorbereiten(self, bilder=BILDER):
+        for name, breite in bilder.items():
+            self.variante(name, breite)
+
+    def statistik(self):
+        """Original- und Variantengröße in Bytes je vorhandener Variante."""
+        return {(name, breite): (os.path.getsize(self.pfad(name)), len(daten))
+                for (name, breite, _), daten in list(self._varianten.items()) if name in BILDER}
+
+
+# Prozessweite Instanz; die Varianten werden beim ersten Zugriff im Hintergrund erzeugt
+_speicher = None
+_speicher_lock = threading.Lock()
+
+
+def bild_speicher():
+    global _speicher
+    with _speicher_lock:
+        if _speicher is None:
+            _speicher = BildSpeicher()
+            threading.Thread(target=_speicher.vorbereiten, name="Bilder", daemon=True).start()
+        return _speicher
+
+
+def bildquelle(name, anzeigebreite=None):
+    """Was ``st.image`` bekommt: lokale WebP-Variante oder, falls die Datei fehlt, ein Platzhalter."""
+    speicher = bild_speicher()
+    daten = speicher.variante(name, anzeigebreite)
+    if daten is None:
+        daten = speicher.platzhalter_variante(anzeigebreite or BILDER.get(name, 700))
+    return daten
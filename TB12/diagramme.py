@@ -0,0 +1,462 @@
+"""
+Diagramm-Schicht für die Seiten (Balken-, Linien- und Histogrammdiagramme).
+
+Seiten beschreiben ein Diagramm als Spezifikation (``balken_spec``,
+``linien_spec``, ``histogramm_spec``); ein ``DiagrammBackend`` setzt sie um: ``MatplotlibBackend``
+rastert serverseitig zu PNG (und liefert Figuren für den PDF-Export),
+``VegaLiteBackend`` schickt nur die Datenpunkte als Vega-Lite-Spezifikation,
+gezeichnet wird im Browser.
+
+Figuren werden ohne ``pyplot`` erzeugt (``matplotlib.figure.Figure``), landen
+also nie im globalen Figure-Manager. Fertige PNGs liegen in einem LRU-Cache,
+dessen Schlüssel ein Hash der Eingabedaten ist; gleiche Daten werden nur
+einmal gerastert. Für Live-Reihen bleiben Figuren bestehen und nur die
+Liniendaten werden ausgetauscht, statt Achsen jedes Mal neu aufzubauen.
+"""
+import hashlib
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+
+# numpy und matplotlib (~0,5 s Importzeit) werden erst in den Funktionen geladen:
+# TB11.py importiert dieses Modul auf jeder Seite (Backend-Auswahl in der Sidebar),
+# Seiten ohne Diagramme und das Vega-Lite-Backend brauchen matplotlib gar nicht
+
+NS_PRO_TAG = 86400 * 10**9
+# Linienstil der eingeblendeten Zusatzreihen (z. B. SMA/EMA), der Reihe nach vergeben
+ZUSATZ_STILE = [("dimgray", "--", [6, 3]), ("black", ":", [2, 2]), ("darkgoldenrod", "-.", [6, 2, 2, 2])]
+LOKALE_ZEITZONE = datetime.now().astimezone().tzinfo
+
+
+def daten_hash(*teile):
+    """Stabiler Hash über Arrays und einfache Werte (Schlüssel für den Bild-Cache)."""
+    import numpy as np
+
+    h = hashlib.blake2b(digest_size=16)
+    for teil in teile:
+        if teil is None:
+            h.update(b"\0")
+            continue
+        arr = np.asarray(teil)
+        if arr.dtype == object or arr.dtype.kind in "US":
+            h.update(repr(arr.tolist()).encode())
+        else:
+            h.update(arr.dtype.str.encode())
+            h.update(np.ascontiguousarray(arr).tobytes())
+        h.update(b"|")
+    return h.hexdigest()
+
+
+class BildCache:
+    """LRU-Cache für gerenderte Bilder, begrenzt nach Anzahl und Gesamtgröße."""
+
+    def __init__(self, max_eintraege=256, max_bytes=64 * 2**20):
+        self.max_eintraege = max_eintraege
+        self.max_bytes = max_bytes
+        self._eintraege = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.treffer = 0
+        self.fehlzugriffe = 0
+
+    def holen(self, schluessel):
+        with self._lock:
+            bild = self._eintraege.get(schluessel)
+            if bild is None:
+                self.fehlzugriffe += 1
+                return None
+            self._eintraege.move_to_end(schluessel)
+            self.treffer += 1
+            return bild
+
+    def ablegen(self, schluessel, bild):
+        with self._lock:
+            if schluessel in self._eintraege:
+                self._bytes -= len(self._eintraege.pop(schluessel))
+            self._eintraege[schluessel] = bild
+            self._bytes += len(bild)
+            while self._eintraege and (len(self._eintraege) > self.max_eintraege or self._bytes > self.max_bytes):
+                _, alt = self._eintraege.popitem(last=False)
+                self._bytes -= len(alt)
+
+    def __len__(self):
+        return len(self._eintraege)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+
+def als_png(fig, dpi=100):
+    puffer = io.BytesIO()
+    fig.savefig(puffer, format="png", dpi=dpi)
+    return puffer.getvalue()
+
+
+# ---------------------------------------------------
+# Balkendiagramm (Bilanzanalyse)
+# ---------------------------------------------------
+BALKEN_FARBEN = ["red", "blue", "green", "orange", "purple", "brown", "pink", "gray", "olive", "cyan"]
+
+
+def balken_figur(labels, felder, werte, titel, groesse=(10, 6)):
+    """Gruppiertes Balkendiagramm: eine Gruppe je Feld, ein Balken je Label (Zeile von ``werte``)."""
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=groesse)
+    ax = fig.subplots()
+    x = np.arange(len(felder))
+    breite = 0.7 / max(len(labels), 1)
+
+    for i, label in enumerate(labels):
+        ax.bar(x - 0.35 + breite * (i + 0.5), werte[i],
+               width=breite, color=BALKEN_FARBEN[i % len(BALKEN_FARBEN)], label=label)
+
+    # Achsen & Titel
+    ax.set_xticks(x)
+    ax.set_xticklabels(felder)
+    ax.set_ylabel("Wert")
+    ax.set_title(titel)
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    return fig
+
+
+def balken_png(labels, felder, werte, titel):
+    import numpy as np
+
+    werte = np.asarray(werte, dtype=np.float64)
+    schluessel = ("balken", daten_hash(labels, felder, werte, titel))
+    bild = bild_cache.holen(schluessel)
+    if bild is None:
+        bild = als_png(balken_figur(labels, felder, werte, titel))
+        bild_cache.ablegen(schluessel, bild)
+    return bild
+
+
+# ---------------------------------------------------
+# Histogramm (Monte-Carlo-Simulation)
+# ---------------------------------------------------
+def histogramm_figur(kanten, zaehler, titel, farbe, markierungen, groesse=(5, 3)):
+    """Histogramm aus fertigen Klassen; ``markierungen`` ({Name: x}) als senkrechte Linien."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=groesse, layout="constrained")
+    ax = fig.subplots()
+    ax.stairs(zaehler, kanten, fill=True, color=farbe, alpha=0.7)
+    for i, (name, x) in enumerate(markierungen.items()):
+        farbe_linie, strich, _ = ZUSATZ_STILE[i % len(ZUSATZ_STILE)]
+        ax.axvline(x, color=farbe_linie, linestyle=strich, linewidth=1, label=name)
+    ax.set_title(titel, fontsize=10)
+    ax.set_ylabel("Szenarien")
+    if markierungen:
+        ax.legend(fontsize=7)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    return fig
+
+
+def histogramm_png(kanten, zaehler, titel, farbe, markierungen):
+    schluessel = ("histogramm", daten_hash(kanten, zaehler, titel, farbe,
+                                           *[teil for eintrag in markierungen.items() for teil in eintrag]))
+    bild = bild_cache.holen(schluessel)
+    if bild is None:
+        bild = als_png(histogramm_figur(kanten, zaehler, titel, farbe, markierungen))
+        bild_cache.ablegen(schluessel, bild)
+    return bild
+
+
+# ---------------------------------------------------
+# Liniendiagramme (Indizes), Figuren werden wiederverwendet
+# ---------------------------------------------------
+class LiveDiagramm:
+    """Dauerhafte Figur für eine Kursreihe; ``aktualisieren`` tauscht nur die Daten aus."""
+
+    def __init__(self, titel, farbe, groesse=(5, 3)):
+        import matplotlib.dates as mdates
+        from matplotlib.figure import Figure
+
+        self.lock = threading.Lock()
+        self.fig = Figure(figsize=groesse)
+        # feste Ränder statt tight_layout: das Layout wird nicht bei jedem Update neu berechnet
+        self.fig.subplots_adjust(left=0.17, right=0.97, top=0.9, bottom=0.3)
+        self.ax = self.fig.subplots()
+        (self.linie,) = self.ax.plot([], [], color=farbe)
+        self.band = None
+        self.zusatz = {}   # Name -> Line2D der eingeblendeten Reihen
+        self.farbe = farbe
+
+        self.ax.set_title(titel)
+        self.ax.set_xlabel("Zeit")
+        self.ax.set_ylabel("Indexstand")
+        self.ax.grid(True)
+        self.ax.xaxis_date(tz=LOKALE_ZEITZONE)
+        locator = mdates.AutoDateLocator(tz=LOKALE_ZEITZONE)
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator, tz=LOKALE_ZEITZONE))
+        self.ax.tick_params(axis="x", labelrotation=45)
+
+    def aktualisieren(self, zeiten_ns, werte, band=None, linien=()):
+        import numpy as np
+
+        x = np.asarray(zeiten_ns, dtype=np.float64) / NS_PRO_TAG  # Matplotlib-Datumszahl (Tage seit 1970)
+        self.linie.set_data(x, werte)
+        self.linie.set_marker("o" if len(x) <= 50 else "")
+
+        # Zusatzreihen: Linien bleiben bestehen, nicht übergebene werden geleert
+        namen = [name for name, _, _ in linien]
+        for i, (name, z, w) in enumerate(linien):
+            if name not in self.zusatz:
+                farbe, stil, _ = ZUSATZ_STILE[i % len(ZUSATZ_STILE)]
+                (self.zusatz[name],) = self.ax.plot([], [], color=farbe, linestyle=stil, linewidth=1, label=name)
+            self.zusatz[name].set_data(np.asarray(z, dtype=np.float64) / NS_PRO_TAG, w)
+        for name, linie in self.zusatz.items():
+            if name not in namen:
+                linie.set_data([], [])
+        legende = self.ax.get_legend()
+        if namen:
+            self.ax.legend(handles=[self.zusatz[n] for n in namen], loc="upper left", fontsize=7)
+        elif legende is not None:
+            legende.remove()
+
+        if self.band is not None:
+            self.band.remove()
+            self.band = None
+        if band is not None:
+            # Spanne min/max je Zeitfenster
+            self.band = self.ax.fill_between(x, band[0], band[1], color=self.farbe, alpha=0.2, linewidth=0)
+
+        if len(x):
+            self.ax.relim()
+            self.ax.autoscale_view()
+        return als_png(self.fig)
+
+
+class FigurenPool:
+    """LRU-begrenzte Menge wiederverwendbarer ``LiveDiagramm``-Figuren."""
+
+    def __init__(self, max_figuren=32):
+        self.max_figuren = max_figuren
+        self._figuren = OrderedDict()
+        self._lock = threading.Lock()
+
+    def holen(self, titel, farbe):
+        schluessel = (titel, farbe)
+        with self._lock:
+            diagramm = self._figuren.get(schluessel)
+            if diagramm is None:
+                diagramm = LiveDiagramm(titel, farbe)
+                self._figuren[schluessel] = diagramm
+                while len(self._figuren) > self.max_figuren:
+                    self._figuren.popitem(last=False)
+            else:
+                self._figuren.move_to_end(schluessel)
+            return diagramm
+
+    def __len__(self):
+        return len(self._figuren)
+
+
+def linien_png(zeiten_ns, werte, titel, farbe, band=None, linien=()):
+    """
+    PNG einer Kursreihe; gleiche Daten kommen aus dem Cache, sonst wird die Figur aktualisiert.
+
+    ``linien`` sind zusätzlich eingeblendete Reihen als (Name, zeiten_ns, werte).
+    """
+    import numpy as np
+
+    zeiten_ns = np.asarray(zeiten_ns, dtype=np.int64)
+    werte = np.asarray(werte, dtype=np.float64)
+    schluessel = ("linie", daten_hash(zeiten_ns, werte, titel, farbe,
+                                      None if band is None else np.asarray(band, dtype=np.float64),
+                                      *[teil for linie in linien for teil in linie]))
+    bild = bild_cache.holen(schluessel)
+    if bild is None:
+        diagramm = figuren_pool.holen(titel, farbe)
+        with diagramm.lock:
+            bild = diagramm.aktualisieren(zeiten_ns, werte, band, linien)
+        bild_cache.ablegen(schluessel, bild)
+    return bild
+
+
+# Prozessweite Instanzen (von allen Sessions geteilt)
+bild_cache = BildCache()
+figuren_pool = FigurenPool()
+
+
+# ---------------------------------------------------
+# Diagramm-Spezifikationen
+# ---------------------------------------------------
+def balken_spec(labels, felder, werte, titel):
+    import numpy as np
+
+    return {"art": "balken", "labels": list(labels), "felder": list(felder),
+            "werte": np.asarray(werte, dtype=np.float64), "titel": titel}
+
+
+def linien_spec(zeiten_ns, werte, titel, farbe, band=None, linien=()):
+    import numpy as np
+
+    return {"art": "linie", "zeiten_ns": np.asarray(zeiten_ns, dtype=np.int64),
+            "werte": np.asarray(werte, dtype=np.float64), "titel": titel, "farbe": farbe,
+            "band": None if band is None else (np.asarray(band[0], dtype=np.float64),
+                                               np.asarray(band[1], dtype=np.float64)),
+            "linien": [(name, np.asarray(z, dtype=np.int64), np.asarray(w, dtype=np.float64))
+                       for name, z, w in linien]}
+
+
+def histogramm_spec(kanten, zaehler, titel, farbe="steelblue", markierungen=None):
+    import numpy as np
+
+    return {"art": "histogramm", "kanten": np.asarray(kanten, dtype=np.float64),
+            "zaehler": np.asarray(zaehler, dtype=np.int64), "titel": titel, "farbe": farbe,
+            "markierungen": {name: float(x) for name, x in (markierungen or {}).items()}}
+
+
+# ---------------------------------------------------
+# Backends
+# ---------------------------------------------------
+class DiagrammBackend(ABC):
+    name = ""
+
+    @abstractmethod
+    def rendern(self, spec):
+        """Setzt eine Spezifikation in die Ausgabe des Backends um (ohne Streamlit)."""
+        pass
+
+    @abstractmethod
+    def anzeigen(self, ausgabe):
+        """Zeigt eine Ausgabe von ``rendern`` in Streamlit an."""
+        pass
+
+    def zeichnen(self, spec):
+        self.anzeigen(self.rendern(spec))
+
+
+class MatplotlibBackend(DiagrammBackend):
+    name = "Server (PNG)"
+
+    def rendern(self, spec):
+        if spec["art"] == "balken":
+            return balken_png(spec["labels"], spec["felder"], spec["werte"], spec["titel"])
+        if spec["art"] == "histogramm":
+            return histogramm_png(spec["kanten"], spec["zaehler"], spec["titel"], spec["farbe"],
+                                  spec["markierungen"])
+        return linien_png(spec["zeiten_ns"], spec["werte"], spec["titel"], spec["farbe"], spec["band"],
+                          spec.get("linien", ()))
+
+    def anzeigen(self, ausgabe):
+        import streamlit as st
+
+        st.image(ausgabe, width="stretch")
+
+    def figur(self, spec, groesse=(14, 5)):
+        """Eigenständige Figur, z. B. für ``PdfPages.savefig`` (nur Balkendiagramme)."""
+        return balken_figur(spec["labels"], spec["felder"], spec["werte"], spec["titel"], groesse=groesse)
+
+
+class VegaLiteBackend(DiagrammBackend):
+    name = "Browser (Vega-Lite)"
+
+    def rendern(self, spec):
+        if spec["art"] == "balken":
+            werte = [
+                {"Feld": feld, "Zeile": label, "Wert": float(spec["werte"][i][j])}
+                for i, label in enumerate(spec["labels"])
+                for j, feld in enumerate(spec["felder"])
+            ]
+            return {
+                "title": spec["titel"],
+                "data": {"values": werte},
+                "mark": "bar",
+                "encoding": {
+                    "x": {"field": "Feld", "type": "nominal", "sort": spec["felder"], "title": None},
+                    "xOffset": {"field": "Zeile", "sort": spec["labels"]},
+                    "y": {"field": "Wert", "type": "quantitative", "title": "Wert"},
+                    "color": {"field": "Zeile", "title": None, "sort": spec["labels"],
+                              "scale": {"range": BALKEN_FARBEN[:len(spec["labels"])]}},
+                },
+            }
+
+        if spec["art"] == "histogramm":
+            kanten = spec["kanten"].tolist()
+            klassen = [{"von": a, "bis": b, "Szenarien": n}
+                       for a, b, n in zip(kanten[:-1], kanten[1:], spec["zaehler"].tolist())]
+            schichten = [{
+                "data": {"values": klassen},
+                "mark": {"type": "bar", "color": spec["farbe"], "opacity": 0.7},
+                "encoding": {"x": {"field": "von", "type": "quantitative", "bin": {"binned": True},
+                                   "title": None},
+                             "x2": {"field": "bis"},
+                             "y": {"field": "Szenarien", "type": "quantitative"}},
+            }]
+            markierungen = spec["markierungen"]
+            if markierungen:
+                namen = list(markierungen)
+                stile = [ZUSATZ_STILE[i % len(ZUSATZ_STILE)] for i in range(len(namen))]
+                schichten.append({
+                    "data": {"values": [{"Markierung": n, "x": x} for n, x in markierungen.items()]},
+                    "mark": {"type": "rule", "strokeWidth": 1},
+                    "encoding": {
+                        "x": {"field": "x", "type": "quantitative"},
+                        "color": {"field": "Markierung", "type": "nominal", "title": None,
+                                  "scale": {"domain": namen, "range": [s[0] for s in stile]},
+                                  "legend": {"orient": "top-right"}},
+                        "strokeDash": {"field": "Markierung", "type": "nominal", "legend": None,
+                                       "scale": {"domain": namen, "range": [s[2] for s in stile]}},
+                    },
+                })
+            return {"title": spec["titel"], "layer": schichten}
+
+        # Zeit in Millisekunden (Vega-Lite), Werte ohne NumPy-Typen
+        zeiten_ms = (spec["zeiten_ns"] // 10**6).tolist()
+        werte = [{"Zeit": z, "Kurs": k} for z, k in zip(zeiten_ms, spec["werte"].tolist())]
+        x = {"field": "Zeit", "type": "temporal", "title": "Zeit"}
+        schichten = [{
+            "mark": {"type": "line", "color": spec["farbe"], "point": len(werte) <= 50},
+            "encoding": {"x": x, "y": {"field": "Kurs", "type": "quantitative",
+                                       "title": "Indexstand", "scale": {"zero": False}}},
+        }]
+        if spec["band"] is not None:
+            for eintrag, lo, hi in zip(werte, spec["band"][0].tolist(), spec["band"][1].tolist()):
+                eintrag["Min"], eintrag["Max"] = lo, hi
+            schichten.insert(0, {
+                "mark": {"type": "area", "color": spec["farbe"], "opacity": 0.2},
+                "encoding": {"x": x, "y": {"field": "Min", "type": "quantitative"},
+                             "y2": {"field": "Max"}},
+            })
+        linien = spec.get("linien", ())
+        if linien:
+            # Zusatzreihen in einer Schicht mit eigenen Daten, Farbe/Strichart je Reihe (mit Legende)
+            punkte = [{"Zeit": z, "Wert": w, "Reihe": name}
+                      for name, zeiten, reihe in linien
+                      for z, w in zip((zeiten // 10**6).tolist(), reihe.tolist()) if w == w]
+            stile = [ZUSATZ_STILE[i % len(ZUSATZ_STILE)] for i in range(len(linien))]
+            namen = [name for name, _, _ in linien]
+            schichten.append({
+                "data": {"values": punkte},
+                "mark": {"type": "line", "strokeWidth": 1},
+                "encoding": {
+                    "x": x, "y": {"field": "Wert", "type": "quantitative"},
+                    "color": {"field": "Reihe", "type": "nominal", "title": None,
+                              "scale": {"domain": namen, "range": [s[0] for s in stile]},
+                              "legend": {"orient": "top-left"}},
+                    "strokeDash": {"field": "Reihe", "type": "nominal", "legend": None,
+                                   "scale": {"domain": namen, "range": [s[2] for s in stile]}},
+                },
+            })
+        return {"title": spec["titel"], "data": {"values": werte}, "layer": schichten}
+
+    def anzeigen(self, ausgabe):
+        import streamlit as st
+
+        st.vega_lite_chart(ausgabe, width="stretch")
+
+
+BACKENDS = {b.name: b for b in (VegaLiteBackend(), MatplotlibBackend())}
+# Standard über DIAGRAMM_BACKEND ("vega-lite" oder "matplotlib")
+STANDARD_BACKEND = (MatplotlibBackend.name if os.environ.get("DIAGRAMM_BACKEND", "vega-lite") == "matplotlib"
+                    else VegaLiteBackend.name)
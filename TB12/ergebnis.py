@@ -0,0 +1,203 @@
+"""
+Berechnungen der Ergebnisrechnung (RKI / RKII / Betriebsergebnis).
+
+Enthält die Spaltensummen, die vier Salden und die Summen-&-Salden-Tabelle
+ohne Streamlit-Abhängigkeit. ``LaufendeSummen`` hält die Summen als Zustand
+und aktualisiert sie nur aus den geänderten Zellen des Dateneditors.
+"""
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# Betragsspalten der Ergebnistabelle (ohne Kontoname)
+BETRAGS_SPALTEN = [
+    # RKI
+    "Aufwand",
+    "Ertrag",
+    # RKII – Unternehmensbezogene Abgrenzung
+    "Neutrale Aufwendungen",
+    "Neutrale Erträge",
+    # RKII – Kostenrechnerische Korrekturen
+    "Betriebliche Aufwendungen",
+    "Verrechnete Kosten",
+    # Betriebsergebnisrechnung
+    "Kosten",
+    "Leistung",
+]
+
+# Nach wie vielen inkrementellen Updates gegen eine Vollberechnung geprüft wird
+PRUEF_INTERVALL = 50
+
+
+def kontonamen(namen):
+    """
+    Kontonamen als String-Array, mit pyarrow in einem zusammenhängenden Puffer
+    statt als einzelne Python-Objekte je Zeile.
+
+    Die Beträge bleiben float64: float32 hat nur ~7 signifikante Stellen,
+    Cent-Beträge ab einigen 100.000 wären nicht mehr exakt.
+    """
+    dtype = "string[pyarrow]" if importlib.util.find_spec("pyarrow") is not None else "string"
+    return pd.array(list(namen), dtype=dtype)
+
+
+def leere_ergebnistabelle(zeilen=20):
+    """Leere Eingabetabelle mit ``zeilen`` Konten."""
+    df = pd.DataFrame({"Kontoname": kontonamen([""] * zeilen)})
+    for spalte in BETRAGS_SPALTEN:
+        df[spalte] = np.zeros(zeilen)
+    return df
+
+
+def berechne_summen(df):
+    """Vollständige Spaltensummen (NaN/leere Zellen zählen als 0)."""
+    return {s: float(np.nansum(df[s].to_numpy(dtype=np.float64))) for s in BETRAGS_SPALTEN}
+
+
+def berechne_salden(sums):
+    """Die vier Salden sowie Produktivität und EBIT aus den Spaltensummen."""
+    saldo_rki = sums["Ertrag"] - sums["Aufwand"]
+    saldo_neutral = sums["Neutrale Erträge"] - sums["Neutrale Aufwendungen"]
+    saldo_korrektur = sums["Verrechnete Kosten"] - sums["Betriebliche Aufwendungen"]
+    betriebsergebnis = sums["Leistung"] - sums["Kosten"]
+
+    produktivitaet = sums["Leistung"] / sums["Kosten"] if sums["Kosten"] != 0 else 0
+
+    return {
+        "saldo_rki": saldo_rki,
+        "saldo_neutral": saldo_neutral,
+        "saldo_korrektur": saldo_korrektur,
+        "betriebsergebnis": betriebsergebnis,
+        "produktivitaet": produktivitaet,
+        "ebit": betriebsergebnis,
+    }
+
+
+def summen_tabelle(sums, salden):
+    """Tabelle mit den Zeilen 'Summe' und 'Saldo / Ergebnis'."""
+    return pd.DataFrame({
+        "": ["Summe", "Saldo / Ergebnis"],
+        "Aufwand": [sums["Aufwand"], -salden["saldo_rki"]],
+        "Ertrag": [sums["Ertrag"], salden["saldo_rki"]],
+        "Neutrale Aufwendungen": [sums["Neutrale Aufwendungen"], -salden["saldo_neutral"]],
+        "Neutrale Erträge": [sums["Neutrale Erträge"], salden["saldo_neutral"]],
+        "Betriebliche Aufwendungen": [sums["Betriebliche Aufwendungen"], -salden["saldo_korrektur"]],
+        "Verrechnete Kosten": [sums["Verrechnete Kosten"], salden["saldo_korrektur"]],
+        "Kosten": [sums["Kosten"], -salden["betriebsergebnis"]],
+        "Leistung": [sums["Leistung"], salden["betriebsergebnis"]],
+    })
+
+
+def ergebnis_tabelle(df):
+    """
+    Eingabetabelle mit angehängten Zeilen 'Summe' und 'Saldo / Ergebnis' (wie der Export der Seite).
+
+    Gibt zusätzlich die Salden zurück.
+    """
+    sums = berechne_summen(df)
+    salden = berechne_salden(sums)
+    return pd.concat([df, summen_tabelle(sums, salden)], ignore_index=True), salden
+
+
+def _als_zahl(wert):
+    # Geleerte Zellen kommen als None/NaN und zählen wie bei df.sum() als 0
+    if wert is None:
+        return 0.0
+    wert = float(wert)
+    return 0.0 if np.isnan(wert) else wert
+
+
+class LaufendeSummen:
+    """
+    Spaltensummen und Salden als Zustand über Reruns hinweg.
+
+    ``basis`` ist das DataFrame, das dem Dateneditor übergeben wird. Der Editor
+    meldet Änderungen als ``edited_rows`` ({Zeile: {Spalte: Wert}}) relativ zu
+    dieser Basis; ``anwenden`` verrechnet nur die Zellen, die sich seit dem
+    letzten Aufruf geändert haben. Bei unbekannten Zeilen/Spalten und alle
+    ``PRUEF_INTERVALL`` Updates wird auf eine Vollberechnung zurückgegriffen.
+    ``abgleichen`` holt den Stand nach, wenn der Editor ohne Callback
+    zurückgesetzt wurde.
+    """
+
+    def __init__(self, basis):
+        self.basis = basis
+        self.angewendet = {}
+        self.updates = 0
+        self.vollberechnungen = 0
+        self._voll(basis)
+
+    def _voll(self, df, angewendet=None):
+        self.sums = berechne_summen(df)
+        self.salden = berechne_salden(self.sums)
+        self.angewendet = angewendet or {}
+        self.vollberechnungen += 1
+
+    def _basiswert(self, zeile, spalte):
+        return _als_zahl(self.basis[spalte].iat[zeile])
+
+    @staticmethod
+    def _zellen(edited_rows):
+        # {Zeile: {Spalte: Wert}} -> {(Zeile, Spalte): Wert}, nur Betragsspalten
+        return {
+            (int(zeile), spalte): wert
+            for zeile, aenderungen in (edited_rows or {}).items()
+            for spalte, wert in aenderungen.items()
+            if spalte in BETRAGS_SPALTEN
+        }
+
+    def abgleichen(self, edited_rows):
+        """
+        Gleicht die Summen mit dem aktuellen Editorzustand ab.
+
+        Streamlit verwirft den Widget-Zustand, wenn der Editor in einem Lauf
+        nicht gerendert wird (Seitenwechsel); der Editor zeigt danach wieder
+        die unveränderte Basis. ``edited_rows`` ist dann leer bzw. ``None``
+        und bereits verrechnete Änderungen werden zurückgenommen.
+        """
+        if self._zellen(edited_rows) != self.angewendet:
+            self.anwenden(edited_rows or {})
+
+    def anwenden(self, edited_rows):
+        """Verrechnet die Differenz zwischen neuen und bereits verrechneten Zellwerten."""
+        neu = self._zellen(edited_rows)
+
+        if any(not 0 <= zeile < len(self.basis) for zeile, _ in neu):
+            self._voll(self.aktueller_stand(neu), neu)
+            return
+
+        for zelle in neu.keys() | self.angewendet.keys():
+            zeile, spalte = zelle
+            alt = _als_zahl(self.angewendet[zelle]) if zelle in self.angewendet else self._basiswert(zeile, spalte)
+            aktuell = _als_zahl(neu[zelle]) if zelle in neu else self._basiswert(zeile, spalte)
+            if aktuell != alt:
+                self.sums[spalte] += aktuell - alt
+
+        self.angewendet = neu
+        self.salden = berechne_salden(self.sums)
+        self.updates += 1
+
+        if self.updates % PRUEF_INTERVALL == 0:
+            self.pruefen(self.aktueller_stand())
+
+    def aktueller_stand(self, angewendet=None):
+        """Basis mit allen verrechneten Änderungen (für Vollberechnung/Prüfung)."""
+        df = self.basis.copy()
+        for (zeile, spalte), wert in (self.angewendet if angewendet is None else angewendet).items():
+            if 0 <= zeile < len(df):
+                df.iat[zeile, df.columns.get_loc(spalte)] = _als_zahl(wert)
+        return df
+
+    def pruefen(self, df):
+        """
+        Vergleicht die laufenden Summen mit einer Vollberechnung über ``df``.
+
+        Bei Abweichung werden die Summen neu gesetzt. Gibt True zurück, wenn
+        die laufenden Summen konsistent waren.
+        """
+        voll = berechne_summen(df)
+        konsistent = all(np.isclose(self.sums[s], voll[s], rtol=1e-9, atol=1e-6) for s in BETRAGS_SPALTEN)
+        if not konsistent:
+            self._voll(df, self.angewendet)
+        return konsistent
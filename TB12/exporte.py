@@ -0,0 +1,211 @@
+"""
+Export-Aufträge (CSV/PDF) im Hintergrund.
+
+Exporte laufen in einem kleinen, prozessweiten Thread-Pool statt im
+Streamlit-Skript; die Seite bleibt währenddessen bedienbar und zeigt nur den
+Fortschritt an. Aufträge werden über einen Inhalts-Hash identifiziert: ein
+zweiter Klick (oder eine zweite Session) mit denselben Daten bekommt den
+laufenden bzw. fertigen Auftrag zurück, statt neu zu rendern. Tabellen können
+außer als CSV auch als Parquet, Arrow-IPC und (falls installiert) Excel
+exportiert werden.
+"""
+import importlib.util
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from diagramme import daten_hash
+
+MAX_WORKER = int(os.environ.get("EXPORT_WORKER", "2"))
+# fertige Aufträge (inkl. Ergebnis-Bytes), die für Downloads im Speicher bleiben
+MAX_AUFTRAEGE = 32
+
+
+def inhalts_hash(art, *teile):
+    """Kennung eines Exports aus Art und Inhalt (DataFrames werden zeilenweise gehasht)."""
+    werte = [art]
+    for teil in teile:
+        if isinstance(teil, pd.DataFrame):
+            werte += [list(map(str, teil.columns)), pd.util.hash_pandas_object(teil, index=False).to_numpy()]
+        else:
+            werte.append(teil)
+    return daten_hash(*werte)
+
+
+def csv_bytes(df, fortschritt=None, blockgroesse=50_000):
+    """DataFrame als CSV (UTF-8), blockweise geschrieben, damit Fortschritt gemeldet werden kann."""
+    puffer = io.StringIO()
+    gesamt = max(len(df), 1)
+    for start in range(0, gesamt, blockgroesse):
+        df.iloc[start:start + blockgroesse].to_csv(puffer, index=False, header=start == 0)
+        if fortschritt is not None:
+            fortschritt(min((start + blockgroesse) / gesamt, 1.0))
+    return puffer.getvalue().encode("utf-8")
+
+
+def parquet_bytes(df, fortschritt=None, blockgroesse=50_000):
+    """DataFrame als Parquet, eine Row-Group je Block."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    puffer = io.BytesIO()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    gesamt = max(len(df), 1)
+    with pq.ParquetWriter(puffer, schema) as schreiber:
+        for start in range(0, gesamt, blockgroesse):
+            block = df.iloc[start:start + blockgroesse]
+            schreiber.write_table(pa.Table.from_pandas(block, schema=schema, preserve_index=False))
+            if fortschritt is not None:
+                fortschritt(min((start + blockgroesse) / gesamt, 1.0))
+    return puffer.getvalue()
+
+
+def arrow_bytes(df, fortschritt=None, blockgroesse=50_000):
+    """DataFrame als Arrow-IPC-Datei (Feather v2), ein Record-Batch je Block."""
+    import pyarrow as pa
+
+    puffer = io.BytesIO()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    gesamt = max(len(df), 1)
+    with pa.ipc.new_file(puffer, schema) as schreiber:
+        for start in range(0, gesamt, blockgroesse):
+            block = df.iloc[start:start + blockgroesse]
+            schreiber.write_table(pa.Table.from_pandas(block, schema=schema, preserve_index=False))
+            if fortschritt is not None:
+                fortschritt(min((start + blockgroesse) / gesamt, 1.0))
+    return puffer.getvalue()
+
+
+def excel_bytes(df, fortschritt=None):
+    """DataFrame als XLSX (benötigt openpyxl oder xlsxwriter)."""
+    puffer = io.BytesIO()
+    df.to_excel(puffer, index=False, engine=_excel_engine())
+    return puffer.getvalue()
+
+
+def _excel_engine():
+    for engine in ("xlsxwriter", "openpyxl"):
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+    return None
+
+
+# Format -> (Dateiendung, MIME-Typ, Serialisierer(df, fortschritt))
+FORMATE = {
+    "CSV": (".csv", "text/csv", csv_bytes),
+    "Parquet": (".parquet", "application/vnd.apache.parquet", parquet_bytes),
+    "Arrow": (".arrow", "application/vnd.apache.arrow.file", arrow_bytes),
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", excel_bytes),
+}
+
+
+def verfuegbare_formate():
+    """Formate, deren Abhängigkeiten installiert sind (Excel nur mit openpyxl/xlsxwriter)."""
+    formate = ["CSV"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        formate += ["Parquet", "Arrow"]
+    if _excel_engine() is not None:
+        formate.append("Excel")
+    return formate
+
+
+class ExportAuftrag:
+    """Zustand eines Exports; wird vom Worker-Thread aktualisiert und von Sessions gelesen."""
+
+    def __init__(self, kennung, dateiname, mime):
+        self.kennung = kennung
+        self.dateiname = dateiname
+        self.mime = mime
+        self.status = "wartend"      # wartend -> laufend -> fertig | fehler
+        self.fortschritt = 0.0
+        self.daten = None
+        self.fehler = None
+        self.eingereicht = time.perf_counter()
+        self.dauer = None
+
+    @property
+    def fertig(self):
+        return self.status in ("fertig", "fehler")
+
+
+class ExportWarteschlange:
+    """
+    Begrenzter Thread-Pool für Exporte mit Deduplizierung nach Kennung.
+
+    ``einreichen(kennung, erzeugen, ...)`` startet ``erzeugen(fortschritt)``
+    (liefert die Datei als Bytes) nur, wenn es für ``kennung`` noch keinen
+    laufenden oder erfolgreichen Auftrag gibt. Fehlgeschlagene Aufträge werden
+    beim nächsten Einreichen neu gestartet.
+    """
+
+    def __init__(self, max_worker=MAX_WORKER, max_auftraege=MAX_AUFTRAEGE):
+        self._pool = ThreadPoolExecutor(max_workers=max_worker, thread_name_prefix="Export")
+        self._lock = threading.Lock()
+        self._auftraege = OrderedDict()
+        self.max_auftraege = max_auftraege
+
+    def einreichen(self, kennung, erzeugen, dateiname, mime):
+        with self._lock:
+            auftrag = self._auftraege.get(kennung)
+            if auftrag is not None and auftrag.status != "fehler":
+                self._auftraege.move_to_end(kennung)
+                return auftrag
+            auftrag = ExportAuftrag(kennung, dateiname, mime)
+            self._auftraege[kennung] = auftrag
+            self._aufraeumen()
+        self._pool.submit(self._ausfuehren, auftrag, erzeugen)
+        return auftrag
+
+    def auftrag(self, kennung):
+        with self._lock:
+            return self._auftraege.get(kennung)
+
+    def auftraege(self):
+        """Momentaufnahme aller gehaltenen Aufträge (älteste zuerst)."""
+        with self._lock:
+            return list(self._auftraege.values())
+
+    def _aufraeumen(self):
+        # älteste fertige Aufträge verwerfen; laufende bleiben immer erhalten
+        fertige = [k for k, a in self._auftraege.items() if a.fertig]
+        for kennung in fertige[:max(0, len(self._auftraege) - self.max_auftraege)]:
+            del self._auftraege[kennung]
+
+    def _ausfuehren(self, auftrag, erzeugen):
+        auftrag.status = "laufend"
+
+        def fortschritt(anteil):
+            auftrag.fortschritt = float(anteil)
+
+        # Status zuletzt setzen: Leser prüfen nur ``fertig`` und greifen danach
+        # ohne Lock auf daten/dauer/fehler zu
+        try:
+            auftrag.daten = erzeugen(fortschritt)
+            auftrag.fortschritt = 1.0
+            status = "fertig"
+        except Exception as e:
+            auftrag.fehler = f"{type(e).__name__}: {e}"
+            status = "fehler"
+        auftrag.dauer = time.perf_counter() - auftrag.eingereicht
+        auftrag.status = status
+
+    def __len__(self):
+        return len(self._auftraege)
+
+
+# Prozessweite Instanz, von allen Sessions geteilt
+_warteschlange = None
+_warteschlange_lock = threading.Lock()
+
+
+def export_warteschlange():
+    global _warteschlange
+    with _warteschlange_lock:
+        if _warteschlange is None:
+            _warteschlange = ExportWarteschlange()
+        return _warteschlange
@@ -0,0 +1,143 @@
+"""
+Historische Kursreihen mit inkrementellem Festplatten-Cache.
+
+Je Ticker und Intervall liegt eine Parquet-Datei (zeit in ns, kurs) unter
+``daten/historie``. Beim ersten Mal wird die ganze Historie geladen
+(Backfill), danach nur noch der fehlende Zeitraum seit dem letzten Punkt
+geholt und angefügt. Ein Kaltstart einer 10-Jahres-Tagesreihe ist damit
+ein lokaler Dateizugriff.
+"""
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from marktdaten import kurs_cache
+
+STANDARD_VERZEICHNIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daten", "historie")
+
+TAG_NS = 24 * 3600 * 10**9
+# Intervall -> (Länge eines Balkens, maximaler Backfill-Zeitraum bei yfinance)
+INTERVALLE = {
+    "5m": (5 * 60 * 10**9, 59 * TAG_NS),
+    "1h": (3600 * 10**9, 729 * TAG_NS),
+    "1d": (TAG_NS, 10 * 365 * TAG_NS),
+}
+
+
+def _leer():
+    return pd.DataFrame({"zeit": np.empty(0, dtype=np.int64), "kurs": np.empty(0, dtype=np.float64)})
+
+
+class HistorienCache:
+    """
+    Historie je (ticker, intervall) aus einem ``MarktdatenAnbieter``, auf Platte gecacht.
+
+    ``lesen`` greift nie auf das Netz zu. ``aktualisieren`` holt nur den Zeitraum
+    nach dem letzten gespeicherten Punkt (der letzte, evtl. unvollständige Balken
+    wird dabei überschrieben). ``aktualisieren_im_hintergrund`` macht dasselbe in
+    einem Thread-Pool und fasst gleichzeitige Anfragen für dieselbe Reihe zusammen.
+    """
+
+    def __init__(self, anbieter, verzeichnis=STANDARD_VERZEICHNIS, max_worker=4):
+        self.anbieter = anbieter
+        self.verzeichnis = verzeichnis
+        os.makedirs(verzeichnis, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_worker, thread_name_prefix="Historie")
+        self._lock = threading.Lock()
+        self._sperren = {}
+        self._laufend = {}
+        self._geprueft = {}
+        self.fehler = {}
+
+    def pfad(self, ticker, intervall):
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.verzeichnis, f"{name}_{intervall}.parquet")
+
+    def _sperre(self, ticker, intervall):
+        with self._lock:
+            return self._sperren.setdefault((ticker, intervall), threading.Lock())
+
+    def lesen(self, ticker, intervall="1d"):
+        """Gecachte Reihe (leer, falls noch kein Backfill gelaufen ist)."""
+        pfad = self.pfad(ticker, intervall)
+        if not os.path.exists(pfad):
+            return _leer()
+        return pd.read_parquet(pfad)
+
+    def ist_aktuell(self, df, intervall):
+        if df.empty:
+            return False
+        return time.time_ns() - int(df["zeit"].iloc[-1]) < INTERVALLE[intervall][0]
+
+    def _kuerzlich_geprueft(self, ticker, intervall):
+        zuletzt = self._geprueft.get((ticker, intervall), 0)
+        return time.time_ns() - zuletzt < min(INTERVALLE[intervall][0], 900 * 10**9)
+
+    def aktualisieren(self, ticker, intervall="1d"):
+        """Backfill bzw. inkrementelles Nachladen; gibt die zusammengeführte Reihe zurück."""
+        max_spanne = INTERVALLE[intervall][1]
+        with self._sperre(ticker, intervall):
+            vorhanden = self.lesen(ticker, intervall)
+            # nicht öfter als einmal je Balken (max. 15 min) nachfragen, auch wenn
+            # z. B. am Wochenende kein neuer Balken kommt
+            if self.ist_aktuell(vorhanden, intervall) or self._kuerzlich_geprueft(ticker, intervall):
+                return vorhanden
+            self._geprueft[(ticker, intervall)] = time.time_ns()
+
+            jetzt = time.time_ns()
+            start = jetzt - max_spanne if vorhanden.empty else int(vorhanden["zeit"].iloc[-1])
+            neu = self.anbieter.historie(ticker, start, jetzt, intervall)
+
+            gesamt = pd.concat([vorhanden, neu], ignore_index=True)
+            gesamt = gesamt.drop_duplicates("zeit", keep="last").sort_values("zeit", ignore_index=True)
+            gesamt = gesamt.astype({"zeit": np.int64, "kurs": np.float64})
+
+            # atomar ersetzen, damit Leser nie eine halb geschriebene Datei sehen
+            pfad = self.pfad(ticker, intervall)
+            gesamt.to_parquet(pfad + ".tmp", index=False)
+            os.replace(pfad + ".tmp", pfad)
+            return gesamt
+
+    def aktualisieren_im_hintergrund(self, ticker, intervall="1d"):
+        """Startet ``aktualisieren`` im Pool, sofern für diese Reihe nicht schon eins läuft."""
+        schluessel = (ticker, intervall)
+        with self._lock:
+            future = self._laufend.get(schluessel)
+            if future is not None and (not future.done() or self._kuerzlich_geprueft(ticker, intervall)):
+                return future
+            future = self._pool.submit(self._aktualisieren_sicher, ticker, intervall)
+            self._laufend[schluessel] = future
+            return future
+
+    def _aktualisieren_sicher(self, ticker, intervall):
+        try:
+            ergebnis = self.aktualisieren(ticker, intervall)
+            self.fehler.pop((ticker, intervall), None)
+            return ergebnis
+        except Exception as e:
+            self.fehler[(ticker, intervall)] = f"{type(e).__name__}: {e}"
+            return None
+
+    def backfill(self, ticker, intervall="1d"):
+        """Lädt die Historie aller ``ticker`` parallel; blockiert bis alle fertig sind."""
+        futures = [self.aktualisieren_im_hintergrund(t, intervall) for t in ticker]
+        return {t: f.result() for t, f in zip(ticker, futures)}
+
+
+# Prozessweite Instanz mit dem Anbieter des Kurs-Caches
+_historie = None
+_historie_lock = threading.Lock()
+
+
+def historien_cache():
+    global _historie
+    with _historie_lock:
+        if _historie is None:
+            _historie = HistorienCache(kurs_cache().anbieter,
+                                       os.environ.get("MARKTDATEN_HISTORIE", STANDARD_VERZEICHNIS))
+        return _historie
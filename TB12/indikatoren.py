@@ -0,0 +1,146 @@
+"""
+Technische Indikatoren je Ticker, mit jedem neuen Kurs inkrementell fortgeschrieben.
+
+Gleitender Durchschnitt (SMA), exponentieller Durchschnitt (EMA), rollierende
+Volatilität der Log-Renditen und Drawdown vom bisherigen Hoch werden pro
+Tick in O(1) aktualisiert (Fenstersummen statt Neuberechnung über die ganze
+Historie). Gerechnet wird einmal pro Prozess im Kurs-Cache (``marktdaten``),
+alle Sessions lesen dieselben Reihen. Enthält keine Streamlit-Aufrufe.
+"""
+import math
+import threading
+
+import numpy as np
+
+from ringpuffer import Ringpuffer
+
+FENSTER = 20          # Ticks für SMA, EMA-Spanne und Volatilität
+KAPAZITAET = 1000     # gespeicherte Indikatorwerte je Ticker
+INDIKATOREN = ["SMA", "EMA", "Volatilität (%)", "Drawdown (%)"]
+
+
+class Fenster:
+    """
+    Summe und Quadratsumme der letzten ``n`` Werte, O(1) je neuem Wert.
+
+    Nach jedem vollen Umlauf werden beide Summen exakt nachgerechnet, damit sich
+    Rundungsfehler aus dem Addieren/Abziehen nicht über Tage aufsummieren.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self._werte = np.zeros(n)
+        self._pos = 0
+        self.anzahl = 0
+        self.summe = 0.0
+        self.quadrate = 0.0
+
+    def hinzufuegen(self, wert):
+        alt = float(self._werte[self._pos]) if self.anzahl == self.n else 0.0
+        self._werte[self._pos] = wert
+        self._pos = (self._pos + 1) % self.n
+        self.anzahl = min(self.anzahl + 1, self.n)
+        if self._pos == 0:
+            self.summe = float(self._werte.sum())
+            self.quadrate = float(np.dot(self._werte, self._werte))
+        else:
+            self.summe += wert - alt
+            self.quadrate += wert * wert - alt * alt
+
+    @property
+    def mittel(self):
+        return self.summe / self.anzahl if self.anzahl else math.nan
+
+    @property
+    def std(self):
+        """Stichproben-Standardabweichung (NaN bei weniger als zwei Werten)."""
+        if self.anzahl < 2:
+            return math.nan
+        varianz = (self.quadrate - self.summe * self.summe / self.anzahl) / (self.anzahl - 1)
+        return math.sqrt(max(varianz, 0.0))
+
+
+class IndikatorReihe:
+    """Zustand und Verlauf aller Indikatoren eines Tickers."""
+
+    def __init__(self, fenster=FENSTER, kapazitaet=KAPAZITAET):
+        self.kurse = Fenster(fenster)
+        self.renditen = Fenster(fenster)
+        self.alpha = 2 / (fenster + 1)
+        self.ema = None
+        self.hoch = -math.inf
+        self.letzter_kurs = None
+        self.letzte_zeit = 0
+        self.verlauf = {name: Ringpuffer(kapazitaet) for name in INDIKATOREN}
+
+    def anhaengen(self, zeit_ns, kurs):
+        """Verarbeitet einen Kurs; ältere/doppelte Zeitstempel und ungültige Kurse werden ignoriert."""
+        kurs = float(kurs)
+        if zeit_ns <= self.letzte_zeit or not math.isfinite(kurs) or kurs <= 0:
+            return False
+        self.kurse.hinzufuegen(kurs)
+        if self.letzter_kurs is not None:
+            self.renditen.hinzufuegen(math.log(kurs / self.letzter_kurs))
+        self.ema = kurs if self.ema is None else self.ema + self.alpha * (kurs - self.ema)
+        self.hoch = max(self.hoch, kurs)
+        self.letzter_kurs = kurs
+        self.letzte_zeit = zeit_ns
+
+        werte = (self.kurse.mittel, self.ema, self.renditen.std * 100, (kurs / self.hoch - 1) * 100)
+        for name, wert in zip(INDIKATOREN, werte):
+            self.verlauf[name].anhaengen(zeit_ns, wert)
+        return True
+
+    def aktuell(self):
+        """Letzter Wert je Indikator (leeres Dict, solange kein Kurs verarbeitet wurde)."""
+        if self.letzter_kurs is None:
+            return {}
+        return {name: float(puffer.letzte(1)[1][0]) for name, puffer in self.verlauf.items()}
+
+
+class Indikatoren:
+    """
+    Indikatorreihen aller Ticker, gemeinsam für alle Sessions.
+
+    ``anhaengen`` nimmt dieselben Ticks wie der Tick-Speicher ((ticker, zeit_ns, kurs)).
+    Ein Ticker, der zum ersten Mal vorkommt, wird aus den letzten Ticks des
+    Tick-Speichers vorbelegt (falls gesetzt), damit die Indikatoren nicht bei
+    jedem Prozessstart leer beginnen.
+    """
+
+    def __init__(self, speicher=None, fenster=FENSTER, kapazitaet=KAPAZITAET):
+        self.speicher = speicher
+        self.fenster = fenster
+        self.kapazitaet = kapazitaet
+        self._lock = threading.Lock()
+        self._reihen = {}
+
+    def _reihe(self, ticker):
+        reihe = self._reihen.get(ticker)
+        if reihe is None:
+            reihe = IndikatorReihe(self.fenster, self.kapazitaet)
+            if self.speicher is not None:
+                for zeit_ns, kurs in zip(*self.speicher.letzte(ticker, self.kapazitaet)):
+                    reihe.anhaengen(int(zeit_ns), kurs)
+            self._reihen[ticker] = reihe
+        return reihe
+
+    def anhaengen(self, ticks):
+        with self._lock:
+            for ticker, zeit_ns, kurs in ticks:
+                self._reihe(ticker).anhaengen(int(zeit_ns), kurs)
+
+    def reihen(self, ticker, von_ns=0, namen=INDIKATOREN):
+        """{Indikator: (zeiten, werte)} ab ``von_ns`` als Kopien (der Cache-Thread schreibt weiter)."""
+        with self._lock:
+            reihe = self._reihe(ticker)
+            ergebnis = {}
+            for name in namen:
+                zeiten, werte = reihe.verlauf[name].letzte()
+                ab = int(np.searchsorted(zeiten, von_ns))
+                ergebnis[name] = (zeiten[ab:].copy(), werte[ab:].copy())
+            return ergebnis
+
+    def aktuell(self, ticker):
+        with self._lock:
+            return self._reihe(ticker).aktuell()
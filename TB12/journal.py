@@ -0,0 +1,169 @@
+"""
+Verdichtung eines Buchungsjournals zur Eingabetabelle der Ergebnisrechnung.
+
+Das Journal (eine Zeile je Buchung mit Kontonummer und Betrag) wird
+blockweise gelesen; jede Buchung wird über eine Kontenzuordnung (Bereiche
+von Kontonummern) einem Kontonamen und den Spalten von RKI, RKII und
+Betriebsergebnis zugeordnet. Summiert wird je Block mit ``np.bincount``
+über den Zuordnungsbereich, im Speicher bleiben nur die Summen je Bereich,
+nie das ganze Journal. Enthält keine Streamlit-Aufrufe.
+"""
+import numpy as np
+import pandas as pd
+
+from bilanzimport import CHUNKGROESSE, lese_bilanzen
+from ergebnis import BETRAGS_SPALTEN, kontonamen
+
+# Standardzuordnung angelehnt an den Industriekontenrahmen (IKR),
+# Klasse 9 für die kalkulatorischen Kosten der Kosten- und Leistungsrechnung.
+# (von, bis, Kontoname, Spalten, in die der Betrag gebucht wird)
+STANDARD_ZUORDNUNG = [
+    (5000, 5199, "Umsatzerlöse", ["Ertrag", "Leistung"]),
+    (5200, 5299, "Bestandsveränderungen", ["Ertrag", "Leistung"]),
+    (5300, 5399, "Aktivierte Eigenleistungen", ["Ertrag", "Leistung"]),
+    (5400, 5499, "Sonstige betriebliche Erträge", ["Ertrag", "Neutrale Erträge"]),
+    (5500, 5799, "Finanzerträge", ["Ertrag", "Neutrale Erträge"]),
+    (6000, 6199, "Materialaufwand", ["Aufwand", "Kosten"]),
+    (6200, 6499, "Personalaufwand", ["Aufwand", "Kosten"]),
+    (6500, 6599, "Abschreibungen", ["Aufwand", "Betriebliche Aufwendungen"]),
+    (6600, 6899, "Sonstige betriebliche Aufwendungen", ["Aufwand", "Kosten"]),
+    (6900, 6999, "Periodenfremde Aufwendungen", ["Aufwand", "Neutrale Aufwendungen"]),
+    (7000, 7099, "Betriebliche Steuern", ["Aufwand", "Kosten"]),
+    (7400, 7499, "Abschreibungen auf Finanzanlagen", ["Aufwand", "Neutrale Aufwendungen"]),
+    (7500, 7599, "Zinsaufwand", ["Aufwand", "Betriebliche Aufwendungen"]),
+    (7600, 7699, "Außerordentliche Aufwendungen", ["Aufwand", "Neutrale Aufwendungen"]),
+    (9200, 9299, "Kalkulatorische Abschreibungen", ["Verrechnete Kosten", "Kosten"]),
+    (9300, 9399, "Kalkulatorische Zinsen", ["Verrechnete Kosten", "Kosten"]),
+    (9400, 9499, "Kalkulatorischer Unternehmerlohn", ["Verrechnete Kosten", "Kosten"]),
+]
+
+
+class Kontenzuordnung:
+    """
+    Nicht überlappende Kontenbereiche mit Kontoname und Faktor je Betragsspalte.
+
+    ``faktoren`` hat eine Zeile je Bereich und eine Spalte je ``BETRAGS_SPALTEN``
+    (meist 0 oder 1, Anteile wie 0.5 sind erlaubt). Mehrere Bereiche dürfen
+    denselben Kontonamen haben und landen in derselben Zeile der Ergebnistabelle.
+    """
+
+    def __init__(self, von, bis, kontonamen, faktoren):
+        reihenfolge = np.argsort(np.asarray(von, dtype=np.float64), kind="stable")
+        self.von = np.asarray(von, dtype=np.float64)[reihenfolge]
+        self.bis = np.asarray(bis, dtype=np.float64)[reihenfolge]
+        kontonamen = [str(n) for n in np.asarray(kontonamen, dtype=object)[reihenfolge]]
+        self.faktoren = np.asarray(faktoren, dtype=np.float64)[reihenfolge]
+
+        if self.faktoren.shape != (len(self.von), len(BETRAGS_SPALTEN)):
+            raise ValueError("Faktoren brauchen eine Spalte je Betragsspalte.")
+        if np.any(self.bis < self.von):
+            raise ValueError("Kontenbereich mit 'bis' kleiner als 'von'.")
+        ueberlappend = np.flatnonzero(self.von[1:] <= self.bis[:-1])
+        if len(ueberlappend):
+            i = ueberlappend[0]
+            raise ValueError(f"Kontenbereiche überlappen: {self.von[i]:.0f}-{self.bis[i]:.0f} "
+                             f"und {self.von[i + 1]:.0f}-{self.bis[i + 1]:.0f}")
+
+        # Kontonamen in der Reihenfolge ihres ersten Bereichs
+        self.kontonamen = list(dict.fromkeys(kontonamen))
+        position = {name: i for i, name in enumerate(self.kontonamen)}
+        self.zeile = np.array([position[n] for n in kontonamen], dtype=np.intp)
+
+    @classmethod
+    def aus_liste(cls, eintraege=STANDARD_ZUORDNUNG):
+        """Aus (von, bis, Kontoname, [Spalten]) wie ``STANDARD_ZUORDNUNG``."""
+        faktoren = [[1.0 if s in spalten else 0.0 for s in BETRAGS_SPALTEN] for _, _, _, spalten in eintraege]
+        unbekannt = {s for *_, spalten in eintraege for s in spalten} - set(BETRAGS_SPALTEN)
+        if unbekannt:
+            raise ValueError(f"Unbekannte Spalten: {', '.join(sorted(unbekannt))}")
+        return cls([e[0] for e in eintraege], [e[1] for e in eintraege], [e[2] for e in eintraege], faktoren)
+
+    @classmethod
+    def aus_tabelle(cls, df):
+        """
+        Aus einer Tabelle mit den Spalten von, bis, Kontoname und beliebig vielen
+        Betragsspalten (Faktor je Spalte, fehlende Spalten/leere Zellen = 0).
+        """
+        fehlend = [s for s in ["von", "bis", "Kontoname"] if s not in df.columns]
+        if fehlend:
+            raise ValueError(f"Spalten fehlen: {', '.join(fehlend)}")
+        faktoren = np.column_stack([
+            pd.to_numeric(df[s], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+            if s in df.columns else np.zeros(len(df))
+            for s in BETRAGS_SPALTEN
+        ])
+        return cls(pd.to_numeric(df["von"]), pd.to_numeric(df["bis"]), df["Kontoname"], faktoren)
+
+    @classmethod
+    def lesen(cls, quelle, sep=";", decimal=","):
+        """Zuordnung aus einer CSV-Datei (Pfad oder Dateiobjekt), Aufbau wie bei ``aus_tabelle``."""
+        return cls.aus_tabelle(pd.read_csv(quelle, sep=sep, decimal=decimal))
+
+    def __len__(self):
+        return len(self.von)
+
+    def bereiche(self, konten):
+        """Index des Bereichs je Kontonummer, -1 für Konten ohne Zuordnung."""
+        i = np.searchsorted(self.von, konten, side="right") - 1
+        treffer = (i >= 0) & (konten <= self.bis[np.maximum(i, 0)])
+        return np.where(treffer, i, -1)
+
+    def tabelle(self, summen_je_bereich):
+        """Ergebnistabelle (Kontoname + Betragsspalten) aus den Summen je Bereich."""
+        werte = summen_je_bereich[:, None] * self.faktoren
+        matrix = np.zeros((len(self.kontonamen), len(BETRAGS_SPALTEN)))
+        np.add.at(matrix, self.zeile, werte)
+        df = pd.DataFrame(matrix.round(2), columns=BETRAGS_SPALTEN)
+        df.insert(0, "Kontoname", kontonamen(self.kontonamen))
+        return df
+
+
+def lese_journal(quelle, format="csv", chunkgroesse=CHUNKGROESSE, sep=";", decimal=",", spalten=None):
+    """Liest das Journal blockweise (gleicher Leser wie für Bilanzdateien, siehe ``bilanzimport``)."""
+    yield from lese_bilanzen(quelle, format, chunkgroesse, sep=sep, decimal=decimal, spalten=spalten)
+
+
+def verdichte_journal(chunks, zuordnung=None, konto="Konto", betrag="Betrag", fortschritt=None, max_unbekannt=20):
+    """
+    Summiert die Buchungen aller Blöcke je Kontenbereich und gibt die Ergebnistabelle zurück.
+
+    Zeilen ohne gültige Kontonummer oder Betrag werden verworfen, Buchungen auf
+    Konten ohne Zuordnung gezählt (die ersten ``max_unbekannt`` Kontonummern
+    stehen in der Statistik). Zusätzlich wird ein Dict mit Zeilenstatistik
+    zurückgegeben; ``fortschritt(zeilen)`` wird nach jedem Block aufgerufen.
+    """
+    zuordnung = zuordnung or Kontenzuordnung.aus_liste()
+    summen = np.zeros(len(zuordnung))
+    statistik = {"zeilen": 0, "verworfen": 0, "chunks": 0, "unzugeordnet": 0, "unzugeordnet_betrag": 0.0}
+    unbekannt = set()
+
+    for chunk in chunks:
+        fehlend = [s for s in [konto, betrag] if s not in chunk.columns]
+        if fehlend:
+            raise ValueError(f"Spalten fehlen: {', '.join(fehlend)}")
+
+        konten = pd.to_numeric(chunk[konto], errors="coerce").to_numpy(dtype=np.float64)
+        betraege = pd.to_numeric(chunk[betrag], errors="coerce").to_numpy(dtype=np.float64)
+        gueltig = np.isfinite(konten) & np.isfinite(betraege)
+        if not gueltig.all():
+            konten, betraege = konten[gueltig], betraege[gueltig]
+
+        bereich = zuordnung.bereiche(konten)
+        zugeordnet = bereich >= 0
+        summen += np.bincount(bereich[zugeordnet], weights=betraege[zugeordnet], minlength=len(zuordnung))
+
+        offen = ~zugeordnet
+        if offen.any():
+            statistik["unzugeordnet"] += int(offen.sum())
+            statistik["unzugeordnet_betrag"] += float(betraege[offen].sum())
+            if len(unbekannt) < max_unbekannt:
+                unbekannt.update(np.unique(konten[offen])[:max_unbekannt].tolist())
+
+        statistik["zeilen"] += len(chunk)
+        statistik["verworfen"] += int((~gueltig).sum())
+        statistik["chunks"] += 1
+        if fortschritt is not None:
+            fortschritt(statistik["zeilen"])
+
+    statistik["unbekannte_konten"] = [int(k) if float(k).is_integer() else k for k in sorted(unbekannt)[:max_unbekannt]]
+    return zuordnung.tabelle(summen), statistik
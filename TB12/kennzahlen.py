@@ -0,0 +1,88 @@
+"""
+Kennzahlen-Engine für die Bilanzanalyse.
+
+Berechnet die sechs Bilanzkennzahlen für beliebig viele Unternehmen/Jahre
+in einem NumPy-Durchlauf. Wird sowohl von der Streamlit-Seite
+(``Bilanzanalyse``) als auch von Batch-Jobs verwendet, damit beide
+identische Zahlen liefern. Enthält bewusst keine Streamlit-Aufrufe.
+"""
+import numpy as np
+import pandas as pd
+
+# Eingabespalten (Bilanzpositionen) und Ausgabespalten (Kennzahlen)
+BILANZ_FELDER = ["AV", "UV", "EK", "LFK", "KFK"]
+KENNZAHLEN = [
+    "Gesamtvermögen",
+    "Anlagenintensität (%)",
+    "Liquidität 3 (%)",
+    "Working Capital",
+    "Anlagendeckung 2 (%)",
+    "Verschuldungsgrad (%)",
+]
+# Quoten, die wie bisher auf 2 Nachkommastellen gerundet werden
+GERUNDETE_KENNZAHLEN = [
+    "Anlagenintensität (%)",
+    "Liquidität 3 (%)",
+    "Anlagendeckung 2 (%)",
+    "Verschuldungsgrad (%)",
+]
+
+
+def _quote(zaehler, nenner, faktor, dtype, fuellwert):
+    # Division nur dort, wo der Nenner != 0 ist (Maske statt inf/NaN-Warnungen),
+    # alle anderen Positionen erhalten den Füllwert.
+    maske = nenner != 0
+    out = np.full(zaehler.shape, fuellwert, dtype=dtype)
+    np.divide(zaehler, nenner, out=out, where=maske)
+    if faktor != 1:
+        np.multiply(out, faktor, out=out, where=maske)
+    return out
+
+
+def kennzahlen_arrays(av, uv, ek, lfk, kfk, dtype=np.float64, fuellwert=np.nan):
+    """
+    Berechnet alle Kennzahlen aus gleich langen NumPy-Arrays.
+
+    Gibt ein Dict {Kennzahl: Array} in der Reihenfolge von ``KENNZAHLEN``
+    zurück. Nullnenner ergeben ``fuellwert`` (Standard: NaN).
+    """
+    gesamt = np.add(av, uv, dtype=dtype)
+    working_capital = np.subtract(uv, kfk, dtype=dtype)
+
+    return {
+        "Gesamtvermögen": gesamt,
+        "Anlagenintensität (%)": _quote(av, gesamt, 100, dtype, fuellwert),
+        "Liquidität 3 (%)": _quote(uv, kfk, 100, dtype, fuellwert),
+        "Working Capital": working_capital,
+        "Anlagendeckung 2 (%)": _quote(np.add(ek, lfk, dtype=dtype), av, 1, dtype, fuellwert),
+        "Verschuldungsgrad (%)": _quote(np.add(lfk, kfk, dtype=dtype), ek, 100, dtype, fuellwert),
+    }
+
+
+def berechne_kennzahlen_batch(df, dtype=np.float64, dezimalen=2, fuellwert=np.nan):
+    """
+    Kennzahlen für ein Long-Format-DataFrame (z. B. Unternehmen, Jahr, AV, UV, EK, LFK, KFK).
+
+    Das übergebene DataFrame wird nicht verändert. Die Bilanzspalten werden ohne
+    Kopie gelesen, sofern sie bereits im Ziel-``dtype`` vorliegen. Zurück kommt
+    ein neues DataFrame mit den Kennzahlspalten und dem Index von ``df``.
+    ``dezimalen=None`` schaltet das Runden ab.
+    """
+    fehlend = [f for f in BILANZ_FELDER if f not in df.columns]
+    if fehlend:
+        raise ValueError(f"Spalten fehlen: {', '.join(fehlend)}")
+
+    dtype = np.dtype(dtype)
+    werte = [df[f].to_numpy(dtype=dtype, copy=False) for f in BILANZ_FELDER]
+    ergebnis = kennzahlen_arrays(*werte, dtype=dtype, fuellwert=fuellwert)
+
+    if dezimalen is not None:
+        for name in GERUNDETE_KENNZAHLEN:
+            np.round(ergebnis[name], dezimalen, out=ergebnis[name])
+
+    return pd.DataFrame(ergebnis, index=df.index, copy=False)
+
+
+def kennzahlen_tabelle(df, **optionen):
+    """Eingabe mit angehängten Kennzahlspalten (wie in der Bilanzanalyse angezeigt und exportiert)."""
+    return pd.concat([df, berechne_kennzahlen_batch(df, **optionen)], axis=1)
@@ -0,0 +1,447 @@
+"""
+Marktdaten für die Indizes-Seite.
+
+``MarktdatenAnbieter`` ist die Schnittstelle zur Datenquelle: ``YFinanceAnbieter``
+holt live über yfinance (``hole_kurse``: paralleler, begrenzter Thread-Pool mit
+Zeitlimit je Abruf und Wiederholungen, Latenz und Fehler je Ticker), ``ReplayAnbieter``
+spielt aufgezeichnete Ticks aus einer Datei ohne Netzwerk ab (Lasttests, CI).
+``KursCache`` ist ein prozessweiter Kurs-Cache mit TTL:
+ein einziger Hintergrund-Thread holt die Kurse, alle Sessions lesen nur den
+letzten Stand (stale-while-revalidate). Ein Seitenaufbau wartet damit nie
+auf einen Netzwerkabruf.
+"""
+import math
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from indikatoren import Indikatoren
+from tickspeicher import tick_speicher
+
+# Standard-Indizes der Indizes-Seite (Anzeigename -> Ticker)
+INDIZES = {
+    "DAX": "^GDAXI",
+    "Dow Jones": "^DJI",
+    "Shanghai Composite": "000001.SS",
+}
+INDEX_TICKER = list(INDIZES.values())
+
+MAX_WORKER = 16
+TIMEOUT = 5.0
+VERSUCHE = 2
+# Zusatz-Ticker je Session: höchstens ZUSATZ_MAX Stück, ohne erneute Anmeldung nach
+# ABO_DAUER_S Sekunden wieder aus der Aktualisierung; MARKTDATEN_ERLAUBT (kommagetrennt)
+# beschränkt sie zusätzlich auf eine feste Liste
+ZUSATZ_MAX = 5
+ABO_DAUER_S = 300
+TICKER_MUSTER = re.compile(r"^\^?[A-Z0-9][A-Z0-9.=-]{0,14}$")
+
+# Wie viele Zeitlimits ein Ticker höchstens in der Warteschlange des Pools wartet
+MAX_WARTEN = 4
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKER, thread_name_prefix="Kursabruf")
+
+
+# --------------------------------------
+# Funktion zum Abrufen der Kursdaten
+# --------------------------------------
+def get_index_value(ticker, timeout=TIMEOUT):
+    # Nur die letzten Tageskurse statt des kompletten Profils; ``timeout`` gilt für den
+    # HTTP-Aufruf selbst, ein hängender Server blockiert den Worker also nicht dauerhaft
+    tkr = yf.Ticker(ticker)
+    daten = tkr.history(period="5d", interval="1d", auto_adjust=False, timeout=timeout, raise_errors=True)
+    kurs = (tkr.history_metadata or {}).get("regularMarketPrice")
+    if kurs is None and not daten.empty:
+        kurs = daten["Close"].iloc[-1]
+    return kurs
+
+
+def _abruf_mit_wiederholung(abrufen, ticker, timeout, versuche, beginn=None):
+    # Frist ab Start der Aufgabe (nicht ab Einreihen in den Pool), verteilt auf alle Versuche
+    start = time.perf_counter()
+    if beginn is not None:
+        beginn[ticker] = start
+    frist = start + timeout
+    fehler = None
+    for versuch in range(1, versuche + 1):
+        try:
+            kurs = abrufen(ticker, timeout=max(frist - time.perf_counter(), 0.1))
+            if kurs is None or not math.isfinite(kurs):
+                raise ValueError("kein Kurs geliefert")
+            return {"kurs": float(kurs), "latenz_ms": (time.perf_counter() - start) * 1000,
+                    "versuche": versuch, "fehler": None}
+        except Exception as e:
+            fehler = f"{type(e).__name__}: {e}"
+            if versuch < versuche and time.perf_counter() + 0.2 * versuch < frist:
+                time.sleep(0.2 * versuch)
+            else:
+                break
+    return {"kurs": None, "latenz_ms": (time.perf_counter() - start) * 1000,
+            "versuche": versuch, "fehler": fehler}
+
+
+# Laufende Abrufe je Ticker (prozessweit): ein Ticker belegt höchstens einen Worker,
+# auch wenn ein Abruf über das Zeitlimit hinaus hängt
+_laufend = {}
+_laufend_lock = threading.Lock()
+
+
+def _fehler(latenz_ms, text):
+    return {"kurs": None, "latenz_ms": latenz_ms, "versuche": None, "fehler": text}
+
+
+def hole_kurse(ticker, abrufen=get_index_value, timeout=TIMEOUT, versuche=VERSUCHE, pool=None):
+    """
+    Holt alle ``ticker`` parallel und liefert {ticker: Ergebnis}.
+
+    Ergebnis ist ein Dict mit ``kurs`` (None bei Fehler), ``latenz_ms``,
+    ``versuche`` und ``fehler``. ``abrufen(ticker, timeout=...)`` bekommt die
+    Restzeit als Zeitlimit für den Netzwerkaufruf. Das Zeitlimit von ``timeout``
+    Sekunden zählt je Ticker ab dem Start seiner Aufgabe; Ticker, die nur in der
+    Warteschlange des Pools stehen, warten dafür bis zu ``MAX_WARTEN`` Zeitlimits.
+    Ein Ticker, dessen vorheriger Abruf noch läuft, wird nicht erneut eingereiht.
+    """
+    pool = pool or _pool
+    start = time.perf_counter()
+    beginn = {}
+    ergebnisse, futures = {}, {}
+    with _laufend_lock:
+        for t in dict.fromkeys(ticker):
+            vorher = _laufend.get((id(pool), t))
+            if vorher is not None and not vorher.done():
+                ergebnisse[t] = _fehler(0.0, "vorheriger Abruf läuft noch")
+                continue
+            future = pool.submit(_abruf_mit_wiederholung, abrufen, t, timeout, versuche, beginn)
+            _laufend[(id(pool), t)] = futures[t] = future
+
+    max_warten = timeout * MAX_WARTEN
+    offen = dict(futures)
+    while offen:
+        jetzt = time.perf_counter()
+        for t, future in list(offen.items()):
+            if future.done():
+                ergebnisse[t] = future.result()
+            elif t in beginn and jetzt - beginn[t] >= timeout:
+                ergebnisse[t] = _fehler((jetzt - beginn[t]) * 1000, f"Timeout nach {timeout:g}s")
+            elif t not in beginn and jetzt - start >= max_warten and future.cancel():
+                ergebnisse[t] = _fehler((jetzt - start) * 1000, "nicht gestartet (alle Worker belegt)")
+            else:
+                continue
+            del offen[t]
+        if offen:
+            fristen = [beginn[t] + timeout if t in beginn else start + max_warten for t in offen]
+            wait(offen.values(), timeout=max(min(fristen) - time.perf_counter(), 0.01),
+                 return_when=FIRST_COMPLETED)
+    return {t: ergebnisse[t] for t in dict.fromkeys(ticker)}
+
+
+# ---------------------------------------------------
+# Anbieter-Schnittstelle
+# ---------------------------------------------------
+def leere_historie():
+    """Historie ohne Punkte mit den Spaltentypen von ``historie`` (zeit int64 ns, kurs float64)."""
+    return pd.DataFrame({"zeit": np.empty(0, dtype=np.int64), "kurs": np.empty(0, dtype=np.float64)})
+
+
+class MarktdatenAnbieter(ABC):
+    @abstractmethod
+    def kurse(self, ticker):
+        """Liefert {ticker: Ergebnis} im Format von ``hole_kurse``."""
+        pass
+
+    def historie(self, ticker, start_ns, ende_ns, intervall="1d"):
+        """
+        Historische Schlusskurse als DataFrame (zeit in ns, kurs); optional.
+
+        Anbieter ohne Historie überschreiben die Methode nicht und liefern
+        eine leere Reihe, die ``HistorienCache`` wie „keine neuen Punkte“ behandelt.
+        """
+        return leere_historie()
+
+
+class YFinanceAnbieter(MarktdatenAnbieter):
+    def __init__(self, timeout=TIMEOUT, versuche=VERSUCHE):
+        self.timeout = timeout
+        self.versuche = versuche
+
+    def kurse(self, ticker):
+        return hole_kurse(ticker, timeout=self.timeout, versuche=self.versuche)
+
+    def historie(self, ticker, start_ns, ende_ns, intervall="1d"):
+        daten = yf.Ticker(ticker).history(
+            start=pd.Timestamp(start_ns, unit="ns", tz="UTC"),
+            end=pd.Timestamp(ende_ns, unit="ns", tz="UTC"),
+            interval=intervall,
+            auto_adjust=False,
+            timeout=self.timeout * 4,
+            raise_errors=True,
+        )
+        if daten.empty:
+            return leere_historie()
+        zeiten = daten.index.tz_convert("UTC").as_unit("ns").asi8
+        return pd.DataFrame({"zeit": zeiten, "kurs": daten["Close"].to_numpy(dtype=np.float64)})
+
+
+class ReplayAnbieter(MarktdatenAnbieter):
+    """
+    Spielt aufgezeichnete Ticks aus einer CSV-Datei (Spalten: zeit, ticker, kurs) ab.
+
+    ``zeit`` ist ein Zeitstempel (ISO-Format oder Epoche in Nanosekunden).
+    ``tempo`` ist der Zeitraffer gegenüber der Aufzeichnung (1 = Echtzeit,
+    1000 = tausendfach), ``schleife`` startet am Ende wieder von vorn.
+    Die Aufzeichnung wird einmal in NumPy-Arrays geladen.
+    """
+
+    def __init__(self, pfad, tempo=1.0, schleife=True):
+        df = pd.read_csv(pfad)
+        zeiten = df["zeit"]
+        if not pd.api.types.is_integer_dtype(zeiten):
+            zeiten = pd.to_datetime(zeiten).dt.as_unit("ns").astype("int64")
+        reihenfolge = np.argsort(zeiten.to_numpy(), kind="stable")
+
+        self.zeiten = zeiten.to_numpy(dtype=np.int64)[reihenfolge]
+        self.ticker = df["ticker"].astype(str).to_numpy()[reihenfolge]
+        self.werte = df["kurs"].to_numpy(dtype=np.float64)[reihenfolge]
+        self.tempo = tempo
+        self.schleife = schleife
+        self._start = time.perf_counter()
+        # Index je Ticker für den Schnappschuss-Abruf
+        self._je_ticker = {t: np.flatnonzero(self.ticker == t) for t in np.unique(self.ticker)}
+
+    @property
+    def dauer_ns(self):
+        return int(self.zeiten[-1] - self.zeiten[0]) if len(self.zeiten) else 0
+
+    def _replay_zeit(self):
+        # Position in der Aufzeichnung gemäß verstrichener Zeit und Tempo
+        versatz = int((time.perf_counter() - self._start) * 1e9 * self.tempo)
+        if self.schleife and self.dauer_ns > 0:
+            versatz %= self.dauer_ns + 1
+        return self.zeiten[0] + versatz
+
+    def kurse(self, ticker):
+        jetzt = self._replay_zeit()
+        ergebnisse = {}
+        for t in ticker:
+            idx = self._je_ticker.get(t)
+            pos = -1 if idx is None else np.searchsorted(self.zeiten[idx], jetzt, side="right") - 1
+            if pos < 0:
+                ergebnisse[t] = {"kurs": None, "latenz_ms": 0.0, "versuche": 1, "fehler": "keine Replay-Daten"}
+            else:
+                ergebnisse[t] = {"kurs": float(self.werte[idx[pos]]), "latenz_ms": 0.0, "versuche": 1, "fehler": None}
+        return ergebnisse
+
+    def historie(self, ticker, start_ns, ende_ns, intervall="1d"):
+        # Aufgezeichnete Ticks im Zeitraum, unabhängig vom Intervall
+        idx = self._je_ticker.get(ticker, np.empty(0, dtype=np.int64))
+        auswahl = idx[(self.zeiten[idx] >= start_ns) & (self.zeiten[idx] <= ende_ns)]
+        return pd.DataFrame({"zeit": self.zeiten[auswahl], "kurs": self.werte[auswahl]})
+
+    def ticks(self, ticks_pro_sekunde=None):
+        """
+        Generator über (zeit_ns, ticker, kurs) im Takt der Aufzeichnung.
+
+        Mit ``ticks_pro_sekunde`` wird stattdessen mit fester Rate abgespielt,
+        ``tempo=None`` und ohne Rate so schnell wie möglich.
+        """
+        while True:
+            start = time.perf_counter()
+            for i in range(len(self.zeiten)):
+                if ticks_pro_sekunde:
+                    soll = i / ticks_pro_sekunde
+                elif self.tempo:
+                    soll = (self.zeiten[i] - self.zeiten[0]) / 1e9 / self.tempo
+                else:
+                    soll = 0
+                warten = soll - (time.perf_counter() - start)
+                if warten > 0:
+                    time.sleep(warten)
+                yield int(self.zeiten[i]), self.ticker[i], float(self.werte[i])
+            if not self.schleife:
+                return
+
+
+def schreibe_replay(pfad, ticker, anzahl=10_000, intervall_s=1.0, start_kurs=100.0, seed=0):
+    """Erzeugt eine synthetische Replay-Datei (Random Walk je Ticker), z. B. für CI."""
+    rng = np.random.default_rng(seed)
+    start = time.time_ns() - int(anzahl * intervall_s * 1e9)
+    zeiten = start + (np.arange(anzahl) * intervall_s * 1e9).astype(np.int64)
+    teile = []
+    for t in ticker:
+        kurse = start_kurs * np.exp(np.cumsum(rng.normal(0, 1e-3, anzahl)))
+        teile.append(pd.DataFrame({"zeit": zeiten, "ticker": t, "kurs": kurse}))
+    pd.concat(teile, ignore_index=True).sort_values("zeit", kind="stable").to_csv(pfad, index=False)
+
+
+def anbieter_aus_umgebung():
+    """
+    Wählt den Anbieter: ``MARKTDATEN_REPLAY=<datei.csv>`` (optional ``MARKTDATEN_TEMPO``)
+    schaltet auf Replay um, sonst yfinance.
+    """
+    pfad = os.environ.get("MARKTDATEN_REPLAY")
+    if pfad:
+        return ReplayAnbieter(pfad, tempo=float(os.environ.get("MARKTDATEN_TEMPO", "1")))
+    return YFinanceAnbieter()
+
+
+class KursCache:
+    """
+    Letzte Kurse je Ticker mit Zeitstempel, gemeinsam für alle Sessions.
+
+    ``lesen()`` liefert sofort den aktuellen (ggf. veralteten) Stand und stößt
+    bei Bedarf den Hintergrund-Thread an. Dieser aktualisiert alle ``ttl``
+    Sekunden und beendet sich, wenn ``leerlauf`` Sekunden niemand gelesen hat.
+    Neue Kurse gehen zusätzlich an den Tick-Speicher und die Indikatoren
+    (``indikatoren.Indikatoren``), falls gesetzt.
+
+    ``ticker`` werden immer geholt; weitere Ticker melden Sessions mit
+    ``abonnieren`` an, sie laufen ``abo_dauer`` Sekunden nach der letzten
+    Anmeldung aus.
+    """
+
+    def __init__(self, ticker, ttl=30, anbieter=None, leerlauf=600, speicher=None, indikatoren=None,
+                 erlaubt=None, zusatz_max=ZUSATZ_MAX, abo_dauer=ABO_DAUER_S):
+        self.ticker = list(dict.fromkeys(ticker))
+        self.erlaubt = None if erlaubt is None else set(erlaubt)
+        self.zusatz_max = zusatz_max
+        self.abo_dauer = abo_dauer
+        # Zusatz-Ticker je Session: {sitzung: (letzte Anmeldung, [ticker])}
+        self._abos = {}
+        self.ttl = ttl
+        self.anbieter = anbieter if anbieter is not None else YFinanceAnbieter()
+        self.speicher = speicher
+        self.indikatoren = indikatoren
+        self.leerlauf = leerlauf
+
+        self._lock = threading.Lock()
+        self._aktualisiert = threading.Event()
+        self._thread = None
+        self._letzter_zugriff = 0.0
+        # Zeitpunkt des letzten Abrufs, letzter erfolgreicher Kurs je Ticker
+        # als (zeitstempel, kurs) und Abrufstatistik je Ticker
+        self.zeitstempel = 0.0
+        self.kurse = {}
+        self.status = {}
+
+    def pruefen(self, ticker):
+        """Teilt Zusatz-Ticker in (angenommen, abgelehnt) auf: Format, erlaubte Liste, Höchstzahl."""
+        angenommen, abgelehnt = [], []
+        for t in dict.fromkeys(ticker):
+            if t in self.ticker:
+                continue
+            if (not TICKER_MUSTER.match(t) or (self.erlaubt is not None and t not in self.erlaubt)
+                    or len(angenommen) >= self.zusatz_max):
+                abgelehnt.append(t)
+            else:
+                angenommen.append(t)
+        return angenommen, abgelehnt
+
+    def abonnieren(self, ticker, sitzung):
+        """
+        Ersetzt die Zusatz-Ticker der Session ``sitzung`` (Standard-Ticker werden
+        übergangen) und verlängert ihr Abo. Gibt (angenommen, abgelehnt) zurück.
+        """
+        angenommen, abgelehnt = self.pruefen(ticker)
+        with self._lock:
+            if any(t not in self._aktive() for t in angenommen):
+                self.zeitstempel = 0.0  # neuer Ticker -> beim nächsten Durchlauf sofort holen
+            self._abos[sitzung] = (time.monotonic(), angenommen)
+        return angenommen, abgelehnt
+
+    def _aktive(self):
+        # Standard-Ticker und nicht abgelaufene Abos (abgelaufene werden entfernt); nur unter _lock
+        grenze = time.monotonic() - self.abo_dauer
+        for sitzung in [s for s, (zeit, _) in self._abos.items() if zeit < grenze]:
+            del self._abos[sitzung]
+        return list(dict.fromkeys(self.ticker + [t for _, abo in self._abos.values() for t in abo]))
+
+    def aktive_ticker(self):
+        with self._lock:
+            return self._aktive()
+
+    def lesen(self, ticker=None):
+        """Gibt {ticker: (zeitstempel, kurs)} ohne Netzwerkzugriff zurück."""
+        with self._lock:
+            self._letzter_zugriff = time.time()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._laufen, name="KursCache", daemon=True)
+                self._thread.start()
+            if ticker is None:
+                return dict(self.kurse)
+            return {t: self.kurse[t] for t in ticker if t in self.kurse}
+
+    def ist_veraltet(self):
+        return time.time() - self.zeitstempel > self.ttl
+
+    def warten(self, timeout=None):
+        """Blockiert bis zum nächsten abgeschlossenen Abruf (z. B. für Skripte/Tests)."""
+        self._aktualisiert.clear()
+        return self._aktualisiert.wait(timeout)
+
+    def aktualisieren(self):
+        """
+        Holt alle Ticker einmal; fehlgeschlagene Ticker behalten ihren letzten Kurs.
+        Erfolgreiche Kurse werden zusätzlich im Tick-Speicher abgelegt (falls gesetzt).
+        """
+        with self._lock:
+            ticker = self._aktive()
+        ergebnisse = self.anbieter.kurse(ticker)
+        with self._lock:
+            jetzt = time.time()
+            # ausgelaufene Zusatz-Ticker nicht weiter vorhalten
+            for t in [t for t in self.status if t not in ergebnisse]:
+                self.status.pop(t, None)
+                self.kurse.pop(t, None)
+            for t, ergebnis in ergebnisse.items():
+                self.status[t] = ergebnis
+                if ergebnis["kurs"] is not None:
+                    self.kurse[t] = (jetzt, ergebnis["kurs"])
+            self.zeitstempel = jetzt
+        zeit_ns = int(jetzt * 1e9)
+        ticks = [(t, zeit_ns, e["kurs"]) for t, e in ergebnisse.items() if e["kurs"] is not None]
+        if self.speicher is not None:
+            self.speicher.anhaengen(ticks)
+        if self.indikatoren is not None:
+            self.indikatoren.anhaengen(ticks)
+        self._aktualisiert.set()
+
+    def _laufen(self):
+        while time.time() - self._letzter_zugriff < self.leerlauf:
+            if self.ist_veraltet():
+                try:
+                    self.aktualisieren()
+                except Exception:
+                    # z. B. Pool beim Beenden des Prozesses; der nächste lesen()-Aufruf startet neu
+                    return
+            time.sleep(min(self.ttl, 1.0))
+
+
+# Prozessweite Instanz: Module werden von Streamlit nicht bei jedem Rerun neu
+# geladen, daher teilen sich alle Sessions diesen Cache.
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def kurs_cache(ticker=INDEX_TICKER, ttl=None):
+    """
+    Prozessweiter ``KursCache`` (wird beim ersten Aufruf angelegt, TTL über ``MARKTDATEN_TTL``,
+    erlaubte Zusatz-Ticker über ``MARKTDATEN_ERLAUBT``).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            ttl = ttl if ttl is not None else float(os.environ.get("MARKTDATEN_TTL", "30"))
+            speicher = tick_speicher()
+            erlaubt = os.environ.get("MARKTDATEN_ERLAUBT")
+            _cache = KursCache(ticker, ttl=ttl, anbieter=anbieter_aus_umgebung(), speicher=speicher,
+                               indikatoren=Indikatoren(speicher),
+                               erlaubt=None if erlaubt is None else
+                               [t.strip().upper() for t in erlaubt.split(",") if t.strip()])
+        return _cache
@@ -0,0 +1,178 @@
+"""
+Monte-Carlo-Simulation der Bilanzkennzahlen (What-if, z. B. für Kreditprüfungen).
+
+AV, UV, EK, LFK und KFK werden je Szenario aus einer Verteilung gezogen,
+die sechs Kennzahlen berechnet ``kennzahlen_arrays`` für alle Szenarien
+eines Blocks in einem NumPy-Durchlauf. Ohne ``chunkgroesse`` liegen alle
+Szenarien gleichzeitig im Speicher und die Perzentile sind exakt; mit
+``chunkgroesse`` wird blockweise gezogen und in Histogramme mit festen,
+fein unterteilten Klassen einsortiert (Klassengrenzen aus dem ersten Block),
+die Perzentile werden dann innerhalb der Klassen interpoliert. Nullnenner zählen als
+ungültig. Enthält keine Streamlit-Aufrufe.
+"""
+import numpy as np
+
+from kennzahlen import BILANZ_FELDER, KENNZAHLEN, kennzahlen_arrays
+
+# Verteilung -> Namen der Parameter (Reihenfolge wie in der Tupel-Angabe)
+VERTEILUNGEN = {
+    "gleich": ("min", "max"),
+    "normal": ("mittel", "std"),
+    "dreieck": ("min", "modus", "max"),
+    "fest": ("wert",),
+}
+PERZENTILE = [5, 25, 50, 75, 95]
+KLASSEN = 50
+# Zählklassen je angezeigter Klasse (für die Perzentile im Blockmodus)
+FEINHEIT = 40
+# Histogrammbereich: extreme Ausreißer (z. B. Liquidität bei KFK nahe 0) landen in den Randklassen
+RAND_PERZENTILE = (0.5, 99.5)
+
+
+def pruefe_verteilung(feld, verteilung):
+    """``ValueError`` bei unbekannter Verteilung oder unpassenden Parametern."""
+    art, *parameter = verteilung
+    if art not in VERTEILUNGEN:
+        raise ValueError(f"{feld}: unbekannte Verteilung '{art}' (erlaubt: {', '.join(VERTEILUNGEN)}).")
+    if len(parameter) != len(VERTEILUNGEN[art]):
+        raise ValueError(f"{feld}: '{art}' braucht {', '.join(VERTEILUNGEN[art])}.")
+    if art == "gleich" and parameter[0] > parameter[1]:
+        raise ValueError(f"{feld}: min ist größer als max.")
+    if art == "normal" and parameter[1] < 0:
+        raise ValueError(f"{feld}: Standardabweichung ist negativ.")
+    if art == "dreieck" and not parameter[0] <= parameter[1] <= parameter[2]:
+        raise ValueError(f"{feld}: für die Dreiecksverteilung muss min <= modus <= max gelten.")
+
+
+def ziehen(rng, verteilung, n):
+    art, *p = verteilung
+    if art == "gleich":
+        return rng.uniform(p[0], p[1], n)
+    if art == "normal":
+        return rng.normal(p[0], p[1], n)
+    if art == "dreieck" and p[0] < p[2]:
+        return rng.triangular(p[0], p[1], p[2], n)
+    return np.full(n, float(p[0]))   # "fest" bzw. Dreieck ohne Spannweite
+
+
+def _szenarien(rng, verteilungen, n):
+    return kennzahlen_arrays(*[ziehen(rng, verteilungen[f], n) for f in BILANZ_FELDER])
+
+
+def _bereich(rand):
+    lo, hi = (0.0, 1.0) if rand is None else (float(rand[0]), float(rand[1]))
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    return lo, hi
+
+
+class _Statistik:
+    """
+    Anzahl, Mittelwert/Varianz (blockweise zusammengeführt), Min/Max und Histogramm einer Kennzahl.
+
+    Gezählt wird in ``feinheit``-mal so vielen Klassen wie angezeigt, damit die
+    Perzentile aus dem Histogramm auch bei schiefen Verteilungen genau genug sind.
+    """
+
+    def __init__(self, lo, hi, klassen=KLASSEN, feinheit=FEINHEIT):
+        self.lo, self.hi = lo, hi
+        self.klassen = klassen
+        self.feinheit = feinheit
+        self.zaehler = np.zeros(klassen * feinheit, dtype=np.int64)
+        self.anzahl = 0
+        self.ungueltig = 0
+        self.mittel = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def hinzufuegen(self, werte):
+        gueltig = werte[np.isfinite(werte)]
+        self.ungueltig += len(werte) - len(gueltig)
+        if len(gueltig) == 0:
+            return
+        # Zusammenführen von Mittelwert und Quadratsumme zweier Teilmengen (Chan et al.)
+        n, mittel = len(gueltig), float(gueltig.mean())
+        m2 = float(np.square(gueltig - mittel).sum())
+        gesamt = self.anzahl + n
+        delta = mittel - self.mittel
+        self.mittel += delta * n / gesamt
+        self.m2 += m2 + delta * delta * self.anzahl * n / gesamt
+        self.anzahl = gesamt
+        self.min = min(self.min, float(gueltig.min()))
+        self.max = max(self.max, float(gueltig.max()))
+        # gleich breite Klassen über bins/range (schneller Pfad von np.histogram)
+        self.zaehler += np.histogram(np.clip(gueltig, self.lo, self.hi), bins=len(self.zaehler),
+                                     range=(self.lo, self.hi))[0]
+
+    def perzentile_aus_histogramm(self, perzentile):
+        # linear innerhalb der (feinen) Klasse interpoliert
+        kumuliert = np.concatenate([[0], np.cumsum(self.zaehler)])
+        kanten = np.linspace(self.lo, self.hi, len(self.zaehler) + 1)
+        return np.interp(np.asarray(perzentile) / 100 * self.anzahl, kumuliert, kanten)
+
+    def histogramm(self):
+        """(zaehler, kanten) mit ``klassen`` Klassen für die Anzeige."""
+        return (self.zaehler.reshape(self.klassen, self.feinheit).sum(axis=1),
+                np.linspace(self.lo, self.hi, self.klassen + 1))
+
+    def ergebnis(self, perzentile, exakt=None):
+        leer = self.anzahl == 0
+        if exakt is None:
+            exakt = np.full(len(perzentile), np.nan) if leer else self.perzentile_aus_histogramm(perzentile)
+        return {
+            "anzahl": self.anzahl,
+            "ungueltig": self.ungueltig,
+            "mittel": np.nan if leer else self.mittel,
+            "std": np.nan if self.anzahl < 2 else float(np.sqrt(self.m2 / (self.anzahl - 1))),
+            "min": np.nan if leer else self.min,
+            "max": np.nan if leer else self.max,
+            "perzentile": dict(zip(perzentile, (float(w) for w in exakt))),
+            "histogramm": self.histogramm(),
+        }
+
+
+def simuliere(verteilungen, anzahl=1_000_000, chunkgroesse=None, klassen=KLASSEN, seed=None,
+              perzentile=PERZENTILE):
+    """
+    Simuliert ``anzahl`` Szenarien und wertet jede Kennzahl aus.
+
+    ``verteilungen`` ordnet jedem Feld aus ``BILANZ_FELDER`` ein Tupel zu, z. B.
+    ``("gleich", 80_000, 120_000)``, ``("normal", 100_000, 10_000)``,
+    ``("dreieck", 80_000, 100_000, 130_000)`` oder ``("fest", 50_000)``.
+    Gibt ({Kennzahl: {anzahl, ungueltig, mittel, std, min, max, perzentile {p: wert},
+    histogramm (zaehler, kanten)}}, exakt) zurück.
+    """
+    fehlend = [f for f in BILANZ_FELDER if f not in verteilungen]
+    if fehlend:
+        raise ValueError(f"Verteilungen fehlen: {', '.join(fehlend)}")
+    for feld in BILANZ_FELDER:
+        pruefe_verteilung(feld, verteilungen[feld])
+    if anzahl <= 0:
+        raise ValueError("Die Anzahl der Szenarien muss größer als 0 sein.")
+
+    rng = np.random.default_rng(seed)
+    chunkgroesse = anzahl if not chunkgroesse else min(chunkgroesse, anzahl)
+    exakt = chunkgroesse >= anzahl
+
+    statistiken, genau = None, {}
+    gezogen = 0
+    while gezogen < anzahl:
+        n = min(chunkgroesse, anzahl - gezogen)
+        block = _szenarien(rng, verteilungen, n)
+        if statistiken is None:
+            # Histogrammbereich aus dem ersten Block; bei exakter Rechnung ist das die
+            # ganze Stichprobe und die Perzentile fallen im selben Durchlauf mit ab
+            statistiken = {}
+            for name, werte in block.items():
+                gueltig = werte[np.isfinite(werte)]
+                q = np.percentile(gueltig, [*RAND_PERZENTILE, *perzentile]) if len(gueltig) else None
+                statistiken[name] = _Statistik(*_bereich(q), klassen)
+                if exakt and q is not None:
+                    genau[name] = q[len(RAND_PERZENTILE):]
+        for name, werte in block.items():
+            statistiken[name].hinzufuegen(werte)
+        gezogen += n
+        del block
+
+    return {name: statistiken[name].ergebnis(perzentile, genau.get(name)) for name in KENNZAHLEN}, exakt
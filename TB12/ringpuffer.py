@@ -0,0 +1,65 @@
+"""
+Ringpuffer fester Größe für Zeitreihen (z. B. Live-Kurse).
+
+Zeitstempel werden als int64 (Epoche in Nanosekunden), Werte als float64
+gespeichert (für reine Anzeigewerte reicht ``dtype=np.float32``). Jeder Wert
+wird doppelt abgelegt (Position i und i + Kapazität), dadurch sind die
+letzten N Punkte immer ein zusammenhängender Ausschnitt und können ohne
+Kopie als NumPy-View zurückgegeben werden.
+"""
+import numpy as np
+
+
+class Ringpuffer:
+    def __init__(self, kapazitaet=1000, dtype=np.float64):
+        if kapazitaet <= 0:
+            raise ValueError("Kapazität muss größer als 0 sein.")
+        self.kapazitaet = kapazitaet
+        self._zeiten = np.zeros(2 * kapazitaet, dtype=np.int64)
+        self._werte = np.zeros(2 * kapazitaet, dtype=dtype)
+        self._pos = 0      # nächste Schreibposition (0 .. kapazitaet-1)
+        self._anzahl = 0
+
+    def __len__(self):
+        return self._anzahl
+
+    def anhaengen(self, zeit_ns, wert):
+        """Hängt einen Punkt an, O(1); bei voller Kapazität fällt der älteste heraus."""
+        i = self._pos
+        self._zeiten[i] = self._zeiten[i + self.kapazitaet] = zeit_ns
+        self._werte[i] = self._werte[i + self.kapazitaet] = wert
+        self._pos = (i + 1) % self.kapazitaet
+        if self._anzahl < self.kapazitaet:
+            self._anzahl += 1
+
+    def erweitern(self, zeiten_ns, werte):
+        """Hängt mehrere Punkte an (z. B. aus einem Backfill)."""
+        zeiten_ns = np.asarray(zeiten_ns, dtype=np.int64)[-self.kapazitaet:]
+        werte = np.asarray(werte, dtype=self._werte.dtype)[-self.kapazitaet:]
+        for z, w in zip(zeiten_ns, werte):
+            self.anhaengen(z, w)
+
+    def letzte(self, n=None):
+        """
+        Die letzten ``n`` Punkte (Standard: alle) als schreibgeschützte Views (zeiten, werte).
+
+        Die Views bleiben nur bis zum nächsten ``anhaengen`` gültig.
+        """
+        n = self._anzahl if n is None else min(n, self._anzahl)
+        ende = self._pos + self.kapazitaet
+        zeiten = self._zeiten[ende - n:ende]
+        werte = self._werte[ende - n:ende]
+        zeiten.flags.writeable = False
+        werte.flags.writeable = False
+        return zeiten, werte
+
+    @property
+    def letzte_zeit(self):
+        """Zeitstempel des jüngsten Punkts (0, wenn leer)."""
+        if self._anzahl == 0:
+            return 0
+        return int(self._zeiten[self._pos + self.kapazitaet - 1])
+
+    @property
+    def nbytes(self):
+        return self._zeiten.nbytes + self._werte.nbytes
@@ -0,0 +1,101 @@
+"""
+Wiederverwendbare Seiteninstanzen und Render-Zeiten je Seite.
+
+TB11.py wird bei jedem Rerun neu ausgeführt, Zustand über Reruns hinweg
+muss also in einem importierten Modul liegen. ``SeitenRegister`` hält pro
+Seite eine Instanz (inkl. der in ``vorbereiten`` berechneten statischen
+Inhalte), bis sich das Skript ändert. ``RenderStatistik`` sammelt die
+Dauer jedes ``render()`` und jeder Layout-Strategie (``time.perf_counter_ns``)
+und fasst sie je Seite zusammen (Anzahl, p50, p95, max); optional wird jede
+Messung in eine CSV-Datei geschrieben (``RENDER_LOG``).
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Anzahl der letzten Messungen je (Seite, Teil) für die Perzentile
+FENSTER = 1000
+
+
+class SeitenRegister:
+    """Eine Instanz je Seitenname und Skriptstand; ``stand`` ist z. B. die mtime von TB11.py."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._instanzen = {}
+
+    def holen(self, name, seiten_klasse, stand):
+        with self._lock:
+            eintrag = self._instanzen.get(name)
+            if eintrag is not None and eintrag[0] == stand:
+                return eintrag[1]
+        seite = seiten_klasse()
+        seite.name = name
+        seite.vorbereiten()
+        with self._lock:
+            self._instanzen[name] = (stand, seite)
+        return seite
+
+    def __len__(self):
+        return len(self._instanzen)
+
+
+def _perzentil(sortiert, anteil):
+    return sortiert[min(len(sortiert) - 1, int(anteil * len(sortiert)))]
+
+
+class RenderStatistik:
+    """
+    Render-Zeiten je (Seite, Teil), z. B. ("📈 Indizes", "render") oder ("🔗 Linkliste", "TwoColumnLayout").
+
+    Gezählt werden alle Läufe, die Perzentile beziehen sich auf die letzten ``FENSTER``.
+    """
+
+    def __init__(self, logdatei=None, fenster=FENSTER):
+        self._lock = threading.Lock()
+        self._zeiten = defaultdict(lambda: deque(maxlen=fenster))
+        self._anzahl = defaultdict(int)
+        self._max = defaultdict(float)
+        self.logdatei = logdatei
+
+    def erfassen(self, seite, teil, dauer_ms):
+        schluessel = (seite, teil)
+        with self._lock:
+            self._zeiten[schluessel].append(dauer_ms)
+            self._anzahl[schluessel] += 1
+            self._max[schluessel] = max(self._max[schluessel], dauer_ms)
+            if self.logdatei:
+                neu = not os.path.exists(self.logdatei)
+                with open(self.logdatei, "a", encoding="utf-8") as f:
+                    if neu:
+                        f.write("zeit;seite;teil;dauer_ms\n")
+                    f.write(f"{time.time():.3f};{seite};{teil};{dauer_ms:.3f}\n")
+
+    @contextmanager
+    def messen(self, seite, teil="render"):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.erfassen(seite, teil, (time.perf_counter_ns() - start) / 1e6)
+
+    def zusammenfassung(self):
+        """Liste von Dicts (seite, teil, laeufe, p50_ms, p95_ms, max_ms), langsamste p95 zuerst."""
+        with self._lock:
+            daten = {k: sorted(v) for k, v in self._zeiten.items()}
+            anzahl = dict(self._anzahl)
+            maxima = dict(self._max)
+        zeilen = [
+            {"seite": seite, "teil": teil, "laeufe": anzahl[(seite, teil)],
+             "p50_ms": round(_perzentil(z, 0.5), 2), "p95_ms": round(_perzentil(z, 0.95), 2),
+             "max_ms": round(maxima[(seite, teil)], 2)}
+            for (seite, teil), z in daten.items() if z
+        ]
+        return sorted(zeilen, key=lambda z: -z["p95_ms"])
+
+
+# Prozessweite Instanzen (Log-Datei über RENDER_LOG)
+seiten_register = SeitenRegister()
+render_statistik = RenderStatistik(os.environ.get("RENDER_LOG"))
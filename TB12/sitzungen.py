@@ -0,0 +1,165 @@
+"""
+Speicher je Session und Verdrängen von Daten aus inaktiven Sessions.
+
+TB11.py meldet bei jedem Lauf (und jedem Lauf des Live-Fragments) die
+Session an. ``SitzungsRegister`` merkt sich je Session-ID den letzten
+Zugriff; den dauerhaften Session State holt es bei Bedarf über den
+Session-Manager der Streamlit-Runtime (``streamlit_zustand``). Das Objekt
+aus dem Skriptkontext taugt dafür nicht: Streamlit legt es für jeden
+Skriptlauf neu an und gibt es nach dem Lauf frei. Sessions, die der
+Session-Manager nicht mehr kennt, fallen aus dem Register. ``bericht`` schätzt die Größe jedes
+States (DataFrames mit ``memory_usage(deep=True)``, Arrays über ``nbytes``,
+geteilte Objekte nur einmal); ``verdraengen`` entfernt aus Sessions, die
+länger als ``LEERLAUF_S`` nichts getan haben, die Schlüssel, die sich beim
+nächsten Besuch der Seite neu aufbauen lassen (``VERDRAENGBAR``).
+Eingaben der Benutzer (z. B. ``ergebnis_df``) werden nie verdrängt.
+"""
+import os
+import sys
+import threading
+import time
+import weakref
+
+# Schlüssel, die die Seiten bei Bedarf selbst wieder anlegen
+VERDRAENGBAR = ("kursverlauf", "bilanz_import", "indizes_cpu_ms")
+LEERLAUF_S = float(os.environ.get("SITZUNG_LEERLAUF", "900"))
+# Wie oft höchstens nach inaktiven Sessions gesucht wird
+PRUEF_ABSTAND_S = 60
+
+
+def groesse(wert, gesehen=None):
+    """Geschätzter Speicher in Bytes inkl. enthaltener Objekte; jedes Objekt zählt nur einmal."""
+    gesehen = set() if gesehen is None else gesehen
+    if id(wert) in gesehen:
+        return 0
+    gesehen.add(id(wert))
+
+    # pandas-Objekte inkl. Strings, Arrays und Objekte mit eigener Angabe (z. B. Ringpuffer);
+    # ohne pandas/numpy zu importieren, TB11.py lädt dieses Modul beim Start
+    if hasattr(wert, "memory_usage"):
+        belegt = wert.memory_usage(deep=True)
+        return int(belegt.sum() if hasattr(belegt, "sum") else belegt)
+    if hasattr(wert, "nbytes"):
+        return int(wert.nbytes)
+    if isinstance(wert, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(wert)
+    gesamt = sys.getsizeof(wert)
+    if isinstance(wert, dict):
+        return gesamt + sum(groesse(k, gesehen) + groesse(v, gesehen) for k, v in list(wert.items()))
+    if isinstance(wert, (list, tuple, set, frozenset)):
+        return gesamt + sum(groesse(v, gesehen) for v in list(wert))
+    if hasattr(wert, "__dict__"):
+        return gesamt + groesse(vars(wert), gesehen)
+    return gesamt
+
+
+def streamlit_zustand(sitzung_id):
+    """
+    Dauerhafter ``SessionState`` einer Session über den Session-Manager der Runtime.
+
+    ``None``, wenn die Session beendet ist; ``...``, wenn keine Runtime läuft
+    (z. B. ``streamlit.testing``), dann gilt der beim Melden übergebene State.
+    """
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        return ...
+    # Der Session-Manager hat keine öffentliche Zugriffsfunktion auf der Runtime;
+    # ``streamlit.testing`` setzt eine Attrappe ohne ihn ein
+    manager = getattr(Runtime.instance(), "_session_mgr", None)
+    if manager is None:
+        return ...
+    info = manager.get_session_info(sitzung_id)
+    return None if info is None else info.session.session_state
+
+
+def zustand_groesse(zustand):
+    """Größe je Schlüssel eines Session States (Mapping oder Streamlits SafeSessionState)."""
+    gesehen = set()
+    daten = getattr(zustand, "filtered_state", zustand)
+    return {schluessel: groesse(wert, gesehen) for schluessel, wert in daten.items()}
+
+
+class SitzungsRegister:
+    """
+    Letzter Zugriff je Session-ID; der Session State kommt von ``zustand_von(sitzung_id)``.
+
+    Ohne Runtime (``zustand_von`` liefert ``...``) wird der beim Melden übergebene
+    State schwach referenziert, damit Tests ohne Server dasselbe Register nutzen.
+    """
+
+    def __init__(self, leerlauf_s=LEERLAUF_S, verdraengbar=VERDRAENGBAR, pruef_abstand_s=PRUEF_ABSTAND_S,
+                 zustand_von=streamlit_zustand):
+        self.leerlauf_s = leerlauf_s
+        self.verdraengbar = verdraengbar
+        self.pruef_abstand_s = pruef_abstand_s
+        self.zustand_von = zustand_von
+        self._lock = threading.Lock()
+        self._sitzungen = {}
+        self._letzte_pruefung = time.monotonic()
+        self.verdraengt = 0   # Anzahl verdrängter Schlüssel seit Prozessstart
+
+    def beruehren(self, sitzung_id, zustand=None):
+        """Meldet Aktivität; sucht dabei höchstens alle ``pruef_abstand_s`` nach inaktiven Sessions."""
+        jetzt = time.monotonic()
+        ref = weakref.ref(zustand) if zustand is not None else None
+        with self._lock:
+            self._sitzungen[sitzung_id] = (jetzt, ref)
+            faellig = jetzt - self._letzte_pruefung >= self.pruef_abstand_s
+            if faellig:
+                self._letzte_pruefung = jetzt
+        if faellig:
+            self.verdraengen()
+
+    def _lebende(self):
+        with self._lock:
+            eintraege = list(self._sitzungen.items())
+        lebend = []
+        for sitzung_id, (zugriff, ref) in eintraege:
+            zustand = self.zustand_von(sitzung_id)
+            if zustand is ...:
+                zustand = ref() if ref is not None else None
+            if zustand is None:
+                with self._lock:
+                    self._sitzungen.pop(sitzung_id, None)
+            else:
+                lebend.append((sitzung_id, zugriff, zustand))
+        return lebend
+
+    def verdraengen(self, leerlauf_s=None):
+        """Entfernt die verdrängbaren Schlüssel aus inaktiven Sessions, gibt deren Anzahl zurück."""
+        grenze = time.monotonic() - (self.leerlauf_s if leerlauf_s is None else leerlauf_s)
+        anzahl = 0
+        for _, zugriff, zustand in self._lebende():
+            if zugriff > grenze:
+                continue
+            for schluessel in self.verdraengbar:
+                try:
+                    del zustand[schluessel]
+                    anzahl += 1
+                except KeyError:
+                    pass
+        self.verdraengt += anzahl
+        return anzahl
+
+    def bericht(self, top=3):
+        """Liste von Dicts (sitzung, leerlauf_s, kib, groesste), größte Session zuerst."""
+        jetzt = time.monotonic()
+        zeilen = []
+        for sitzung_id, zugriff, zustand in self._lebende():
+            je_schluessel = zustand_groesse(zustand)
+            groesste = sorted(je_schluessel.items(), key=lambda s: -s[1])[:top]
+            zeilen.append({
+                "sitzung": sitzung_id[:8],
+                "leerlauf_s": round(jetzt - zugriff),
+                "kib": round(sum(je_schluessel.values()) / 1024, 1),
+                "groesste": ", ".join(f"{k} {v / 1024:.1f} KiB" for k, v in groesste),
+            })
+        return sorted(zeilen, key=lambda z: -z["kib"])
+
+    def __len__(self):
+        return len(self._lebende())
+
+
+# Prozessweite Instanz (Leerlaufgrenze über SITZUNG_LEERLAUF in Sekunden)
+sitzungs_register = SitzungsRegister()
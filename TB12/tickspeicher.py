@@ -0,0 +1,176 @@
+"""
+Persistenter Tick-Speicher (SQLite) für die Indizes-Seite.
+
+Alle Sessions teilen sich eine Datenbank: der Kurs-Cache schreibt jeden
+erfolgreichen Abruf hinein, Diagramme fragen Zeiträume ab. Lange Zeiträume
+werden serverseitig verdichtet (min/max/letzter Wert je Zeitfenster oder
+LTTB), damit ein Jahreschart nur einige hundert Punkte überträgt.
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Anzahl zwischengespeicherter verdichteter Reihen (LRU)
+VERDICHTET_MAX = 256
+STANDARD_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daten", "ticks.sqlite")
+
+
+def _als_arrays(zeilen):
+    # getrennt umwandeln: ns-Zeitstempel passen nicht verlustfrei in float64
+    return (np.array([z for z, _ in zeilen], dtype=np.int64),
+            np.array([k for _, k in zeilen], dtype=np.float64))
+
+
+def lttb(x, y, punkte):
+    """
+    Largest-Triangle-Three-Buckets: reduziert (x, y) auf ``punkte`` Punkte und
+    erhält dabei die optische Form der Kurve. Gibt die gewählten Indizes zurück.
+    """
+    n = len(x)
+    if punkte >= n or punkte < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    grenzen = np.linspace(1, n - 1, punkte - 1).astype(np.int64)
+    auswahl = np.empty(punkte, dtype=np.int64)
+    auswahl[0], auswahl[-1] = 0, n - 1
+
+    a = 0
+    for i in range(punkte - 2):
+        start, ende = grenzen[i], grenzen[i + 1]
+        # Mittelwert des nächsten Fensters als dritter Dreieckspunkt
+        n_start, n_ende = grenzen[i + 1], grenzen[i + 2] if i + 2 < len(grenzen) else n
+        mx, my = x[n_start:n_ende].mean(), y[n_start:n_ende].mean()
+        flaechen = np.abs((x[a] - mx) * (y[start:ende] - y[a]) - (x[a] - x[start:ende]) * (my - y[a]))
+        a = start + int(np.argmax(flaechen))
+        auswahl[i + 1] = a
+    return auswahl
+
+
+class TickSpeicher:
+    """
+    Ticks (ticker, zeit in ns, kurs) in einer SQLite-Datei im WAL-Modus.
+
+    Eine Verbindung wird von allen Threads gemeinsam über eine Sperre genutzt;
+    doppelte (ticker, zeit)-Paare werden ignoriert.
+    """
+
+    def __init__(self, pfad=STANDARD_PFAD):
+        if pfad != ":memory:":
+            os.makedirs(os.path.dirname(pfad), exist_ok=True)
+        self.pfad = pfad
+        self._lock = threading.Lock()
+        # eigener Lock für den LRU-Cache, damit Treffer nicht auf SQLite-Abfragen warten
+        self._cache_lock = threading.Lock()
+        self._verdichtet_cache = OrderedDict()
+        self._con = sqlite3.connect(pfad, check_same_thread=False)
+        with self._lock:
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA synchronous=NORMAL")
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS ticks ("
+                " ticker TEXT NOT NULL, zeit INTEGER NOT NULL, kurs REAL NOT NULL,"
+                " PRIMARY KEY (ticker, zeit)) WITHOUT ROWID"
+            )
+            self._con.commit()
+
+    def anhaengen(self, ticks):
+        """Speichert eine Folge von (ticker, zeit_ns, kurs)."""
+        with self._lock:
+            self._con.executemany("INSERT OR IGNORE INTO ticks VALUES (?, ?, ?)", ticks)
+            self._con.commit()
+
+    def _abfrage(self, sql, parameter):
+        with self._lock:
+            return self._con.execute(sql, parameter).fetchall()
+
+    def abfragen(self, ticker, von_ns=0, bis_ns=2**63 - 1):
+        """Alle Ticks im Zeitraum als Arrays (zeiten int64, werte float64)."""
+        zeilen = self._abfrage(
+            "SELECT zeit, kurs FROM ticks WHERE ticker = ? AND zeit BETWEEN ? AND ? ORDER BY zeit",
+            (ticker, int(von_ns), int(bis_ns)),
+        )
+        return _als_arrays(zeilen)
+
+    def letzte(self, ticker, n):
+        """Die letzten ``n`` Ticks eines Tickers (aufsteigend sortiert)."""
+        zeilen = self._abfrage(
+            "SELECT zeit, kurs FROM ticks WHERE ticker = ? ORDER BY zeit DESC LIMIT ?", (ticker, n)
+        )[::-1]
+        return _als_arrays(zeilen)
+
+    def verdichtet(self, ticker, von_ns, bis_ns, punkte=300, verfahren="minmax"):
+        """
+        Verdichtete Reihe für den Zeitraum als DataFrame.
+
+        ``minmax``: je Zeitfenster Spalten zeit (letzter Tick), min, max, last -
+        die Aggregation läuft in SQLite, es werden nur ``punkte`` Zeilen gelesen.
+        Ergebnisse werden je (ticker, von, bis, punkte) zwischengespeichert; Aufrufer
+        sollten ``bis_ns`` daher auf ein Raster runden.
+        ``lttb``: Spalten zeit, last mit ``punkte`` repräsentativen Rohpunkten.
+        """
+        if verfahren == "lttb":
+            zeiten, werte = self.abfragen(ticker, von_ns, bis_ns)
+            idx = lttb(zeiten, werte, punkte)
+            return pd.DataFrame({"zeit": zeiten[idx], "last": werte[idx]})
+        if verfahren != "minmax":
+            raise ValueError(f"Unbekanntes Verfahren '{verfahren}' (erlaubt: minmax, lttb).")
+
+        # sqlite3 bindet nur Python-int, keine NumPy-Skalare
+        von_ns, bis_ns = int(von_ns), int(bis_ns)
+        breite = max(1, (bis_ns - von_ns) // punkte + 1)
+        bereich = (ticker, von_ns, bis_ns)
+        schluessel = (ticker, von_ns, bis_ns, punkte)
+        with self._cache_lock:
+            ergebnis = self._verdichtet_cache.get(schluessel)
+            if ergebnis is not None:
+                self._verdichtet_cache.move_to_end(schluessel)
+                return ergebnis
+
+        fenster = self._abfrage(
+            "SELECT (zeit - ?) / ? AS fenster, MIN(kurs), MAX(kurs), MAX(zeit) FROM ticks"
+            " WHERE ticker = ? AND zeit BETWEEN ? AND ? GROUP BY fenster ORDER BY fenster",
+            (von_ns, breite) + bereich,
+        )
+        zeiten = [z for _, _, _, z in fenster]
+        # letzter Kurs je Fenster: Primärschlüssel-Zugriff auf (ticker, jüngster Tick)
+        with self._lock:
+            letzte = [
+                self._con.execute("SELECT kurs FROM ticks WHERE ticker = ? AND zeit = ?", (ticker, z)).fetchone()[0]
+                for z in zeiten
+            ]
+        ergebnis = pd.DataFrame({
+            "zeit": np.array(zeiten, dtype=np.int64),
+            "min": np.array([lo for _, lo, _, _ in fenster], dtype=np.float64),
+            "max": np.array([hi for _, _, hi, _ in fenster], dtype=np.float64),
+            "last": np.array(letzte, dtype=np.float64),
+        })
+
+        with self._cache_lock:
+            self._verdichtet_cache[schluessel] = ergebnis
+            self._verdichtet_cache.move_to_end(schluessel)
+            while len(self._verdichtet_cache) > VERDICHTET_MAX:
+                self._verdichtet_cache.popitem(last=False)
+        return ergebnis
+
+    def schliessen(self):
+        with self._lock:
+            self._con.close()
+
+
+# Prozessweite Instanz, Pfad über MARKTDATEN_DB
+_speicher = None
+_speicher_lock = threading.Lock()
+
+
+def tick_speicher():
+    global _speicher
+    with _speicher_lock:
+        if _speicher is None:
+            _speicher = TickSpeicher(os.environ.get("MARKTDATEN_DB", STANDARD_PFAD))
+        return _speicher